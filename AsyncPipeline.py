@@ -0,0 +1,167 @@
+'''
+Canvas:   Quiz Extractor - Async Pipeline
+Brief:    asyncio batch runner that overlaps file reads, parsing and output
+          writes. Reader tasks prefetch reports, parsing runs in an executor
+          and writer tasks render each output in memory and write it at once.
+          Bounded queues between the stages keep memory use flat however many
+          files are queued.
+'''
+
+import os
+import time
+import hashlib
+import BatchProcess
+import FileProcess
+import HTML_Extract
+import Instrumentation
+import ParseCache
+import QuizModel
+import QuizRender
+
+
+# Reports read ahead of the parsers, and parsed reports waiting to be written
+QUEUE_SIZE = 16
+
+# Concurrent file reads and output writes
+READERS = 4
+WRITERS = 4
+
+
+def _read_file(path):
+    """Reads a whole report (or archive member) in one call."""
+    return FileProcess.read_input(path)
+
+
+def _write_file(path, text, encoding):
+    """Writes a whole output file in one call, renaming it into place when complete."""
+    with FileProcess.AtomicOutput(path, "w", encoding=encoding) as file:
+        file.write(text)
+
+
+def parse_job(job, data):
+    """
+    Extracts the questions of a report that has already been read. Runs in
+    the parse executor.
+
+    Args:
+        job (dict): A job built by BatchProcess.build_jobs.
+        data (bytes): The raw report.
+
+    Returns:
+        tuple: (QuizModel.Quiz, cache state "hit"/"miss"/None, SHA-256 of
+                data, the job's metrics if the run is measured).
+    """
+    method = QuizModel.METHOD_TAKEN if job["method"] == 1 else QuizModel.METHOD_UNTAKEN
+    cache = ParseCache.ParseCache(**job["cache"]) if job.get("cache") else None
+    digest = hashlib.sha256(data).hexdigest()
+    with Instrumentation.job_metrics(job.get("metrics")) as metrics:
+        quiz = HTML_Extract.extract_quiz_data(data, method, job["engine"], cache, job["input"], digest)
+    cache_state = ("hit" if cache.hits else "miss") if cache else None
+    return quiz, cache_state, digest, metrics.to_dict() if metrics else None
+
+
+async def _run_pipeline(jobs, workers, on_result, queue_size, readers, writers):
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    loop = asyncio.get_running_loop()
+    read_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+    pending_jobs = iter(jobs)
+    results = []
+
+    # Parsing is CPU bound: use processes unless only one worker is wanted
+    parse_pool = ThreadPoolExecutor(1) if workers == 1 else ProcessPoolExecutor(workers)
+    io_pool = ThreadPoolExecutor(readers + writers)
+    parsers = workers or os.cpu_count() or 1
+
+    async def reader():
+        # Readers share one iterator, so each job is read exactly once
+        for job in pending_jobs:
+            start = time.perf_counter()
+            try:
+                with Instrumentation.stage("read"):
+                    data = await loop.run_in_executor(io_pool, _read_file, job["input"])
+                item = (job, data, None, start)
+            except (OSError, ValueError) as error:
+                # ValueError: a corrupt archive member, failed like any unreadable report
+                item = (job, None, f"{type(error).__name__}: {error}", start)
+            await read_queue.put(item)  # Waits while the parsers are behind
+
+    async def parser():
+        while (item := await read_queue.get()) is not None:
+            job, data, error, start = item
+            parsed = None
+            if error is None:
+                try:
+                    parsed = await loop.run_in_executor(parse_pool, parse_job, job, data)
+                except Exception as exception:
+                    error = f"{type(exception).__name__}: {exception}"
+            del data, item  # Only the records travel on
+            await write_queue.put((job, parsed, error, start))
+
+    async def writer():
+        while (item := await write_queue.get()) is not None:
+            job, parsed, error, start = item
+            result = {"input": job["input"], "output": job["output"], "questions": 0, "error": error,
+                      "cache": None, "quiz": None, "status": "failed"}
+            if parsed is not None:
+                quiz, result["cache"], digest, metrics = parsed
+                Instrumentation.merge(metrics)
+                try:
+                    with Instrumentation.stage("render"):
+                        text = QuizRender.render_quiz(quiz, job["quiz_number"], job["class_name"])
+                    encoding = QuizRender.OUTPUT_ENCODINGS[quiz.method]
+                    with Instrumentation.stage("write"):
+                        await loop.run_in_executor(io_pool, _write_file, job["output"], text, encoding)
+                    result.update(questions=len(quiz.questions), status="ok")
+                    if job.get("keep_records"):
+                        result.update(quiz=quiz, content_hash=digest)
+                except Exception as exception:
+                    result["error"] = f"{type(exception).__name__}: {exception}"
+            result["seconds"] = time.perf_counter() - start
+            BatchProcess.print_result(result)
+            if on_result:
+                on_result(job, result)
+            result["quiz"] = None
+            results.append(result)
+
+    try:
+        writer_tasks = [asyncio.create_task(writer()) for _ in range(writers)]
+        parser_tasks = [asyncio.create_task(parser()) for _ in range(parsers)]
+        await asyncio.gather(*(reader() for _ in range(readers)))
+        # One end marker per consumer, once everything before it is queued
+        for _ in parser_tasks:
+            await read_queue.put(None)
+        await asyncio.gather(*parser_tasks)
+        for _ in writer_tasks:
+            await write_queue.put(None)
+        await asyncio.gather(*writer_tasks)
+    finally:
+        parse_pool.shutdown()
+        io_pool.shutdown()
+    return results
+
+
+def run_jobs(jobs, workers=None, on_result=None, queue_size=QUEUE_SIZE, readers=READERS, writers=WRITERS):
+    """
+    Runs jobs through the async pipeline. A drop-in replacement for
+    BatchProcess.run_jobs.
+
+    At most queue_size reports wait between reading and parsing, and as many
+    again between parsing and writing, so memory stays bounded.
+
+    Args:
+        jobs (list): Jobs built by BatchProcess.build_jobs.
+        workers (int, optional): Parse worker processes. Defaults to the
+            number of CPUs; 1 parses in a thread of this process.
+        on_result (callable, optional): Called with each result as it arrives.
+        queue_size (int, optional): Capacity of each queue between stages.
+        readers (int, optional): Concurrent file reads.
+        writers (int, optional): Concurrent output writes.
+
+    Returns:
+        list: The results of all jobs, in completion order.
+    """
+    # asyncio is only imported once the pipeline actually runs, keeping CLI start-up fast
+    import asyncio
+    return asyncio.run(_run_pipeline(jobs, workers, on_result, queue_size, readers, writers))
@@ -0,0 +1,705 @@
+'''
+Canvas:   Quiz Extractor - Batch Processing
+Brief:    Headless batch mode that converts every report in the Input folder
+          using a pool of worker processes.
+'''
+
+import os
+import json
+import time
+import HTML_Extract
+import FileProcess
+import Instrumentation
+import ParserBackend
+import ParseCache
+import QuizModel
+import QuizRender
+import QuizExport
+import QuestionBank
+
+
+# Extraction methods accepted on the command line and in manifests
+EXTRACTION_METHODS = {"taken": 1, "untaken": 2}
+
+# File extensions treated as Canvas quiz reports
+REPORT_EXTENSIONS = FileProcess.REPORT_EXTENSIONS
+
+# Default location of the batch journal
+JOURNAL_FILE = os.path.join(FileProcess.OUTPUT_FOLDER, ".batch_journal.jsonl")
+
+
+def find_input_files(input_folder=None):
+    """
+    Finds every quiz report under the input directory, including subfolders
+    and the reports inside zip and tar archives, which are listed as member
+    paths (see FileProcess.member_path) and read without unpacking.
+
+    Args:
+        input_folder (str, optional): Directory to search. Defaults to
+            FileProcess.INPUT_FOLDER.
+
+    Returns:
+        list: Sorted paths (relative to the input directory) of all report files.
+    """
+    input_folder = input_folder or FileProcess.INPUT_FOLDER
+    if not os.path.isdir(input_folder):
+        print(f"The directory {input_folder} does not exist.")
+        return []
+
+    found = []
+    for root, _dirs, names in os.walk(input_folder):
+        for name in names:
+            if name.lower().endswith(REPORT_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(root, name), input_folder))
+            elif FileProcess.is_archive(name):
+                archive_path = os.path.join(root, name)
+                try:
+                    members = FileProcess.list_archive(archive_path, REPORT_EXTENSIONS)
+                except (OSError, ValueError) as error:
+                    print(f"Skipping {archive_path}: {error}")
+                    continue
+                relative_archive = os.path.relpath(archive_path, input_folder)
+                found.extend(FileProcess.member_path(relative_archive, member) for member in members)
+    return sorted(found)
+
+
+def parse_method(value):
+    """
+    Converts a method name ("taken"/"untaken") or number (1/2) to the method number.
+
+    Args:
+        value (str | int): The extraction method as given by the user.
+
+    Returns:
+        int: 1 for taken quiz extraction, 2 for untaken quiz extraction.
+
+    Raises:
+        ValueError: If the value does not name a known extraction method.
+    """
+    if isinstance(value, int) and value in EXTRACTION_METHODS.values():
+        return value
+    text = str(value).strip().lower()
+    if text in EXTRACTION_METHODS:
+        return EXTRACTION_METHODS[text]
+    if text in ("1", "2"):
+        return int(text)
+    raise ValueError(f"Unknown extraction method '{value}'. Use 'taken' or 'untaken'.")
+
+
+def read_manifest(manifest_path):
+    """
+    Reads a run manifest written in JSON, TOML (.toml) or YAML (.yaml/.yml).
+
+    TOML needs Python 3.11+ (or the tomli package) and YAML needs PyYAML.
+
+    Args:
+        manifest_path (str): Path to the manifest file.
+
+    Returns:
+        dict: The whole manifest.
+
+    Raises:
+        ValueError: If the manifest cannot be read or parsed.
+    """
+    extension = os.path.splitext(manifest_path)[1].lower()
+    try:
+        if extension == ".toml":
+            try:
+                import tomllib
+            except ImportError:  # Python 3.10
+                try:
+                    import tomli as tomllib
+                except ImportError:
+                    raise ValueError("Reading TOML manifests needs Python 3.11+ or tomli (pip install tomli).")
+            with open(manifest_path, "rb") as file:
+                manifest = tomllib.load(file)
+        elif extension in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Reading YAML manifests needs PyYAML (pip install pyyaml).")
+            with open(manifest_path, "r", encoding="utf-8") as file:
+                manifest = yaml.safe_load(file) or {}
+        else:
+            with open(manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+    except OSError as error:
+        raise ValueError(f"Cannot read the manifest '{manifest_path}': {error}")
+    except ValueError as error:
+        raise ValueError(f"Invalid manifest '{manifest_path}': {error}")
+    except Exception as error:  # yaml.YAMLError is not a ValueError
+        raise ValueError(f"Invalid manifest '{manifest_path}': {error}")
+    if not isinstance(manifest, dict):
+        raise ValueError(f"Invalid manifest '{manifest_path}': expected a mapping at the top level.")
+    return manifest
+
+
+def load_manifest(manifest_path):
+    """
+    Loads a batch manifest mapping input files to class, quiz and method.
+
+    The manifest is a JSON document (or the same structure in TOML or YAML,
+    see read_manifest) of the form::
+
+        {
+            "defaults": {"class": "CS-372", "method": "taken"},
+            "files": {
+                "quiz3.html": {"quiz": "3"},
+                "midterm.html": {"quiz": "Midterm", "method": "untaken"}
+            }
+        }
+
+    File keys are relative to the input directory. Any field missing for a
+    file falls back to "defaults" and then to the command line options.
+
+    Args:
+        manifest_path (str): Path to the manifest file.
+
+    Returns:
+        tuple: (defaults dict, files dict).
+    """
+    manifest = read_manifest(manifest_path)
+    defaults = manifest.get("defaults", {})
+    files = {os.path.normpath(name): entry for name, entry in manifest.get("files", {}).items()}
+    return defaults, files
+
+
+def build_jobs(input_files, input_folder=None, defaults=None, overrides=None, engine=None, cache=None,
+               keep_records=False, outputs=None, infer="title", on_exists="attempt", write_output=True):
+    """
+    Builds one job per input file and reserves a unique output file for each.
+
+    Output names are reserved up front in this process so that two workers
+    never write the same file, even when several reports map to the same quiz.
+
+    Args:
+        input_files (list): Paths relative to the input directory.
+        input_folder (str, optional): The input directory.
+        defaults (dict, optional): Fallback "class", "quiz" and "method" values.
+        overrides (dict, optional): Per-file entries keyed by relative path.
+        engine (str, optional): Parser engine used by every job.
+        cache (dict, optional): ParseCache settings ("folder", "max_bytes",
+            "rebuild"), or None to disable caching.
+        keep_records (bool, optional): Return the extracted QuizModel.Quiz with
+            each result, for exporting.
+        outputs (dict, optional): Output path to reuse per input path (the
+            job's "input"), e.g. the names an interrupted run reserved.
+        infer (str, optional): Where a quiz and class nobody set come from:
+            "title" (the report's <title>, then its file name) or "filename".
+        on_exists (str, optional): Output name policy, one of
+            FileProcess.ON_EXISTS_POLICIES.
+        write_output (bool, optional): Write a text file per report. If
+            False the jobs only extract (their "output" is None) and keep
+            their records, e.g. for merging.
+
+    Returns:
+        list: Job dictionaries ready to be passed to process_job.
+    """
+    if input_folder is None:
+        input_folder = FileProcess.INPUT_FOLDER
+    defaults = defaults or {}
+    overrides = overrides or {}
+    outputs = outputs or {}
+    reserved = set(outputs.values())
+    jobs = []
+
+    for relative_path in input_files:
+        input_path = os.path.join(input_folder, relative_path)
+        entry = {**defaults, **overrides.get(os.path.normpath(relative_path), {})}
+        if not (entry.get("quiz") and entry.get("class")):
+            entry = {**FileProcess.infer_metadata(input_path, infer == "title"), **entry}
+        quiz_number = str(entry["quiz"])
+        class_name = str(entry.get("class") or "Unknown Class")
+        output_file_name = None
+        if write_output:
+            output_file_name = outputs.get(input_path) or FileProcess.auto_output_file(
+                quiz_number, class_name, reserved, on_exists)
+            reserved.add(output_file_name)
+        jobs.append({
+            "input": input_path,
+            "output": output_file_name,
+            "quiz_number": quiz_number,
+            "class_name": class_name,
+            "method": parse_method(entry.get("method", 1)),
+            "engine": engine,
+            "cache": cache,
+            "keep_records": keep_records or not write_output,
+            "metrics": Instrumentation.current() is not None,
+            "on_exists": on_exists,
+        })
+    return jobs
+
+
+def apply_exists_policy(jobs):
+    """
+    Sets aside the jobs whose output file already exists and whose policy is
+    "skip" or "fail", before anything runs.
+
+    Args:
+        jobs (list): Jobs built by build_jobs.
+
+    Returns:
+        tuple: (jobs to run, results of the jobs set aside).
+    """
+    runnable = []
+    set_aside = []
+    for job in jobs:
+        policy = job.get("on_exists")
+        if policy not in ("skip", "fail") or not os.path.exists(job["output"]):
+            runnable.append(job)
+            continue
+        result = {"input": job["input"], "output": job["output"], "questions": 0, "error": None,
+                  "cache": None, "quiz": None, "seconds": 0.0, "status": "skipped"}
+        if policy == "fail":
+            result.update(status="failed", error=f"FileExistsError: {job['output']} already exists")
+        set_aside.append(result)
+    return runnable, set_aside
+
+
+def process_job(job):
+    """
+    Runs a single extraction job. Executed inside a worker process.
+
+    Any exception raised while processing is captured in the returned result
+    so that one broken report does not stop the rest of the batch.
+
+    Args:
+        job (dict): A job built by build_jobs.
+
+    Returns:
+        dict: The job's input, output, status, question count, elapsed
+              seconds, error message (if any), if the job keeps records the
+              extracted quiz, and if the run is measured the job's metrics.
+    """
+    with Instrumentation.job_metrics(job.get("metrics")) as metrics:
+        result = _run_job(job)
+    if metrics:
+        result["metrics"] = metrics.to_dict()
+    return result
+
+
+def _run_job(job):
+    result = {"input": job["input"], "output": job["output"], "questions": 0, "error": None, "cache": None,
+              "quiz": None}
+    cache = ParseCache.ParseCache(**job["cache"]) if job.get("cache") else None
+    start = time.perf_counter()
+    try:
+        if job.get("keep_records"):
+            # Parse once, then write the text output (if any) from the same records
+            method = QuizModel.METHOD_TAKEN if job["method"] == 1 else QuizModel.METHOD_UNTAKEN
+            # The report is hashed once, for the cache key and the question bank
+            digest = ParseCache.hash_file(job["input"])
+            quiz = HTML_Extract.extract_quiz(job["input"], method, job["engine"], cache, digest)
+            if job["output"] is None:
+                result["questions"] = len(quiz.questions)
+            else:
+                result["questions"] = QuizRender.write_text(
+                    quiz.questions, method, job["output"], job["quiz_number"], job["class_name"]
+                )
+            result["quiz"] = quiz
+            result["content_hash"] = digest
+        elif job["method"] == 1:
+            result["questions"] = HTML_Extract.process_taken_quiz(
+                job["input"], job["output"], job["quiz_number"], job["class_name"], job["engine"], cache
+            )
+        else:
+            result["questions"] = HTML_Extract.process_untaken_quiz(
+                job["input"], job["output"], job["quiz_number"], job["class_name"], job["engine"], cache
+            )
+        result["status"] = "ok"
+        if cache:
+            result["cache"] = "hit" if cache.hits else "miss"
+    except Exception as error:
+        result["status"] = "failed"
+        result["error"] = f"{type(error).__name__}: {error}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def print_result(result):
+    """
+    Prints the one-line summary for a finished job.
+
+    Args:
+        result (dict): A result returned by process_job.
+
+    Returns:
+        None
+    """
+    if result["status"] == "ok":
+        target = f" -> {result['output']}" if result["output"] else ""
+        print(f"[ok]     {result['input']}{target} "
+              f"({result['questions']} questions, {result['seconds']:.2f}s"
+              f"{', cached' if result.get('cache') == 'hit' else ''})")
+    elif result["status"] == "skipped":
+        print(f"[skip]   {result['input']}: {result['output']} already exists")
+    else:
+        print(f"[FAILED] {result['input']}: {result['error']}")
+
+
+def print_summary(results, elapsed):
+    """
+    Prints the aggregate summary for a batch run.
+
+    Args:
+        results (list): Results returned by process_job.
+        elapsed (float): Wall-clock seconds for the whole batch.
+
+    Returns:
+        None
+    """
+    succeeded = [r for r in results if r["status"] == "ok"]
+    skipped = [r for r in results if r["status"] == "skipped"]
+    failed = [r for r in results if r["status"] not in ("ok", "skipped")]
+    questions = sum(r["questions"] for r in succeeded)
+    rate = questions / elapsed if elapsed > 0 else 0.0
+
+    print(f"\n{'-' * 40}")
+    print(f"Files processed: {len(results)}")
+    print(f"  Succeeded:     {len(succeeded)}")
+    if skipped:
+        print(f"  Skipped:       {len(skipped)}")
+    print(f"  Failed:        {len(failed)}")
+    print(f"Questions:       {questions}")
+    print(f"Elapsed:         {elapsed:.2f}s ({rate:.1f} questions/sec)")
+    if any(r.get("cache") for r in results):
+        hits = sum(1 for r in results if r.get("cache") == "hit")
+        misses = sum(1 for r in results if r.get("cache") == "miss")
+        print(f"Cache:           {hits} hit(s), {misses} miss(es)")
+    for result in failed:
+        print(f"  ✖ {result['input']}: {result['error']}")
+
+
+def run_jobs(jobs, workers=None, on_result=None):
+    """
+    Runs jobs in a process pool, printing each result as it completes.
+
+    A single job (or workers=1) runs in this process, which avoids the pool's
+    start-up cost.
+
+    Args:
+        jobs (list): Jobs built by build_jobs.
+        workers (int, optional): Number of worker processes. Defaults to the
+            number of CPUs.
+        on_result (callable, optional): Called with each result as it arrives.
+
+    Returns:
+        list: The results of all jobs, in completion order.
+    """
+    results = []
+    if len(jobs) == 1 or workers == 1:
+        for job in jobs:
+            result = process_job(job)
+            Instrumentation.merge(result.pop("metrics", None))
+            print_result(result)
+            if on_result:
+                on_result(job, result)
+            result["quiz"] = None
+            results.append(result)
+        return results
+
+    # Imported here: multiprocessing is slow to import and single jobs never need it
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as error:
+                # The worker itself died (e.g. killed), not just the extraction
+                job = futures[future]
+                result = {"input": job["input"], "output": job["output"], "questions": 0,
+                          "status": "failed", "error": f"{type(error).__name__}: {error}",
+                          "seconds": 0.0, "cache": None, "quiz": None}
+            Instrumentation.merge(result.pop("metrics", None))
+            print_result(result)
+            if on_result:
+                on_result(futures[future], result)
+            result["quiz"] = None  # Records are handed off as they arrive, not kept
+            results.append(result)
+    return results
+
+
+def load_defaults(method="taken", class_name=None, manifest_path=None):
+    """
+    Combines the command line defaults with an optional manifest.
+
+    Args:
+        method (str, optional): Default extraction method ("taken" or "untaken").
+        class_name (str, optional): Default class name.
+        manifest_path (str, optional): JSON, TOML or YAML manifest with per-file settings.
+
+    Returns:
+        tuple: (defaults, overrides) as expected by build_jobs.
+    """
+    defaults = {"method": method}
+    if class_name:
+        defaults["class"] = class_name
+    overrides = {}
+    if manifest_path:
+        manifest_defaults, overrides = load_manifest(manifest_path)
+        defaults.update(manifest_defaults)
+    return defaults, overrides
+
+
+class RecordSink:
+    """
+    Hands the records of each finished job to the exporters and the question bank.
+
+    Pass the sink as run_jobs' on_result callback and close it when done.
+
+    Attributes:
+        exporters (list): Open QuizExport exporters.
+        bank (QuestionBank.QuestionBank | None): The open question bank.
+        bank_counts (dict): Questions added ("new") and "merged" into the bank.
+    """
+
+    def __init__(self, export_formats=None, export_path=None, bank_path=None):
+        self.exporters = QuizExport.open_exporters(export_formats, export_path) if export_formats else []
+        self.bank = QuestionBank.QuestionBank(bank_path) if bank_path else None
+        self.bank_counts = {"new": 0, "merged": 0}
+
+    def __bool__(self):
+        return bool(self.exporters or self.bank)
+
+    def __call__(self, job, result):
+        # Stream each quiz to every exporter and the bank as soon as its worker finishes
+        if result["quiz"] is None:
+            return
+        for exporter in self.exporters:
+            exporter.write_quiz(result["quiz"], job["quiz_number"], job["class_name"])
+        if self.bank:
+            counts = self.bank.ingest_quiz(
+                result["quiz"], job["class_name"], job["quiz_number"], result["content_hash"]
+            )
+            for name in self.bank_counts:
+                self.bank_counts[name] += counts[name] if counts else 0
+
+    def close(self, discard=False):
+        """Finishes the exports, or drops them if discard is set (e.g. the run was interrupted)."""
+        for exporter in self.exporters:
+            exporter.close(discard)
+        if self.bank:
+            self.bank.close()
+
+    def print_summary(self):
+        for exporter in self.exporters:
+            print(f"Exported: {exporter.path}")
+        if self.bank:
+            print(f"Question bank: {self.bank_counts['new']} new, {self.bank_counts['merged']} merged "
+                  f"({self.bank.path})")
+
+
+class BatchJournal:
+    """
+    Append-only record of a batch run that lets an interrupted run resume.
+
+    Before the jobs run, each one is recorded as "started" with the output
+    name it reserved; once its output has been renamed into place it is
+    recorded again with its status. Every line is flushed as it is written,
+    and a last line cut short by a crash is ignored when the journal is read
+    back.
+
+    Attributes:
+        path (str): The JSON Lines journal file.
+        entries (dict): The latest entry per input path: "input", "output",
+            "size", "mtime" and "status" ("started", "ok" or "failed").
+    """
+
+    def __init__(self, path=JOURNAL_FILE, resume=False):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.entries = self.load(path) if resume else {}
+        self.file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    @staticmethod
+    def load(path):
+        """
+        Reads a journal.
+
+        Returns:
+            dict: The latest entry per input path; empty if there is no journal.
+        """
+        entries = {}
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn write of an interrupted run
+                    entries[entry["input"]] = entry
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _write(self, entries):
+        self.file.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        self.file.flush()
+
+    def is_complete(self, input_path):
+        """
+        Returns:
+            bool: True if a previous run converted this report, the report has
+                  not changed since, and its output file is still there.
+        """
+        entry = self.entries.get(input_path)
+        if not entry or entry["status"] != "ok":
+            return False
+        try:
+            signature = FileProcess.input_signature(input_path)
+        except (OSError, ValueError):
+            return False
+        return (entry["size"], entry["mtime"]) == signature and os.path.exists(entry["output"])
+
+    def outputs(self):
+        """
+        Returns:
+            dict: The output path each report was given by a previous run.
+        """
+        return {input_path: entry["output"] for input_path, entry in self.entries.items()}
+
+    def start(self, jobs):
+        """Records the jobs about to run and the outputs they reserved."""
+        started = []
+        for job in jobs:
+            try:
+                signature = FileProcess.input_signature(job["input"])
+            except (OSError, ValueError):
+                signature = (None, None)
+            entry = {"input": job["input"], "output": job["output"], "size": signature[0], "mtime": signature[1],
+                     "status": "started"}
+            self.entries[job["input"]] = entry
+            started.append(entry)
+        self._write(started)
+
+    def record(self, job, result):
+        """Records a finished job. Pass as (part of) run_jobs' on_result callback."""
+        entry = {**self.entries.get(job["input"], {"input": job["input"], "size": None, "mtime": None}),
+                 "output": result["output"], "status": result["status"]}
+        self.entries[job["input"]] = entry
+        self._write([entry])
+
+    def close(self):
+        self.file.close()
+
+
+def replay_records(jobs, sink):
+    """
+    Feeds the records of reports converted by an earlier, interrupted run to
+    the exporters again, so a resumed run still exports every report. The
+    records normally come straight from the parse cache.
+
+    Args:
+        jobs (list): Jobs of the reports that are already converted.
+        sink (RecordSink): The exporters and question bank.
+
+    Returns:
+        None
+    """
+    for job in jobs:
+        method = QuizModel.METHOD_TAKEN if job["method"] == 1 else QuizModel.METHOD_UNTAKEN
+        cache = ParseCache.ParseCache(**job["cache"]) if job.get("cache") else None
+        digest = ParseCache.hash_file(job["input"])
+        quiz = HTML_Extract.extract_quiz(job["input"], method, job["engine"], cache, digest)
+        sink(job, {"quiz": quiz, "content_hash": digest})
+
+
+def run_batch(workers=None, manifest_path=None, method="taken", class_name=None, input_folder=None,
+              engine=None, cache=None, export_formats=None, export_path=None, bank_path=None,
+              runner=None, journal_path=JOURNAL_FILE, resume=False, infer="title", on_exists="attempt",
+              output_archive=None):
+    """
+    Converts every report in the input directory without any prompts.
+
+    Args:
+        workers (int, optional): Number of worker processes.
+        manifest_path (str, optional): JSON, TOML or YAML manifest with per-file settings.
+        method (str, optional): Default extraction method ("taken" or "untaken").
+        class_name (str, optional): Default class name.
+        input_folder (str, optional): Directory to search for reports.
+        engine (str, optional): Parser engine. Auto-detected if None.
+        cache (dict, optional): ParseCache settings, or None to disable caching.
+        export_formats (list, optional): QuizExport formats to produce from the
+            same parse, e.g. ["jsonl", "csv"].
+        export_path (str, optional): Base path (without extension) of the exports.
+        bank_path (str, optional): QuestionBank database to merge every report into.
+        runner (callable, optional): Job runner with run_jobs' signature, e.g.
+            AsyncPipeline.run_jobs. Defaults to run_jobs.
+        journal_path (str, optional): Journal recording the progress of the run.
+        resume (bool, optional): Skip the reports the journal shows were already
+            converted, and reuse the output names of the ones that were not.
+        infer (str, optional): Where a quiz and class nobody set come from (see build_jobs).
+        on_exists (str, optional): Output name policy, one of FileProcess.ON_EXISTS_POLICIES.
+        output_archive (str, optional): Zip archive to move every output file into
+            once the run is complete. Cannot be combined with resume: the
+            archive of a resumed run would only hold the reports converted
+            after the interruption.
+
+    Returns:
+        int: 0 if every file was converted or skipped, 1 if any file failed or
+             none were found, 2 if resume and output_archive are both given.
+    """
+    if resume and output_archive:
+        print("Error: --resume cannot be combined with --output-archive; an interrupted archive run keeps "
+              "its outputs in place, so resume it without an archive.")
+        return 2
+    input_folder = input_folder or FileProcess.INPUT_FOLDER
+    defaults, overrides = load_defaults(method, class_name, manifest_path)
+
+    input_files = find_input_files(input_folder)
+    if not input_files:
+        print(f"There are no quiz reports in the {input_folder} directory.")
+        return 1
+
+    engine = ParserBackend.resolve_engine(engine)
+    keep_records = bool(export_formats or bank_path)
+    journal = BatchJournal(journal_path, resume)
+    jobs = build_jobs(input_files, input_folder, defaults, overrides, engine, cache, keep_records,
+                      journal.outputs(), infer, on_exists)
+    done = [job for job in jobs if journal.is_complete(job["input"])]
+    jobs = [job for job in jobs if not journal.is_complete(job["input"])]
+    jobs, set_aside = apply_exists_policy(jobs)
+    if resume:
+        # Outputs still being written when the run was interrupted
+        FileProcess.remove_partial_files(FileProcess.OUTPUT_FOLDER)
+        print(f"Resuming: {len(done)} of {len(done) + len(jobs) + len(set_aside)} file(s) already converted.")
+    print(f"Processing {len(jobs)} file(s) with {workers or os.cpu_count()} worker(s) "
+          f"using the {engine} parser...\n")
+
+    sink = RecordSink(export_formats, export_path, bank_path)
+    archive = FileProcess.OutputArchive(output_archive) if output_archive else None
+
+    def on_result(job, result):
+        journal.record(job, result)
+        if sink:
+            sink(job, result)
+        if archive:
+            archive(job, result)
+
+    for result in set_aside:
+        print_result(result)
+    start = time.perf_counter()
+    try:
+        if sink.exporters:
+            replay_records(done, sink)
+        journal.start(jobs)
+        results = set_aside + (runner or run_jobs)(jobs, workers, on_result)
+    except BaseException:
+        sink.close(discard=True)  # Never leave a partial export behind
+        if archive:
+            archive.close(discard=True)
+        raise
+    else:
+        sink.close()
+        if archive:
+            archive.close()
+    finally:
+        journal.close()
+    print_summary(results, time.perf_counter() - start)
+    sink.print_summary()
+    if archive:
+        print(f"Archived {archive.count} output file(s): {archive.path}")
+    return 0 if all(r["status"] in ("ok", "skipped") for r in results) else 1
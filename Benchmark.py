@@ -0,0 +1,300 @@
+'''
+Canvas:   Quiz Extractor - Benchmark
+Brief:    Measures how process_taken_quiz and process_untaken_quiz scale on
+          synthetic reports (SyntheticReport) for every installed parser
+          engine and execution mode. Each case runs in a fresh subprocess so
+          its peak RSS is its own, and times a fixed calibration workload
+          next to the extraction. Results are written as JSON so runs from
+          different commits can be compared; the comparison uses the time
+          relative to the calibration, which cancels out machine load.
+
+Usage:    python Benchmark.py [--sizes 10,100,1000,10000] [--answers N] [--repeat N] [--output FILE]
+                              [--compare OLD.json]
+'''
+
+import gc
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+import HTML_Extract
+import Instrumentation
+import ParserBackend
+import ParseCache
+import SyntheticReport
+
+
+# Report sizes benchmarked by default
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+# Execution modes: how the extractor is driven for each case
+MODES = ("taken", "untaken", "cached")
+
+# Default results file
+RESULTS_FILE = "benchmark_results.json"
+
+# Slowdown (new / old time relative to the calibration) reported as a regression by --compare.
+# Runs of the same commit differ by up to about 1.3x on a busy machine.
+REGRESSION_RATIO = 1.4
+
+# Cases faster than this (in both runs) are too noisy to compare
+MIN_COMPARE_SECONDS = 0.05
+
+# Runs per case by default; the fastest counts
+REPEAT = 3
+
+# Records of the fixed pure-Python workload timed next to every case. Comparing
+# each case's time relative to it cancels out how loaded the machine is.
+CALIBRATION_RECORDS = 2000
+WORD = re.compile(r"\w+")
+
+
+def calibration_payload():
+    """The fixed records serialized by calibrate()."""
+    return [{"text": f"question {number} " * 8, "points": number / 3, "answers": [str(n) for n in range(6)]}
+            for number in range(CALIBRATION_RECORDS)]
+
+
+def calibrate(payload):
+    """Times the calibration workload: JSON round trips and a regex scan of the payload."""
+    start = time.perf_counter()
+    for _ in range(3):
+        text = json.dumps(payload)
+        json.loads(text)
+        WORD.findall(text)
+    return time.perf_counter() - start
+
+
+def run_case(case):
+    """
+    Runs one benchmark case in this process. Called in the case's subprocess.
+
+    Args:
+        case (dict): "report", "mode", "engine" and "questions".
+
+    Returns:
+        dict: The case with "seconds", "questions_per_sec", "calibration_seconds"
+              (the faster calibration run), "relative_cost" (seconds divided by
+              it) and "peak_rss_kib" added.
+    """
+    payload = calibration_payload()
+    with tempfile.TemporaryDirectory() as work_dir:
+        output_path = os.path.join(work_dir, "output.txt")
+        cache = None
+        if case["mode"] == "cached":
+            # Warm the cache first; only the cached run is timed
+            cache = ParseCache.ParseCache(os.path.join(work_dir, "cache"))
+            HTML_Extract.process_taken_quiz(case["report"], output_path, "0", "Bench", case["engine"], cache)
+        else:
+            ParserBackend.parse_html("<p></p>", case["engine"])  # Import the engine outside the timing
+        process = HTML_Extract.process_untaken_quiz if case["mode"] == "untaken" else HTML_Extract.process_taken_quiz
+
+        # The calibration runs just before and after the case, with the garbage collector paused as timeit does
+        gc.collect()
+        gc.disable()
+        try:
+            before = calibrate(payload)
+            start = time.perf_counter()
+            count = process(case["report"], output_path, "0", "Bench", case["engine"], cache)
+            seconds = time.perf_counter() - start
+            after = calibrate(payload)
+        finally:
+            gc.enable()
+
+    return {**case, "extracted": count, "seconds": round(seconds, 6),
+            "questions_per_sec": round(count / seconds, 1) if seconds > 0 else None,
+            "calibration_seconds": round(min(before, after), 6),
+            "relative_cost": round(seconds / min(before, after), 6),
+            "peak_rss_kib": Instrumentation.peak_rss_kib()}
+
+
+def run_case_subprocess(case):
+    """
+    Runs one benchmark case in a fresh Python interpreter.
+
+    Args:
+        case (dict): See run_case.
+
+    Returns:
+        dict: The measured case, or the case with an "error" message.
+    """
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if completed.returncode != 0:
+        return {**case, "error": completed.stderr.strip().splitlines()[-1] if completed.stderr else "failed"}
+    return json.loads(completed.stdout)
+
+
+def git_commit():
+    """
+    Returns:
+        str | None: The current git commit, if this is a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def case_key(case):
+    """Identifies a case across result files."""
+    return (case["engine"], case["mode"], case["questions"], case["chrome"], case.get("answers"))
+
+
+def case_label(case):
+    """Names a case's fields, e.g. "engine=lxml mode=taken questions=200 chrome=yes answers=default"."""
+    return (f"engine={case['engine']} mode={case['mode']} questions={case['questions']} "
+            f"chrome={'yes' if case['chrome'] else 'no'} answers={case.get('answers') or 'default'}")
+
+
+def run_benchmark(sizes, engines, modes, repeat=REPEAT, answers=None):
+    """
+    Generates the reports and runs every (size, chrome, engine, mode) case.
+
+    Args:
+        sizes (list): Question counts of the generated reports.
+        engines (list): Parser engines to benchmark.
+        modes (list): Execution modes (see MODES).
+        repeat (int, optional): Runs per case; the fastest is kept, and its
+            relative cost is taken against the fastest calibration of any run.
+        answers (int, optional): Options/matching rows per question, see
+            SyntheticReport.render_question.
+
+    Returns:
+        list: Measured cases.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as report_dir:
+        for questions in sizes:
+            for chrome in (True, False):
+                reports = {}
+                for taken in (True, False):
+                    path = os.path.join(report_dir, f"{questions}-{chrome}-{taken}.html")
+                    size = SyntheticReport.write_report(path, questions, taken, chrome, answers=answers)
+                    reports[taken] = (path, size)
+
+                for engine in engines:
+                    for mode in modes:
+                        path, size = reports[mode != "untaken"]
+                        case = {"engine": engine, "mode": mode, "questions": questions, "chrome": chrome,
+                                "answers": answers, "report": path, "report_bytes": size}
+                        runs = [run_case_subprocess(case) for _ in range(repeat)]
+                        measured = [run for run in runs if "error" not in run]
+                        result = min(measured, key=lambda run: run["seconds"]) if measured else runs[0]
+                        if measured:
+                            calibration = min(run["calibration_seconds"] for run in measured)
+                            result["calibration_seconds"] = calibration
+                            result["relative_cost"] = round(result["seconds"] / calibration, 6)
+                        del result["report"]
+                        results.append(result)
+                        print_case(result)
+    return results
+
+
+def print_case(result):
+    """Prints the one-line summary of a measured case."""
+    label = (f"{result['engine']:<12} {result['mode']:<8} {result['questions']:>6} q "
+             f"{'chrome' if result['chrome'] else 'bare':<6}")
+    if "error" in result:
+        print(f"{label}  FAILED: {result['error']}")
+        return
+    rss = f"{result['peak_rss_kib'] / 1024:7.1f} MiB" if result["peak_rss_kib"] is not None else "      n/a"
+    print(f"{label} {result['seconds']:9.4f}s {result['questions_per_sec'] or 0:10.1f} q/s  {rss}")
+
+
+def compare(results, old_path, threshold=REGRESSION_RATIO):
+    """
+    Compares the cases against an earlier results file: their time relative
+    to the calibration workload, or their wall time if the earlier file has
+    no calibration.
+
+    Args:
+        results (list): Measured cases of this run.
+        old_path (str): Results file written by an earlier run.
+        threshold (float, optional): Slowdown ratio counted as a regression.
+
+    Returns:
+        int: The number of regressions.
+    """
+    with open(old_path, "r", encoding="utf-8") as file:
+        old = json.load(file)
+    old_cases = {case_key(case): case for case in old["results"] if "error" not in case}
+    print(f"\nCompared with {old_path} (commit {old.get('commit') or 'unknown'}):")
+
+    regressions = 0
+    for result in results:
+        before = old_cases.get(case_key(result))
+        if before is None or "error" in result:
+            continue
+        if max(result["seconds"], before["seconds"]) < MIN_COMPARE_SECONDS:
+            continue
+        measure = "relative_cost" if before.get("relative_cost") and result.get("relative_cost") else "seconds"
+        ratio = result[measure] / before[measure] if before[measure] else 1.0
+        if ratio > threshold:
+            regressions += 1
+            print(f"  REGRESSION {case_label(result)}: {before['seconds']:.4f}s -> {result['seconds']:.4f}s "
+                  f"({ratio:.2f}x {'relative to the calibration' if measure == 'relative_cost' else 'wall time'})")
+    print(f"  {regressions} regression(s) over {threshold:.2f}x.")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the quiz extractor on synthetic reports.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma separated question counts (default: 10,100,1000,10000).")
+    parser.add_argument("--engines", help="Comma separated parser engines (default: every installed engine).")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma separated modes: taken, untaken, cached.")
+    parser.add_argument("--answers", type=int,
+                        help="Options per multiple choice question and rows per matching question (default: 2-4).")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help=f"Runs per case; the fastest is kept (default: {REPEAT}).")
+    parser.add_argument("--output", default=RESULTS_FILE, help=f"Results file (default: {RESULTS_FILE}).")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    engines = args.engines.split(",") if args.engines else list(ParserBackend.available_engines())
+    modes = [mode for mode in args.modes.split(",") if mode in MODES]
+    missing = [engine for engine in engines if engine not in ParserBackend.available_engines()]
+    if missing:
+        print(f"Error: Parser engine(s) not installed: {', '.join(missing)}.")
+        return 2
+
+    print(f"{'Engine':<12} {'Mode':<8} {'Size':>8} {'Page':<6} {'Wall':>10} {'Rate':>14}  {'Peak RSS':>11}")
+    results = run_benchmark(sizes, engines, modes, args.repeat, args.answers)
+
+    document = {
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "extractor_version": HTML_Extract.EXTRACTOR_VERSION,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(document, file, indent=1)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,606 @@
+'''
+Canvas:   Quiz Extractor - Canvas API
+Brief:    Pulls quiz submission reports straight from the Canvas REST API
+          instead of saving each one by hand. Requests share a pool of
+          keep-alive connections, run concurrently while staying under the
+          Canvas rate limit, are revalidated with ETags, and paginate through
+          Link headers with a cursor that survives an interrupted run. The
+          reports go through the same extraction code as files in Input/.
+'''
+
+import os
+import re
+import json
+import time
+import gzip
+import queue
+import hashlib
+import itertools
+import threading
+import collections
+from urllib.parse import urlsplit, urlencode
+import FileProcess
+import BatchProcess
+import HTML_Extract
+import ParserBackend
+import ParseCache
+import QuizModel
+import QuizRender
+
+
+# Default locations of the HTTP cache and the resume state
+HTTP_CACHE_FOLDER = ".canvas_cache"
+STATE_FILE = os.path.join(FileProcess.OUTPUT_FOLDER, ".canvas_state.json")
+
+# Concurrent requests, each on its own pooled connection
+CONNECTIONS = 4
+
+# Items requested per page (Canvas allows up to 100)
+PER_PAGE = 50
+
+# Seconds before a request times out
+TIMEOUT = 30
+
+# Attempts at a throttled or failed request, and the first backoff delay
+RETRIES = 5
+BACKOFF_SECONDS = 1.0
+
+# Canvas' rate limit bucket holds 700 units; slow down once fewer than this remain
+THROTTLE_BELOW = 300
+
+# Longest gap between request starts when the bucket is nearly empty
+MAX_THROTTLE_DELAY = 1.0
+
+# Submission states that have a gradable report
+SUBMITTED_STATES = ("complete", "pending_review")
+
+# rel="next" entry of a Link header
+LINK_NEXT = re.compile(r'<([^>]*)>\s*;\s*rel="?next"?')
+
+
+class CanvasError(Exception):
+    """A Canvas request failed (bad status, or still throttled after every retry)."""
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one Canvas host, shared between threads.
+
+    A connection is taken from the pool for one request and handed back once
+    its response has been read, so each thread reuses an open connection
+    instead of paying for a new TCP (and TLS) handshake per request.
+
+    Attributes:
+        created (int): Connections opened so far.
+    """
+
+    def __init__(self, base_url, size=CONNECTIONS, timeout=TIMEOUT):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            raise ValueError(f"Invalid Canvas URL '{base_url}'. Use e.g. https://canvas.example.edu")
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(size)
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        import http.client
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        with self.lock:
+            self.created += 1
+        return connection_class(self.host, timeout=self.timeout)
+
+    def request(self, target, headers):
+        """
+        Sends a GET request on a pooled connection.
+
+        Args:
+            target (str): Path and query string.
+            headers (dict): Request headers.
+
+        Returns:
+            tuple: (status, response headers, body bytes).
+        """
+        import http.client
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+
+        try:
+            try:
+                connection.request("GET", target, headers=headers)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server dropped an idle keep-alive connection: GET is safe to resend
+                connection.close()
+                connection = self._connect()
+                connection.request("GET", target, headers=headers)
+                response = connection.getresponse()
+            body = response.read()
+        except BaseException:
+            connection.close()
+            raise
+
+        if response.will_close:
+            connection.close()  # Reopened automatically if it is used again
+        try:
+            self.idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+        return response.status, response.headers, body
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class Throttle:
+    """
+    Keeps concurrent requests under the Canvas rate limit.
+
+    Canvas reports what is left in the caller's rate limit bucket in the
+    X-Rate-Limit-Remaining header. Once it drops below THROTTLE_BELOW (or
+    below half the largest level seen, for smaller buckets) requests are
+    given start times further and further apart, shared by every thread, and
+    a throttled (403/429) reply holds every request for the backoff delay.
+
+    Attributes:
+        waited (float): Seconds requests have spent waiting, over all threads.
+    """
+
+    def __init__(self, low_water=THROTTLE_BELOW, max_delay=MAX_THROTTLE_DELAY):
+        self.low_water = low_water
+        self.max_delay = max_delay
+        self.remaining = None
+        self.highest = 0.0
+        self.next_start = 0.0
+        self.resume_at = 0.0
+        self.waited = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Sleeps until this request's turn under the current rate limit state."""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.resume_at)
+            threshold = min(self.low_water, self.highest / 2)
+            if self.remaining is not None and self.remaining < threshold:
+                # Space requests out in proportion to how empty the bucket is
+                start = max(start, self.next_start)
+                self.next_start = start + self.max_delay * (1 - max(self.remaining, 0) / threshold)
+            delay = start - now
+            if delay > 0:
+                self.waited += delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, headers):
+        """Records the bucket level reported by a response."""
+        value = headers.get("X-Rate-Limit-Remaining")
+        if value:
+            try:
+                remaining = float(value)
+            except ValueError:
+                return
+            with self.lock:
+                self.remaining = remaining
+                self.highest = max(self.highest, remaining)
+
+    def back_off(self, seconds):
+        """Holds every request for the given number of seconds."""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+
+class HttpCache:
+    """
+    Responses kept on disk with their ETag and Last-Modified validators.
+
+    A cached URL is requested with If-None-Match / If-Modified-Since; when
+    Canvas answers 304 Not Modified the stored body is used and nothing is
+    downloaded again.
+    """
+
+    def __init__(self, folder=HTTP_CACHE_FOLDER):
+        self.folder = folder
+
+    def _paths(self, target):
+        key = hashlib.sha256(target.encode("utf-8")).hexdigest()
+        return os.path.join(self.folder, key + ".json"), os.path.join(self.folder, key + ".body")
+
+    def lookup(self, target):
+        """
+        Returns:
+            dict | None: "etag", "last_modified" and "link" of the cached
+                         response for target, or None if there is none.
+        """
+        meta_path, body_path = self._paths(target)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        # Without its body a validator is useless: fetch the response again
+        return meta if os.path.exists(body_path) else None
+
+    def load(self, target):
+        """
+        Returns:
+            bytes | None: The cached body, or None if it has gone missing.
+        """
+        _meta_path, body_path = self._paths(target)
+        try:
+            with open(body_path, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def store(self, target, headers, body):
+        """Caches a response if Canvas sent a validator for it."""
+        meta = {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified"),
+                "link": headers.get("Link")}
+        if not (meta["etag"] or meta["last_modified"]):
+            return
+        meta_path, body_path = self._paths(target)
+        # Body first, so a stored validator always has its body
+        FileProcess.write_atomic(body_path, body)
+        FileProcess.write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+
+class FetchState:
+    """
+    What a fetch has done so far, saved so an interrupted run can resume.
+
+    Attributes:
+        cursors (dict): URL of the first page not fully processed, per listing.
+        done (dict): Output file of every converted submission, keyed by
+            "course:quiz:submission:attempt".
+    """
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self.cursors = {}
+        self.done = {}
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+            self.cursors = state.get("cursors", {})
+            self.done = state.get("done", {})
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError):
+            print(f"Warning: Ignoring the unreadable fetch state file '{path}'.")
+
+    def set_cursor(self, listing, url):
+        if url is None:
+            self.cursors.pop(listing, None)
+        else:
+            self.cursors[listing] = url
+        self.save()
+
+    def save(self):
+        state = {"cursors": self.cursors, "done": self.done}
+        FileProcess.write_atomic(self.path, json.dumps(state, indent=1, sort_keys=True).encode("utf-8"))
+
+
+class CanvasClient:
+    """
+    Minimal Canvas REST API client.
+
+    Attributes:
+        pool (ConnectionPool): Shared keep-alive connections.
+        throttle (Throttle): Rate limit state shared by every request.
+        cache (HttpCache | None): Conditional request cache.
+        stats (dict): "requests", "not_modified", "retries" and "bytes" received.
+    """
+
+    def __init__(self, base_url, token=None, connections=CONNECTIONS, cache_folder=HTTP_CACHE_FOLDER,
+                 per_page=PER_PAGE):
+        self.pool = ConnectionPool(base_url, connections)
+        self.throttle = Throttle()
+        self.cache = HttpCache(cache_folder) if cache_folder else None
+        self.token = token
+        self.per_page = per_page
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0, "bytes": 0}
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.pool.close()
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def _target(self, url, params=None):
+        """Turns an API path or a URL on the Canvas host into a request target."""
+        parts = urlsplit(url)
+        if parts.netloc and parts.netloc != self.pool.host:
+            raise CanvasError(f"Refusing to follow {url}: not on {self.pool.host}.")
+        target = parts.path if parts.netloc or parts.path.startswith(self.pool.prefix + "/") else self.pool.prefix + parts.path
+        query = "&".join(part for part in (parts.query, urlencode(params or {})) if part)
+        return f"{target}?{query}" if query else target
+
+    def fetch(self, url, params=None):
+        """
+        GETs a URL, revalidating a cached copy and retrying throttled requests.
+
+        Args:
+            url (str): API path (e.g. "/api/v1/courses/1") or absolute URL
+                on the Canvas host.
+            params (dict, optional): Query parameters to add.
+
+        Returns:
+            tuple: (body bytes, Link header or None).
+
+        Raises:
+            CanvasError: If Canvas answers with an error, or is still
+                throttling after every retry.
+        """
+        target = self._target(url, params)
+        headers = {"Accept-Encoding": "gzip", "User-Agent": "CanvasQuizExtractor"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        cached = self.cache.lookup(target) if self.cache else None
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        for attempt in range(RETRIES + 1):
+            self.throttle.wait()
+            status, response_headers, body = self.pool.request(target, headers)
+            self._count("requests")
+            self.throttle.update(response_headers)
+            throttled = status == 429 or (status == 403 and b"Rate Limit Exceeded" in body)
+            if not (throttled or status >= 500) or attempt == RETRIES:
+                break
+            # Throttled or a transient server error: back off, doubling each time
+            self._count("retries")
+            try:
+                delay = float(response_headers.get("Retry-After", ""))
+            except ValueError:
+                delay = BACKOFF_SECONDS * 2 ** attempt
+            self.throttle.back_off(delay)
+
+        if status == 304 and cached:
+            body = self.cache.load(target)
+            if body is not None:
+                self._count("not_modified")
+                return body, cached.get("link")
+        if status != 200:
+            message = body.decode("utf-8", "replace").strip()[:200]
+            raise CanvasError(f"GET {target} returned HTTP {status}: {message}")
+
+        if response_headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        self._count("bytes", len(body))
+        if self.cache:
+            self.cache.store(target, response_headers, body)
+        return body, response_headers.get("Link")
+
+    def get_json(self, url, params=None):
+        """GETs an API URL and decodes its JSON body."""
+        body, _link = self.fetch(url, params)
+        return json.loads(body)
+
+    def iter_pages(self, path, params=None, items_key=None, state=None, listing=None):
+        """
+        Streams a paginated listing one page at a time, following the Link
+        header's rel="next" URL.
+
+        With a FetchState, the URL of the page being processed is saved under
+        `listing` and only moves on once the caller asks for the next page, so
+        an interrupted run resumes at the first page it had not finished.
+
+        Args:
+            path (str): API path of the listing.
+            params (dict, optional): Query parameters of the first page.
+            items_key (str, optional): Key holding the items when the page is
+                a JSON object rather than a list (e.g. "quiz_submissions").
+            state (FetchState, optional): Where the cursor is saved.
+            listing (str, optional): Name of the cursor in state.
+
+        Yields:
+            list: The items of each page.
+        """
+        url = state.cursors.get(listing) if state else None
+        if url is None:
+            url = self._target(path, {"per_page": self.per_page, **(params or {})})
+        while url:
+            if state:
+                state.set_cursor(listing, url)
+            body, link = self.fetch(url)
+            page = json.loads(body)
+            yield page.get(items_key, []) if items_key else page
+            match = LINK_NEXT.search(link or "")
+            url = match.group(1) if match else None
+        if state:
+            state.set_cursor(listing, None)
+
+
+def _list_reports(client, course_id, quiz):
+    """
+    Lists the submitted reports of one quiz. Runs in the request threads.
+
+    Returns:
+        list: (done key, report URL, quiz number) of each submission.
+    """
+    quiz_number = FileProcess.UNSAFE_NAME.sub(" ", str(quiz.get("title") or quiz["id"])).strip()
+    path = f"/api/v1/courses/{course_id}/quizzes/{quiz['id']}/submissions"
+    reports = []
+    for submissions in client.iter_pages(path, items_key="quiz_submissions"):
+        for submission in submissions:
+            if submission.get("workflow_state") not in SUBMITTED_STATES:
+                continue
+            attempt = submission.get("attempt")
+            report_url = submission.get("html_url") or (
+                f"/courses/{course_id}/quizzes/{quiz['id']}/history"
+                f"?quiz_submission_id={submission['id']}&version={attempt}"
+            )
+            reports.append((f"{course_id}:{quiz['id']}:{submission['id']}:{attempt}", report_url, quiz_number))
+    return reports
+
+
+def _download(client, done_key, report_url, quiz_number):
+    """Fetches one submission report. Runs in the request threads."""
+    import http.client
+    start = time.perf_counter()
+    try:
+        body, _link = client.fetch(report_url)
+        return done_key, report_url, quiz_number, body, None, start
+    except (CanvasError, OSError, http.client.HTTPException) as error:
+        return done_key, report_url, quiz_number, None, f"{type(error).__name__}: {error}", start
+
+
+def _fetch_reports(pool, client, reports, window):
+    """
+    Downloads reports in the pool, yielding them in order. At most `window`
+    downloads are in flight or waiting to be parsed, so memory stays bounded
+    however many submissions a course has.
+    """
+    reports = iter(reports)
+    in_flight = collections.deque(
+        pool.submit(_download, client, *report) for report in itertools.islice(reports, window)
+    )
+    while in_flight:
+        result = in_flight.popleft().result()
+        for report in itertools.islice(reports, 1):
+            in_flight.append(pool.submit(_download, client, *report))
+        yield result
+
+
+def fetch_course(base_url, course_id, token=None, quiz_ids=None, class_name=None, engine=None, cache=None,
+                 export_formats=None, export_path=None, bank_path=None, connections=CONNECTIONS,
+                 per_page=PER_PAGE, http_cache=HTTP_CACHE_FOLDER, state_path=STATE_FILE):
+    """
+    Downloads and converts every submitted quiz report of a course.
+
+    Quizzes and their submissions are listed through the API; each
+    submission's report page (the one otherwise saved by hand) is downloaded
+    by `connections` threads while the reports already downloaded are parsed,
+    written to the Output folder and handed to the exporters and question
+    bank. Submissions converted by an earlier run are skipped.
+
+    Args:
+        base_url (str): Canvas address, e.g. "https://canvas.example.edu".
+        course_id (int): Canvas course id.
+        token (str, optional): Canvas API access token.
+        quiz_ids (list, optional): Only fetch these quizzes.
+        class_name (str, optional): Class name for the outputs. Defaults to
+            the course code.
+        engine, cache, export_formats, export_path, bank_path: See
+            BatchProcess.run_batch.
+        connections (int, optional): Concurrent requests.
+        per_page (int, optional): Items per listing page.
+        http_cache (str, optional): HttpCache folder, None to disable.
+        state_path (str, optional): FetchState file.
+
+    Returns:
+        int: 0 if every submission was converted, 1 otherwise.
+    """
+    # Imported here rather than at the top so the CLI starts quickly when not fetching
+    import http.client
+    from concurrent.futures import ThreadPoolExecutor
+    client = CanvasClient(base_url, token, connections, http_cache, per_page)
+    engine = ParserBackend.resolve_engine(engine)
+    parse_cache = ParseCache.ParseCache(**cache) if cache else None
+    state = FetchState(state_path)
+    sink = BatchProcess.RecordSink(export_formats, export_path, bank_path)
+    reserved = set()
+    results = []
+    start = time.perf_counter()
+    print(f"Fetching course {course_id} from {base_url} with {connections} connection(s) "
+          f"using the {engine} parser...\n")
+
+    try:
+        if not class_name:
+            course = client.get_json(f"/api/v1/courses/{course_id}")
+            class_name = course.get("course_code") or course.get("name") or f"Course {course_id}"
+        class_name = FileProcess.UNSAFE_NAME.sub(" ", str(class_name)).strip()
+
+        with ThreadPoolExecutor(connections) as pool:
+            quiz_pages = client.iter_pages(f"/api/v1/courses/{course_id}/quizzes", state=state,
+                                           listing=f"{course_id}:quizzes")
+            for quizzes in quiz_pages:
+                quizzes = [quiz for quiz in quizzes if not quiz_ids or quiz["id"] in quiz_ids]
+                # List the submissions of every quiz on the page at once
+                listed = pool.map(lambda quiz: _list_reports(client, course_id, quiz), quizzes)
+                pending = [report for reports in listed for report in reports if report[0] not in state.done]
+
+                # Parse each report here while the next ones download
+                for done_key, report_url, quiz_number, body, error, job_start in _fetch_reports(
+                        pool, client, pending, connections * 2):
+                    job = {"input": report_url, "quiz_number": quiz_number, "class_name": class_name,
+                           "output": FileProcess.auto_output_file(quiz_number, class_name, reserved)}
+                    reserved.add(job["output"])
+                    result = convert_report(job, body, error, engine, parse_cache, bool(sink))
+                    result["seconds"] = time.perf_counter() - job_start
+                    BatchProcess.print_result(result)
+                    sink(job, result)
+                    result["quiz"] = None
+                    results.append(result)
+                    if result["status"] == "ok":
+                        state.done[done_key] = result["output"]
+                state.save()
+    except (CanvasError, OSError, http.client.HTTPException, ValueError) as error:
+        print(f"\nError: {error}")
+        print("Run the same command again to resume where this run stopped.")
+        results.append({"input": base_url, "output": None, "questions": 0, "status": "failed",
+                        "error": f"{type(error).__name__}: {error}", "cache": None})
+    finally:
+        client.close()
+        sink.close()
+        state.save()
+
+    BatchProcess.print_summary(results, time.perf_counter() - start)
+    stats = client.stats
+    print(f"HTTP:            {stats['requests']} request(s) on {client.pool.created} connection(s), "
+          f"{stats['not_modified']} not modified, {stats['retries']} retried, "
+          f"{stats['bytes'] / 1024:.0f} KiB downloaded, {client.throttle.waited:.1f}s rate limit waits")
+    sink.print_summary()
+    return 0 if all(r["status"] == "ok" for r in results) else 1
+
+
+def convert_report(job, body, error, engine=None, cache=None, keep_records=False):
+    """
+    Extracts a downloaded report and writes its text output, like
+    BatchProcess.process_job does for a file.
+
+    Args:
+        job (dict): "input" (the report URL), "output", "quiz_number" and "class_name".
+        body (bytes | None): The report HTML, None if the download failed.
+        error (str | None): Why the download failed.
+        engine (str, optional): Parser engine.
+        cache (ParseCache, optional): Cache of extracted question records.
+        keep_records (bool, optional): Return the extracted quiz with the result.
+
+    Returns:
+        dict: A result in the shape BatchProcess.print_result expects.
+    """
+    result = {"input": job["input"], "output": job["output"], "questions": 0, "error": error,
+              "cache": None, "quiz": None, "status": "failed"}
+    if body is None:
+        return result
+    try:
+        digest = hashlib.sha256(body).hexdigest()
+        hits = cache.hits if cache else 0
+        quiz = HTML_Extract.extract_quiz_data(body, QuizModel.METHOD_TAKEN, engine, cache, job["input"], digest)
+        result["questions"] = QuizRender.write_text(
+            quiz.questions, quiz.method, job["output"], job["quiz_number"], job["class_name"]
+        )
+        result["status"] = "ok"
+        if cache:
+            result["cache"] = "hit" if cache.hits > hits else "miss"
+        if keep_records:
+            result.update(quiz=quiz, content_hash=digest)
+    except Exception as exception:
+        result["error"] = f"{type(exception).__name__}: {exception}"
+    return result
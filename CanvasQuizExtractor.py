@@ -7,10 +7,47 @@ Date:     2025-04-12
 '''
 
 import os
+import json
+import time
+import sys
+import argparse
+import functools
+import importlib.util
 from datetime import datetime
-from bs4 import BeautifulSoup
 import HTML_Extract
 import FileProcess
+import BatchProcess
+import ParserBackend
+import ParseCache
+import QuizModel
+import QuizExport
+import QuestionBank
+import WatchMode
+import MergeMode
+import DiffMode
+import AsyncPipeline
+import CanvasAPI
+import Instrumentation
+
+
+# Manifest "run" options and the "batch" option each one sets
+RUN_SETTINGS = {
+    "input": "input_folder",
+    "workers": "workers",
+    "parser": "engine",
+    "async": "use_async",
+    "queue_size": "queue_size",
+    "cache_size": "cache_size",
+    "no_cache": "no_cache",
+    "cache_dir": "cache_dir",
+    "export": "export",
+    "export_path": "export_path",
+    "bank": "bank",
+    "journal": "journal",
+    "infer": "infer",
+    "on_exists": "on_exists",
+    "output_archive": "output_archive",
+}
 
 
 # Function to read class info from CurrentClasses.txt
@@ -51,26 +88,34 @@ def choose_quiz_and_class():
                and the extra information (str, optional).
     """
     classes = read_classes_from_file("CurrentClasses.txt")
-    print("Available options:")
-    
-    # Option 0 is for entering manually
-    print("0. Enter class info manually")
 
-    if classes:
-        for idx, class_info in enumerate(classes, 1):
-            print(f"{idx}. {class_info}")
+    # Ask again until a listed option is chosen
+    while True:
+        print("Available options:")
 
-    choice = int(input("\nSelect a class by number: "))
+        # Option 0 is for entering manually
+        print("0. Enter class info manually")
 
-    if choice == 0:
-        class_name = input("Enter the class name manually: ")
-        quiz_number = input("Enter the quiz number: ")
-    elif 1 <= choice <= len(classes):
-        class_name = classes[choice - 1]
-        quiz_number = input(f"Enter the quiz number for {class_name}: ")
-    else:
-        print("Invalid selection. Please try again.")
-        return choose_quiz_and_class()
+        if classes:
+            for idx, class_info in enumerate(classes, 1):
+                print(f"{idx}. {class_info}")
+
+        try:
+            choice = int(input("\nSelect a class by number: "))
+        except ValueError:
+            print("Invalid input. Please enter a number.")
+            continue
+
+        if choice == 0:
+            class_name = input("Enter the class name manually: ")
+            quiz_number = input("Enter the quiz number: ")
+            break
+        elif 1 <= choice <= len(classes):
+            class_name = classes[choice - 1]
+            quiz_number = input(f"Enter the quiz number for {class_name}: ")
+            break
+        else:
+            print("Invalid selection. Please try again.")
 
     # Ask if there is any extra information after the quiz number
     while True:
@@ -115,10 +160,10 @@ def choose_extraction_method():
         except ValueError:
             print("Invalid input. Please enter a number.")
 
-# Main function to process the file
-def main():
+# Interactive mode to process a single file
+def run_interactive():
     """
-    Main function to drive the process of selecting a file and generating the output file.
+    Drives the interactive process of selecting a file and generating the output file.
 
     This function orchestrates the workflow: listing available files, allowing the user to
     choose an input file, entering quiz number and class name, selecting the extraction method,
@@ -145,5 +190,656 @@ def main():
             print("ERROR - No matching Extraction Method")
 
 
+def build_parser(run_defaults=None):
+    """
+    Builds the command line parser.
+
+    Running without a subcommand starts the interactive prompts. The "batch"
+    subcommand converts every report in the Input folder and "convert" the
+    files named on the command line, both without prompting.
+
+    Args:
+        run_defaults (dict, optional): Option defaults of "batch" taken from
+            the "run" section of a manifest (see load_run_defaults).
+
+    Returns:
+        argparse.ArgumentParser: The configured parser.
+    """
+    parser = argparse.ArgumentParser(
+        description="Extract Canvas quiz reports into easy to read text documents."
+    )
+    parser.add_argument("--metrics", action="store_true",
+                        help=f"Record stage timings, counters and peak memory in a JSON file "
+                             f"in {Instrumentation.METRICS_FOLDER}.")
+    parser.add_argument("--metrics-file", help="Write the --metrics JSON to this file instead.")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Profile the run and write the dump to {Instrumentation.METRICS_FOLDER}.")
+    parser.add_argument("--profiler", default="cprofile", choices=("cprofile", "pyinstrument"),
+                        help="Profiler used by --profile (default: cprofile).")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser("batch", help="Convert every report in the Input folder without prompts.")
+    batch.add_argument("--workers", type=int, default=None,
+                       help="Number of worker processes (default: number of CPUs).")
+    batch.add_argument("--manifest",
+                       help="JSON, TOML or YAML manifest mapping files to class, quiz and method, "
+                            "and setting batch options in its \"run\" section.")
+    batch.add_argument("--method", default="taken", choices=sorted(BatchProcess.EXTRACTION_METHODS),
+                       help="Default extraction method (default: taken).")
+    batch.add_argument("--class", dest="class_name", help="Default class name for every file.")
+    batch.add_argument("--input", dest="input_folder", default=FileProcess.INPUT_FOLDER,
+                       help=f"Directory to search for reports (default: {FileProcess.INPUT_FOLDER}).")
+    batch.add_argument("--parser", dest="engine", default="auto", choices=("auto",) + ParserBackend.ENGINES,
+                       help="HTML parser engine (default: fastest installed).")
+    batch.add_argument("--no-cache", action="store_true",
+                       help="Always parse reports; do not read or write the parse cache.")
+    batch.add_argument("--rebuild-cache", action="store_true",
+                       help="Parse every report again and refresh its cache entry.")
+    batch.add_argument("--cache-dir", default=ParseCache.CACHE_FOLDER,
+                       help=f"Parse cache directory (default: {ParseCache.CACHE_FOLDER}).")
+    batch.add_argument("--cache-size", type=int, default=ParseCache.DEFAULT_MAX_BYTES // (1024 * 1024),
+                       help="Parse cache size limit in MB; least recently used entries are evicted.")
+    batch.add_argument("--export", default="",
+                       help=f"Comma-separated export formats produced from the same parse "
+                            f"({', '.join(QuizExport.EXPORTERS)}).")
+    batch.add_argument("--export-path", default=os.path.join(FileProcess.OUTPUT_FOLDER, "export"),
+                       help="Base path of the export files, without extension (default: Output/export).")
+    batch.add_argument("--bank", nargs="?", const=QuestionBank.BANK_FILE, default=None,
+                       help=f"Merge every report into the question bank (default: {QuestionBank.BANK_FILE}).")
+    batch.add_argument("--output-archive",
+                       help="Move every output file into this zip archive as it is written.")
+    batch.add_argument("--async", dest="use_async", action="store_true",
+                       help="Overlap file reads, parsing and writes in an asyncio pipeline.")
+    batch.add_argument("--queue-size", type=int, default=AsyncPipeline.QUEUE_SIZE,
+                       help=f"Async mode: reports buffered between stages (default: {AsyncPipeline.QUEUE_SIZE}).")
+    batch.add_argument("--watch", action="store_true",
+                       help="Keep running and convert new or modified reports as they arrive.")
+    batch.add_argument("--state", default=WatchMode.STATE_FILE,
+                       help=f"Watch mode state file (default: {WatchMode.STATE_FILE}).")
+    batch.add_argument("--poll", action="store_true",
+                       help="Watch mode: poll the input folder instead of using inotify.")
+    batch.add_argument("--resume", action="store_true",
+                       help="Continue an interrupted run: skip the reports the journal shows are converted.")
+    batch.add_argument("--journal", default=BatchProcess.JOURNAL_FILE,
+                       help=f"Batch journal file (default: {BatchProcess.JOURNAL_FILE}).")
+    add_naming_options(batch)
+    if run_defaults:
+        batch.set_defaults(**run_defaults)
+
+    convert = subparsers.add_parser("convert", help="Convert the given reports without prompts.")
+    convert.add_argument("files", nargs="+",
+                         help="HTML reports to convert: files, zip or tar archives (every report inside) "
+                              "or archive members written ARCHIVE::MEMBER.")
+    convert.add_argument("--method", default="taken", choices=sorted(BatchProcess.EXTRACTION_METHODS),
+                         help="Extraction method (default: taken).")
+    convert.add_argument("--class", dest="class_name", help="Class name (default: from the report's title).")
+    convert.add_argument("--quiz", dest="quiz_number", help="Quiz number (default: from the title or file name).")
+    convert.add_argument("--output", help="Output file; only with a single report (default: Output/Quiz ...).")
+    convert.add_argument("--output-archive",
+                         help="Move every output file into this zip archive as it is written.")
+    convert.add_argument("--manifest", help="JSON, TOML or YAML manifest with per-file class, quiz and method.")
+    convert.add_argument("--parser", dest="engine", default="auto", choices=("auto",) + ParserBackend.ENGINES,
+                         help="HTML parser engine (default: fastest installed).")
+    convert.add_argument("--workers", type=int, default=1,
+                         help="Number of worker processes (default: 1).")
+    convert.add_argument("--no-cache", action="store_true",
+                         help="Always parse reports; do not read or write the parse cache.")
+    convert.add_argument("--cache-dir", default=ParseCache.CACHE_FOLDER,
+                         help=f"Parse cache directory (default: {ParseCache.CACHE_FOLDER}).")
+    add_naming_options(convert)
+
+    diff = subparsers.add_parser("diff", help="Convert a retaken quiz, re-extracting only the questions that "
+                                              "changed since the previous attempt.")
+    diff.add_argument("file", help="HTML report of the new attempt, or an archive member (ARCHIVE::MEMBER).")
+    diff.add_argument("--method", default="taken", choices=sorted(BatchProcess.EXTRACTION_METHODS),
+                      help="Extraction method (default: taken).")
+    diff.add_argument("--class", dest="class_name", help="Class name (default: from the report's title).")
+    diff.add_argument("--quiz", dest="quiz_number", help="Quiz number (default: from the title or file name).")
+    diff.add_argument("--output", help="Output file (default: Output/Quiz ...).")
+    diff.add_argument("--parser", dest="engine", default="auto", choices=("auto",) + ParserBackend.ENGINES,
+                      help="HTML parser engine (default: fastest installed).")
+    diff.add_argument("--store", default=DiffMode.STORE_FOLDER,
+                      help=f"Folder of stored attempts (default: {DiffMode.STORE_FOLDER}).")
+    add_naming_options(diff)
+
+    merge = subparsers.add_parser("merge", help="Merge every report of a class into one de-duplicated study document.")
+    merge.add_argument("--class", dest="class_names", action="append",
+                       help=f"Class to merge; repeat for several (default: every class in {MergeMode.CLASSES_FILE}).")
+    merge.add_argument("--classes-file", default=MergeMode.CLASSES_FILE,
+                       help=f"File listing the classes, one per line (default: {MergeMode.CLASSES_FILE}).")
+    merge.add_argument("--input", dest="input_folder", default=FileProcess.INPUT_FOLDER,
+                       help=f"Directory of reports (default: {FileProcess.INPUT_FOLDER}).")
+    merge.add_argument("--output", help="Study document path; only with a single class "
+                                        "(default: Output/Study Guide - CLASS - DATE.txt).")
+    merge.add_argument("--workers", type=int, default=None,
+                       help="Number of worker processes (default: number of CPUs).")
+    merge.add_argument("--manifest", help="JSON, TOML or YAML manifest with per-file class, quiz and method.")
+    merge.add_argument("--method", default="taken", choices=sorted(BatchProcess.EXTRACTION_METHODS),
+                       help="Default extraction method (default: taken).")
+    merge.add_argument("--parser", dest="engine", default="auto", choices=("auto",) + ParserBackend.ENGINES,
+                       help="HTML parser engine (default: fastest installed).")
+    merge.add_argument("--no-cache", action="store_true",
+                       help="Always parse reports; do not read or write the parse cache.")
+    merge.add_argument("--cache-dir", default=ParseCache.CACHE_FOLDER,
+                       help=f"Parse cache directory (default: {ParseCache.CACHE_FOLDER}).")
+    add_naming_options(merge)
+
+    bank = subparsers.add_parser("bank", help="Manage the question bank.")
+    bank.add_argument("--path", default=QuestionBank.BANK_FILE,
+                      help=f"Question bank database (default: {QuestionBank.BANK_FILE}).")
+    bank_commands = bank.add_subparsers(dest="bank_command", required=True)
+    ingest = bank_commands.add_parser("ingest", help="Merge reports into the question bank.")
+    ingest.add_argument("files", nargs="+", help="HTML reports to ingest.")
+    ingest.add_argument("--class", dest="class_name", required=True, help="Class the reports belong to.")
+    ingest.add_argument("--quiz", dest="quiz_number", help="Quiz number (default: the file name).")
+    ingest.add_argument("--method", default="taken", choices=sorted(BatchProcess.EXTRACTION_METHODS),
+                        help="Extraction method (default: taken).")
+    bank_commands.add_parser("stats", help="Show per-class statistics for the classes in CurrentClasses.txt.")
+
+    fetch = subparsers.add_parser("fetch", help="Download and convert a course's quiz submissions from Canvas.")
+    fetch.add_argument("--url", default=os.environ.get("CANVAS_URL"),
+                       help="Canvas address, e.g. https://canvas.example.edu (default: $CANVAS_URL).")
+    fetch.add_argument("--token", default=os.environ.get("CANVAS_TOKEN"),
+                       help="Canvas API access token (default: $CANVAS_TOKEN).")
+    fetch.add_argument("--course", type=int, required=True, help="Canvas course id.")
+    fetch.add_argument("--quiz", dest="quiz_ids", type=int, action="append",
+                       help="Only fetch this quiz id (repeat for several).")
+    fetch.add_argument("--class", dest="class_name", help="Class name for the outputs (default: the course code).")
+    fetch.add_argument("--parser", dest="engine", default="auto", choices=("auto",) + ParserBackend.ENGINES,
+                       help="HTML parser engine (default: fastest installed).")
+    fetch.add_argument("--connections", type=int, default=CanvasAPI.CONNECTIONS,
+                       help=f"Concurrent requests (default: {CanvasAPI.CONNECTIONS}).")
+    fetch.add_argument("--per-page", type=int, default=CanvasAPI.PER_PAGE,
+                       help=f"Items per listing page (default: {CanvasAPI.PER_PAGE}).")
+    fetch.add_argument("--http-cache", default=CanvasAPI.HTTP_CACHE_FOLDER,
+                       help=f"ETag cache of downloaded pages (default: {CanvasAPI.HTTP_CACHE_FOLDER}).")
+    fetch.add_argument("--no-http-cache", action="store_true", help="Download every page again.")
+    fetch.add_argument("--state", default=CanvasAPI.STATE_FILE,
+                       help=f"Resume state file (default: {CanvasAPI.STATE_FILE}).")
+    fetch.add_argument("--no-cache", action="store_true",
+                       help="Always parse reports; do not read or write the parse cache.")
+    fetch.add_argument("--cache-dir", default=ParseCache.CACHE_FOLDER,
+                       help=f"Parse cache directory (default: {ParseCache.CACHE_FOLDER}).")
+    fetch.add_argument("--export", default="",
+                       help=f"Comma-separated export formats ({', '.join(QuizExport.EXPORTERS)}).")
+    fetch.add_argument("--export-path", default=os.path.join(FileProcess.OUTPUT_FOLDER, "export"),
+                       help="Base path of the export files, without extension (default: Output/export).")
+    fetch.add_argument("--bank", nargs="?", const=QuestionBank.BANK_FILE, default=None,
+                       help=f"Merge every report into the question bank (default: {QuestionBank.BANK_FILE}).")
+
+    search = subparsers.add_parser("search", help="Search the question bank.")
+    search.add_argument("query", nargs="+", help="Words to search for in the questions and answers.")
+    search.add_argument("--class", dest="class_name", help="Only show questions seen in this class.")
+    search.add_argument("--quiz", dest="quiz_number", help="Only show questions seen in this quiz.")
+    search.add_argument("--limit", type=int, default=10, help="Maximum number of results (default: 10).")
+    search.add_argument("--bank", default=QuestionBank.BANK_FILE,
+                        help=f"Question bank database (default: {QuestionBank.BANK_FILE}).")
+
+    analytics = subparsers.add_parser("analytics",
+                                      help="Summarize the scores of every taken report in the question bank.")
+    analytics.add_argument("--bank", default=QuestionBank.BANK_FILE,
+                           help=f"Question bank database (default: {QuestionBank.BANK_FILE}).")
+    analytics.add_argument("--class", dest="class_name", help="Only summarize this class.")
+    analytics.add_argument("--top", type=int, default=10, help="Most missed questions to list (default: 10).")
+    analytics.add_argument("--backend", choices=("auto", "numpy", "array"), default="auto",
+                           help="Column backend: NumPy when installed, or the standard array module (default: auto).")
+    analytics.add_argument("--json", dest="json_path", help="Also write the summary to this JSON file.")
+    return parser
+
+
+def add_naming_options(parser):
+    """Adds the options choosing output names to the "batch", "convert" or "merge" parser."""
+    parser.add_argument("--infer", default="title", choices=("title", "filename"),
+                        help="Take the quiz and class nobody set from the report's <title> (then its file "
+                             "name), or from the file name only (default: title).")
+    parser.add_argument("--on-exists", default="attempt", choices=FileProcess.ON_EXISTS_POLICIES,
+                        help="When the output file exists: add an \"Attempt N\" suffix, overwrite it, "
+                             "skip the report or fail it (default: attempt).")
+
+
+def load_run_defaults(manifest_path):
+    """
+    Reads the "run" section of a manifest as "batch" option defaults, e.g.
+    (TOML)::
+
+        [run]
+        input = "Input/CS-372"
+        workers = 4
+        on_exists = "overwrite"
+        export = ["jsonl", "csv"]
+
+    Options given on the command line still win.
+
+    Args:
+        manifest_path (str): Path to the manifest.
+
+    Returns:
+        dict: Option defaults keyed by argparse destination.
+
+    Raises:
+        ValueError: If the manifest cannot be read or names an unknown option.
+    """
+    run = BatchProcess.read_manifest(manifest_path).get("run") or {}
+    if not isinstance(run, dict):
+        raise ValueError(f"Invalid manifest '{manifest_path}': \"run\" must be a mapping.")
+    unknown = sorted(set(run) - set(RUN_SETTINGS))
+    if unknown:
+        raise ValueError(f"Unknown option(s) in the \"run\" section of '{manifest_path}': {', '.join(unknown)}. "
+                         f"Choose from: {', '.join(RUN_SETTINGS)}.")
+    defaults = {}
+    for name, value in run.items():
+        if name == "export" and isinstance(value, list):
+            value = ",".join(value)
+        elif name == "bank" and value is True:
+            value = QuestionBank.BANK_FILE
+        defaults[RUN_SETTINGS[name]] = value
+
+    # argparse does not check defaults against the choices of the option
+    choices = {"infer": ("title", "filename"), "on_exists": FileProcess.ON_EXISTS_POLICIES}
+    for name, allowed in choices.items():
+        if name in run and run[name] not in allowed:
+            raise ValueError(f"Invalid {name} '{run[name]}' in '{manifest_path}'. Choose from: {', '.join(allowed)}.")
+    return defaults
+
+
+def run_convert(args):
+    """
+    Runs the "convert" subcommand on the reports named on the command line.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        int: 0 if every report was converted or skipped, 1 if any failed, 2 on bad arguments.
+    """
+    missing = [path for path in args.files if not FileProcess.input_exists(path)]
+    if missing:
+        print(f"Error: No such report: {', '.join(missing)}")
+        return 2
+    files = []
+    for path in args.files:
+        if not FileProcess.is_archive(path):
+            files.append(path)
+            continue
+        # A whole archive stands for every report inside it
+        try:
+            files.extend(FileProcess.member_path(path, member) for member in FileProcess.list_archive(path))
+        except ValueError as error:
+            print(f"Error: {error}")
+            return 2
+    if args.output and len(files) > 1:
+        print("Error: --output can only be used with a single report.")
+        return 2
+    try:
+        engine = ParserBackend.resolve_engine(args.engine)
+        defaults, overrides = BatchProcess.load_defaults(args.method, args.class_name, args.manifest)
+    except ValueError as error:
+        print(error)
+        return 2
+    if args.quiz_number:
+        defaults["quiz"] = args.quiz_number
+
+    outputs = None
+    if args.output:
+        outputs = {files[0]: FileProcess.resolve_output_file(args.output, on_exists=args.on_exists)}
+    cache = None if args.no_cache else {"folder": args.cache_dir}
+    jobs = BatchProcess.build_jobs(files, "", defaults, overrides, engine, cache, outputs=outputs,
+                                   infer=args.infer, on_exists=args.on_exists)
+    jobs, results = BatchProcess.apply_exists_policy(jobs)
+    for result in results:
+        BatchProcess.print_result(result)
+    start = time.perf_counter()
+    archive = FileProcess.OutputArchive(args.output_archive) if args.output_archive else None
+    try:
+        results += BatchProcess.run_jobs(jobs, args.workers, on_result=archive)
+    except BaseException:
+        if archive:
+            archive.close(discard=True)
+        raise
+    if archive:
+        archive.close()
+    if len(results) > 1:
+        BatchProcess.print_summary(results, time.perf_counter() - start)
+    if archive:
+        print(f"Archived {archive.count} output file(s): {archive.path}")
+    return 0 if all(r["status"] in ("ok", "skipped") for r in results) else 1
+
+
+def run_diff(args):
+    """
+    Runs the "diff" subcommand: converts a retaken quiz against its stored previous attempt.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        int: The process exit status.
+    """
+    if not FileProcess.input_exists(args.file):
+        print(f"Error: No such report: {args.file}")
+        return 2
+    try:
+        engine = ParserBackend.resolve_engine(args.engine)
+    except ValueError as error:
+        print(error)
+        return 2
+    metadata = {}
+    if not (args.class_name and args.quiz_number):
+        metadata = FileProcess.infer_metadata(args.file, use_title=args.infer == "title")
+    class_name = args.class_name or metadata.get("class") or "Unknown Class"
+    quiz_number = args.quiz_number or metadata["quiz"]
+
+    if args.output:
+        output_path = FileProcess.resolve_output_file(args.output, on_exists=args.on_exists)
+    else:
+        output_path = FileProcess.auto_output_file(quiz_number, class_name, on_exists=args.on_exists)
+    if args.on_exists in ("skip", "fail") and os.path.exists(output_path):
+        print(f"{args.file}: {output_path} already exists")
+        return 1 if args.on_exists == "fail" else 0
+    method = QuizModel.METHOD_TAKEN if args.method == "taken" else QuizModel.METHOD_UNTAKEN
+    return DiffMode.run_diff(args.file, output_path, quiz_number, class_name, method, engine, args.store)
+
+
+def run_merge(args):
+    """
+    Runs the "merge" subcommand: one study document per class.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        int: The process exit status.
+    """
+    class_names = args.class_names or read_classes_from_file(args.classes_file)
+    if not class_names:
+        print("Error: No classes to merge. Use --class or list them in " + args.classes_file + ".")
+        return 2
+    if args.output and len(class_names) > 1:
+        print("Error: --output can only be used with a single class.")
+        return 2
+    try:
+        engine = ParserBackend.resolve_engine(args.engine)
+    except ValueError as error:
+        print(error)
+        return 2
+    return MergeMode.run_merge(
+        class_names, args.input_folder, args.workers, args.manifest, args.method, engine,
+        None if args.no_cache else {"folder": args.cache_dir}, args.infer, args.output, args.on_exists,
+    )
+
+
+def run_search(args):
+    """
+    Runs the "search" subcommand and prints the best matching questions.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        int: 0 if any question matched, 1 otherwise.
+    """
+    if not os.path.exists(args.bank):
+        print(f"Error: The question bank '{args.bank}' does not exist. Build it with 'batch --bank' or 'bank ingest'.")
+        return 1
+
+    with QuestionBank.QuestionBank(args.bank) as bank:
+        start = time.perf_counter()
+        results = bank.search(" ".join(args.query), args.class_name, args.quiz_number, args.limit)
+        elapsed = time.perf_counter() - start
+
+        for rank, (question_id, question_text, seen, correct, best_answer) in enumerate(results, start=1):
+            print(f"{'-' * 40}\n{rank}. {question_text}")
+            sources = ", ".join(f"Quiz {quiz} - {class_name}" for class_name, quiz in bank.sources(question_id))
+            print(f"   Seen {seen}x, correct {correct}x in: {sources}")
+            for line in json.loads(best_answer) if best_answer else []:
+                print(f"   {line}")
+    print(f"\n{len(results)} result(s) in {elapsed * 1000:.1f} ms.")
+    return 0 if results else 1
+
+
+def run_analytics(args):
+    """
+    Runs the "analytics" subcommand and prints the summary report.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        int: The process exit status.
+    """
+    # Imported here: only this command needs the analytics (and NumPy)
+    import QuizAnalytics
+    if not os.path.exists(args.bank):
+        print(f"Error: The question bank '{args.bank}' does not exist. Build it with 'batch --bank' or 'bank ingest'.")
+        return 1
+    try:
+        backend = QuizAnalytics.resolve_backend(args.backend)
+    except ValueError as error:
+        print(error)
+        return 2
+
+    with QuestionBank.QuestionBank(args.bank) as bank:
+        start = time.perf_counter()
+        summary = QuizAnalytics.summarize_bank(bank.connection, args.class_name, args.top, backend)
+        elapsed = time.perf_counter() - start
+    if not summary["totals"]["reports"]:
+        print("No graded taken reports in the question bank" + (f" for {args.class_name}." if args.class_name else "."))
+        return 1
+
+    print(QuizAnalytics.format_summary(summary))
+    if args.json_path:
+        QuizAnalytics.write_summary(summary, args.json_path)
+        print(f"\nSummary written to {args.json_path}")
+    print(f"\nAnalyzed in {elapsed * 1000:.1f} ms ({backend.name} backend).")
+    return 0
+
+
+def run_bank(args):
+    """
+    Runs the "bank" subcommand: ingests reports or prints statistics.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        int: The process exit status.
+    """
+    with QuestionBank.QuestionBank(args.path) as bank:
+        if args.bank_command == "ingest":
+            for file_path in args.files:
+                quiz_number = args.quiz_number or os.path.splitext(os.path.basename(file_path))[0]
+                counts = bank.ingest_report(file_path, args.class_name, quiz_number, args.method)
+                if counts is None:
+                    print(f"[skip] {file_path} is already in the question bank.")
+                else:
+                    print(f"[ok]   {file_path}: {counts['new']} new, {counts['merged']} merged, "
+                          f"{counts['skipped']} without text")
+        else:
+            classes = read_classes_from_file("CurrentClasses.txt") or None
+            print(f"{'Class':<40} {'Reports':>8} {'Questions':>10} {'Seen':>6} {'Correct':>8}")
+            for class_name, reports, questions, seen, correct in bank.class_stats(classes):
+                print(f"{class_name:<40} {reports:>8} {questions:>10} {seen:>6} {correct:>8}")
+        questions, reports = bank.totals()
+        print(f"\nQuestion bank: {questions} unique question(s) from {reports} report(s).")
+    return 0
+
+
+def parse_exports(value):
+    """
+    Splits and checks the --export option.
+
+    Args:
+        value (str): Comma-separated export format names.
+
+    Returns:
+        list: The export formats.
+
+    Raises:
+        ValueError: If a format is unknown.
+    """
+    export_formats = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in export_formats if name not in QuizExport.EXPORTERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}.")
+    return export_formats
+
+
+def run_fetch(args):
+    """
+    Runs the "fetch" subcommand.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        int: The process exit status.
+    """
+    if not args.url:
+        print("Error: Give the Canvas address with --url or the CANVAS_URL environment variable.")
+        return 2
+    try:
+        ParserBackend.resolve_engine(args.engine)
+        export_formats = parse_exports(args.export)
+        CanvasAPI.ConnectionPool(args.url)  # Checks the address
+    except ValueError as error:
+        print(error)
+        return 2
+    return CanvasAPI.fetch_course(
+        args.url, args.course, args.token,
+        quiz_ids=args.quiz_ids,
+        class_name=args.class_name,
+        engine=args.engine,
+        cache=None if args.no_cache else {"folder": args.cache_dir},
+        export_formats=export_formats,
+        export_path=args.export_path,
+        bank_path=args.bank,
+        connections=args.connections,
+        per_page=args.per_page,
+        http_cache=None if args.no_http_cache else args.http_cache,
+        state_path=args.state,
+    )
+
+
+# Main function to process the file
+def main(argv=None):
+    """
+    Main entry point. Dispatches to batch mode or the interactive prompts.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: The process exit status.
+    """
+    args = build_parser().parse_args(argv)
+    if args.command == "batch" and args.manifest:
+        # Parse again with the manifest's "run" section as the option defaults
+        try:
+            run_defaults = load_run_defaults(args.manifest)
+        except ValueError as error:
+            print(error)
+            return 2
+        if run_defaults:
+            args = build_parser(run_defaults).parse_args(argv)
+    measure = args.metrics or bool(args.metrics_file)
+    if not (measure or args.profile):
+        return run_command(args)
+
+    if args.profile and args.profiler == "pyinstrument" and importlib.util.find_spec("pyinstrument") is None:
+        print("Error: pyinstrument is not installed (pip install pyinstrument); use --profiler cprofile.")
+        return 2
+
+    # Measured run: instrument and/or profile the whole command
+    metrics = Instrumentation.start() if measure else None
+    extension = "html" if args.profiler == "pyinstrument" else "prof"
+    profile_path = Instrumentation.default_path("profile", extension) if args.profile else None
+    start = time.perf_counter()
+    try:
+        if args.profile:
+            with Instrumentation.profiled(profile_path, args.profiler):
+                return run_command(args)
+        return run_command(args)
+    finally:
+        Instrumentation.stop()
+        if metrics:
+            metrics_path = args.metrics_file or Instrumentation.default_path("metrics", "json")
+            Instrumentation.write_metrics(metrics, metrics_path, time.perf_counter() - start,
+                                          sys.argv[1:] if argv is None else argv)
+            print(f"Metrics written to {metrics_path}")
+        if profile_path:
+            print(f"Profile written to {profile_path}")
+
+
+def run_command(args):
+    """
+    Runs the command selected on the command line.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        int: The process exit status.
+    """
+    if args.command == "batch":
+        try:
+            ParserBackend.resolve_engine(args.engine)
+            export_formats = parse_exports(args.export)
+        except ValueError as error:
+            print(error)
+            return 2
+        settings = dict(
+            workers=args.workers,
+            manifest_path=args.manifest,
+            method=args.method,
+            class_name=args.class_name,
+            input_folder=args.input_folder,
+            engine=args.engine,
+            cache=None if args.no_cache else {
+                "folder": args.cache_dir,
+                "max_bytes": args.cache_size * 1024 * 1024,
+                "rebuild": args.rebuild_cache,
+            },
+            export_formats=export_formats,
+            export_path=args.export_path,
+            bank_path=args.bank,
+        )
+        if args.watch:
+            if args.resume:
+                print("Error: --resume does not apply to --watch; watch mode keeps its own state file.")
+                return 2
+            if args.output_archive:
+                print("Error: --output-archive does not apply to --watch; a watch never finishes its archive.")
+                return 2
+            return WatchMode.watch_folder(infer=args.infer, on_exists=args.on_exists, state_path=args.state,
+                                          use_inotify=not args.poll, **settings)
+        runner = None
+        if args.use_async:
+            runner = functools.partial(AsyncPipeline.run_jobs, queue_size=args.queue_size)
+        return BatchProcess.run_batch(runner=runner, journal_path=args.journal, resume=args.resume,
+                                      infer=args.infer, on_exists=args.on_exists,
+                                      output_archive=args.output_archive, **settings)
+    if args.command == "convert":
+        return run_convert(args)
+    if args.command == "diff":
+        return run_diff(args)
+    if args.command == "merge":
+        return run_merge(args)
+    if args.command == "bank":
+        return run_bank(args)
+    if args.command == "search":
+        return run_search(args)
+    if args.command == "analytics":
+        return run_analytics(args)
+    if args.command == "fetch":
+        return run_fetch(args)
+    if not sys.stdin.isatty():
+        # Nobody to answer the prompts, e.g. under a scheduler or in a pipeline
+        print("Error: No subcommand given and no terminal to prompt on. Use 'batch' or 'convert' "
+              "(see --help) to run without prompts.")
+        return 2
+    run_interactive()
+    return 0
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,290 @@
+'''
+Canvas:   Quiz Extractor - Diff Mode
+Brief:    Re-converts a retaken quiz by extracting and rendering only the
+          questions that changed since the previous attempt. Every
+          display_question block is fingerprinted by a hash of its normalized
+          markup; the fingerprints, records and rendered blocks of the latest
+          attempt of each quiz are stored, so unchanged blocks are copied
+          from the store instead of parsed. Answers that went from incorrect
+          to correct (and back) are reported.
+'''
+
+import os
+import re
+import pickle
+import hashlib
+import time
+from dataclasses import dataclass, field, replace
+import FileProcess
+import HTML_Extract
+import ParseCache
+import ParserBackend
+import QuestionBank
+import QuizModel
+import QuizRender
+
+
+# Where the latest attempt of each quiz is kept
+STORE_FOLDER = os.path.join(ParseCache.CACHE_FOLDER, "attempts")
+
+# Bumped whenever the stored Attempt changes shape
+STORE_VERSION = "1"
+
+# Runs of whitespace are insignificant in HTML and vary between saves of the same page
+WHITESPACE = re.compile(rb"\s+")
+
+
+@dataclass(slots=True)
+class Attempt:
+    """
+    The stored state of one attempt of a quiz.
+
+    Attributes:
+        source (str): Path of the report the attempt was read from.
+        fingerprints (list[str]): Fingerprint of each question block, in report order.
+        records (dict): QuizModel.Question per fingerprint.
+        rendered (dict): Rendered text block per fingerprint.
+    """
+
+    source: str
+    fingerprints: list[str] = field(default_factory=list)
+    records: dict = field(default_factory=dict)
+    rendered: dict = field(default_factory=dict)
+
+    @property
+    def questions(self):
+        """The attempt's question records, in report order."""
+        return [self.records[fingerprint] for fingerprint in self.fingerprints]
+
+
+def fingerprint_block(fragment, method, encoding):
+    """
+    Fingerprints one question block: the SHA-256 of its markup with runs of
+    whitespace collapsed, salted with everything else that changes its record.
+
+    Args:
+        fragment (bytes): The block, as yielded by ParserBackend.iter_question_fragments.
+        method (str): QuizModel.METHOD_TAKEN or QuizModel.METHOD_UNTAKEN.
+        encoding (str): Text encoding of the report.
+
+    Returns:
+        str: Hex digest of the block.
+    """
+    digest = hashlib.sha256(f"{HTML_Extract.EXTRACTOR_VERSION}\x00{method}\x00{encoding}\x00".encode("ascii"))
+    digest.update(WHITESPACE.sub(b" ", fragment).strip())
+    return digest.hexdigest()
+
+
+def question_identity(question):
+    """
+    Matches a question across attempts: its Canvas question id, or its
+    normalized text when the report has no ids.
+
+    Args:
+        question (QuizModel.Question): The extracted question.
+
+    Returns:
+        str: The identity.
+    """
+    return question.question_id or f"text:{QuestionBank.normalize_text(question.text)}"
+
+
+class AttemptStore:
+    """
+    Pickled Attempt per (class, quiz, method) in a folder, replaced
+    atomically so an interrupted run never leaves a torn entry.
+
+    Attributes:
+        folder (str): Directory of the stored attempts.
+    """
+
+    def __init__(self, folder=STORE_FOLDER):
+        self.folder = folder
+
+    def _path(self, class_name, quiz_number, method):
+        key = "\x00".join([STORE_VERSION, QuestionBank.normalize_text(class_name),
+                           QuestionBank.normalize_text(str(quiz_number)), method])
+        return os.path.join(self.folder, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".pkl")
+
+    def load(self, class_name, quiz_number, method):
+        """
+        Loads the latest stored attempt of a quiz.
+
+        Returns:
+            Attempt | None: The attempt, or None if none is stored or it is unreadable.
+        """
+        try:
+            with open(self._path(class_name, quiz_number, method), "rb") as file:
+                attempt = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        return attempt if isinstance(attempt, Attempt) else None
+
+    def save(self, class_name, quiz_number, method, attempt):
+        """Stores an attempt as the latest one of its quiz."""
+        os.makedirs(self.folder, exist_ok=True)
+        FileProcess.write_atomic(self._path(class_name, quiz_number, method),
+                                 pickle.dumps(attempt, pickle.HIGHEST_PROTOCOL))
+
+
+def compare_attempts(previous, current):
+    """
+    Compares the graded questions of two attempts.
+
+    Args:
+        previous (list): QuizModel.Question records of the previous attempt.
+        current (list): QuizModel.Question records of the new attempt.
+
+    Returns:
+        dict: "fixed" and "broken" (questions now correct and now incorrect),
+              "added" and "removed" (counts of unmatched questions), and the
+              total points "before" and "after".
+    """
+    earlier = {question_identity(question): question for question in previous}
+    fixed, broken = [], []
+    matched = 0
+    for question in current:
+        old = earlier.get(question_identity(question))
+        if old is None:
+            continue
+        matched += 1
+        if not (old.has_points and question.has_points):
+            continue
+        if question.is_correct and not old.is_correct:
+            fixed.append(question)
+        elif old.is_correct and not question.is_correct:
+            broken.append(question)
+    return {
+        "fixed": fixed,
+        "broken": broken,
+        "added": len(current) - matched,
+        "removed": len(earlier) - matched,
+        "before": sum(question.points_awarded for question in previous if question.has_points),
+        "after": sum(question.points_awarded for question in current if question.has_points),
+    }
+
+
+def diff_report(file_path, output_file_name, quiz_number, class_name, method=QuizModel.METHOD_TAKEN,
+                engine=None, store=None):
+    """
+    Converts a report, re-extracting only the question blocks whose
+    fingerprint is not in the previous attempt of the same quiz, and stores
+    it as the new latest attempt.
+
+    A reused block keeps its stored record (renumbered if it moved) and its
+    rendered text (re-rendered if it moved), so the output file is the same
+    as a full conversion would write.
+
+    Args:
+        file_path (str): Path to the input HTML file.
+        output_file_name (str): Path to the output text file.
+        quiz_number (str): Quiz number identifier.
+        class_name (str): Class name for labeling output.
+        method (str, optional): QuizModel.METHOD_TAKEN or QuizModel.METHOD_UNTAKEN.
+        engine (str, optional): Parser engine. Auto-detected if None.
+        store (AttemptStore, optional): Where attempts are kept. Defaults to STORE_FOLDER.
+
+    Returns:
+        dict: "questions", "changed" and "reused" block counts, "previous"
+              (the previous Attempt or None) and "comparison" (see
+              compare_attempts, None without a previous attempt).
+    """
+    store = store or AttemptStore()
+    previous = store.load(class_name, quiz_number, method)
+    known_records = previous.records if previous else {}
+    known_rendered = previous.rendered if previous else {}
+    render_question = QuizRender.QUESTION_RENDERERS[method]
+    attempt = Attempt(source=file_path)
+    current = []
+    changed = 0
+
+    report = HTML_Extract.open_report(file_path, method)
+    try:
+        with FileProcess.AtomicOutput(output_file_name, "w", encoding=QuizRender.OUTPUT_ENCODINGS[method]) as output:
+            output.write(QuizRender.render_header(quiz_number, class_name))
+            for fragment in ParserBackend.iter_question_fragments(report.data):
+                fragment = ParserBackend.normalize_newlines(fragment)
+                fingerprint = fingerprint_block(fragment, method, report.encoding)
+                position = len(attempt.fingerprints) + 1
+                question = attempt.records.get(fingerprint) or known_records.get(fingerprint)
+                if question is None:
+                    # New or changed block: the only ones parsed
+                    question = HTML_Extract.extract_fragment(fragment, position, method, engine, report.encoding)
+                    if question is None:
+                        continue
+                    changed += 1
+                    text = render_question(question)
+                elif question.index == position:
+                    text = attempt.rendered.get(fingerprint) or known_rendered.get(fingerprint)
+                else:
+                    # Same block at another position: renumber it
+                    question = replace(question, index=position)
+                    text = render_question(question)
+                attempt.fingerprints.append(fingerprint)
+                current.append(question)
+                # A block repeated within the report keeps its first record, renumbered where it repeats
+                if fingerprint not in attempt.records:
+                    attempt.records[fingerprint] = question
+                    attempt.rendered[fingerprint] = text
+                output.write(text)
+    finally:
+        report.close()
+
+    store.save(class_name, quiz_number, method, attempt)
+    return {
+        "questions": len(attempt.fingerprints),
+        "changed": changed,
+        "reused": len(attempt.fingerprints) - changed,
+        "previous": previous,
+        "comparison": compare_attempts(previous.questions, current) if previous else None,
+    }
+
+
+def print_diff(result, output_file_name, seconds):
+    """Prints the summary of a diff_report run."""
+    previous = result["previous"]
+    if previous is None:
+        print(f"No previous attempt stored: {result['questions']} question(s) extracted -> {output_file_name} "
+              f"({seconds:.2f}s)")
+        return
+    comparison = result["comparison"]
+    print(f"Compared with {previous.source}: {result['changed']} changed question(s) re-extracted, "
+          f"{result['reused']} reused -> {output_file_name} ({seconds:.2f}s)")
+    print(f"Points: {comparison['before']:g} -> {comparison['after']:g}")
+    for title, questions in (("Now correct", comparison["fixed"]), ("Now incorrect", comparison["broken"])):
+        if questions:
+            print(f"{title} ({len(questions)}):")
+            for question in questions:
+                text = (question.text or "No question text found.").replace("\n", " ")
+                print(f"   {question.label}: {text[:80]}{'...' if len(text) > 80 else ''}")
+    if comparison["added"] or comparison["removed"]:
+        print(f"{comparison['added']} question(s) not in the previous attempt, "
+              f"{comparison['removed']} no longer asked.")
+
+
+def run_diff(file_path, output_file_name, quiz_number, class_name, method=QuizModel.METHOD_TAKEN,
+             engine=None, store_folder=None):
+    """
+    Runs diff mode on one report and prints what changed.
+
+    Args:
+        file_path (str): Path to the input HTML file.
+        output_file_name (str): Path to the output text file.
+        quiz_number (str): Quiz number identifier.
+        class_name (str): Class name for labeling output.
+        method (str, optional): QuizModel.METHOD_TAKEN or QuizModel.METHOD_UNTAKEN.
+        engine (str, optional): Parser engine. Auto-detected if None.
+        store_folder (str, optional): Folder of stored attempts. Defaults to STORE_FOLDER.
+
+    Returns:
+        int: 0 on success, 1 if the report could not be converted.
+    """
+    start = time.perf_counter()
+    try:
+        result = diff_report(file_path, output_file_name, quiz_number, class_name, method, engine,
+                             AttemptStore(store_folder or STORE_FOLDER))
+    except (OSError, ValueError) as error:
+        print(f"{file_path}: {type(error).__name__}: {error}")
+        return 1
+    print_diff(result, output_file_name, time.perf_counter() - start)
+    return 0
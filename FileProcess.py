@@ -1,16 +1,67 @@
 import os
+import re
+import html
+import mmap
+import codecs
+import threading
 from datetime import datetime
 
 # Define global variables for the input and output directories
 INPUT_FOLDER = "Input"
 OUTPUT_FOLDER = "Output"
 
+# File extensions treated as Canvas quiz reports
+REPORT_EXTENSIONS = (".html", ".htm")
+
+# Archives whose members are read as reports in place, without unpacking them.
+# A member is named "<archive path>::<member name>", e.g. "Input/backup.zip::quiz_3.html".
+ARCHIVE_SEPARATOR = "::"
+ZIP_EXTENSIONS = (".zip",)
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+ARCHIVE_EXTENSIONS = ZIP_EXTENSIONS + TAR_EXTENSIONS
+
+# Archives kept open per process, so reading a member does not re-read the archive's index
+OPEN_ARCHIVES = 4
+
+# Byte order marks and their encodings (UTF-32 first: its LE mark starts like UTF-16's)
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb"""<meta\b[^>]*?charset\s*=\s*["']?\s*([A-Za-z0-9._:-]+)""", re.IGNORECASE)
+
+# Bytes at the start of a report searched for a meta charset
+SNIFF_BYTES = 4096
+
+# Suffix of output files that are still being written (see AtomicOutput)
+PARTIAL_SUFFIX = ".partial"
+
+# Output name policies when a file of the same name exists (see resolve_output_file)
+ON_EXISTS_POLICIES = ("attempt", "overwrite", "skip", "fail")
+
+# Characters that cannot appear in an output file name
+UNSAFE_NAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+# The <title> of a report, and the bytes at the start of a report searched for it
+PAGE_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+TITLE_BYTES = 65536
+
+# "Quiz 3", "Quiz 3: TCP Handshake", "Exam #2 - Review" in a page title, and "quiz_3" in a file name
+TITLE_QUIZ_NUMBER = re.compile(r"^(?:quiz|exam|test)\s*#?\s*(\d+[a-z]?)\b\s*(?:[:\-\u2013]\s*(.+))?$", re.IGNORECASE)
+FILE_QUIZ_NUMBER = re.compile(r"quiz[\s_-]*(\d+)", re.IGNORECASE)
+
 def list_files():
     """
     Lists all files in the 'Input' directory.
 
     This function prints all the files available in the 'Input' directory
-    and returns them as a list of file names.
+    and returns them as a list of file names. The reports inside zip and tar
+    archives are listed in place of the archive, as member paths.
 
     Returns:
         list: A list of filenames in the 'Input' directory.
@@ -22,7 +73,18 @@ def list_files():
         return []
     
     # Get the list of files in the Input directory
-    files = [f for f in os.listdir(INPUT_FOLDER) if os.path.isfile(os.path.join(INPUT_FOLDER, f))]
+    files = []
+    for f in os.listdir(INPUT_FOLDER):
+        path = os.path.join(INPUT_FOLDER, f)
+        if not os.path.isfile(path):
+            continue
+        if not is_archive(f):
+            files.append(f)
+            continue
+        try:
+            files.extend(member_path(f, member) for member in list_archive(path))
+        except (OSError, ValueError) as error:
+            print(f"Skipping {path}: {error}")
     
     if not files:
         print(f"There are no files in the {INPUT_FOLDER} directory.")
@@ -123,6 +185,581 @@ def choose_output_file(quiz_number, class_name):
     return output_file_path
 
 
+def auto_output_file(quiz_number, class_name, reserved=(), on_exists="attempt"):
+    """
+    Generates the output file name like choose_output_file, but without prompting.
+
+    If the file already exists (or has been reserved by another job in the same
+    run), an "Attempt N" suffix is added instead of overwriting it.
+
+    Args:
+        quiz_number (str): The quiz number.
+        class_name (str): The name of the class.
+        reserved (set, optional): Output paths already claimed in this run.
+        on_exists (str, optional): See resolve_output_file.
+
+    Returns:
+        str: The full path of the generated output file name.
+    """
+    if not os.path.exists(OUTPUT_FOLDER):
+        os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    output_file_name = f"Quiz {quiz_number} - {class_name} - {current_date}.txt"
+    return resolve_output_file(os.path.join(OUTPUT_FOLDER, output_file_name), reserved, on_exists)
+
+
+def resolve_output_file(output_file_path, reserved=(), on_exists="attempt"):
+    """
+    Applies an output name policy to a wanted output path.
+
+    With "attempt" an existing file gets an "Attempt N" suffix. The other
+    policies keep the name and leave it to the caller to "overwrite" the
+    file, "skip" the report or "fail" it. A name reserved by another job of
+    the same run always gets a suffix, so two jobs never write one file.
+
+    Args:
+        output_file_path (str): The wanted output path.
+        reserved (set, optional): Output paths already claimed in this run.
+        on_exists (str, optional): One of ON_EXISTS_POLICIES.
+
+    Returns:
+        str: The output path to use.
+    """
+    def taken(path):
+        return path in reserved or (on_exists == "attempt" and os.path.exists(path))
+
+    # Rename with attempt number until the name is free
+    attempt_number = 1
+    base_name, ext = os.path.splitext(output_file_path)
+    candidate = output_file_path
+    while taken(candidate):
+        candidate = f"{base_name} - Attempt {attempt_number}{ext}"
+        attempt_number += 1
+    return candidate
+
+
+class AtomicOutput:
+    """
+    An output file written under a temporary name in the same folder and
+    renamed over its real name only once it is complete, so an interrupted
+    run never leaves a truncated file behind. Used as a context manager it
+    commits when the block succeeds and discards the file when it raises.
+
+    Attributes:
+        path (str): The final path.
+        temp_path (str): The hidden ".<name>.<random>.partial" file being written.
+        file: The open temporary file, or None if opened with mode=None
+            (e.g. for SQLite, which opens temp_path itself).
+    """
+
+    def __init__(self, path, mode="w", encoding=None, newline=None):
+        directory, name = os.path.split(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # Created with O_EXCL and mode 0o666, so the umask applies as for a plain open()
+        while True:
+            self.temp_path = os.path.join(directory, f".{name}.{os.urandom(4).hex()}{PARTIAL_SUFFIX}")
+            try:
+                handle = os.open(self.temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0),
+                                 0o666)
+                break
+            except FileExistsError:
+                continue
+        if mode is None:
+            os.close(handle)
+            self.file = None
+        else:
+            self.file = os.fdopen(handle, mode, encoding=encoding, newline=newline)
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+    def commit(self):
+        """Closes the temporary file and renames it over the final path."""
+        if self.file is not None:
+            self.file.close()
+        os.replace(self.temp_path, self.path)
+
+    def discard(self):
+        """Closes and deletes the temporary file, leaving the final path untouched."""
+        if self.file is not None:
+            self.file.close()
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+def write_atomic(path, data):
+    """
+    Writes bytes to a file through a temporary file and a rename.
+
+    Args:
+        path (str): The file to write.
+        data (bytes): Its new contents.
+
+    Returns:
+        None
+    """
+    with AtomicOutput(path, "wb") as file:
+        file.write(data)
+
+
+def remove_partial_files(folder):
+    """
+    Deletes the temporary files an interrupted run left in a folder.
+
+    Args:
+        folder (str): The output directory.
+
+    Returns:
+        int: The number of files deleted.
+    """
+    removed = 0
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if entry.name.startswith(".") and entry.name.endswith(PARTIAL_SUFFIX) and entry.is_file():
+            try:
+                os.unlink(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def _ascii_compatible(encoding):
+    """True if the encoding stores ASCII markup as plain ASCII bytes."""
+    return "<div>".encode(encoding) == b"<div>"
+
+
+def sniff_encoding(data, default="utf-8"):
+    """
+    Detects the encoding of a report from its byte order mark or, failing
+    that, a <meta> charset declaration near the top of the page.
+
+    Args:
+        data (bytes | mmap.mmap): The raw report.
+        default (str, optional): Encoding used when nothing is declared.
+
+    Returns:
+        tuple: (encoding, length of the byte order mark, 0 if none).
+    """
+    head = data[:SNIFF_BYTES]
+    for mark, encoding in BYTE_ORDER_MARKS:
+        if head.startswith(mark):
+            return encoding, len(mark)
+
+    match = META_CHARSET.search(head)
+    if match:
+        try:
+            encoding = codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            encoding = None
+        # A meta tag that could be read as ASCII cannot be right about UTF-16/32
+        if encoding and _ascii_compatible(encoding):
+            return encoding, 0
+    return default, 0
+
+
+class InputReport:
+    """
+    A report's raw bytes, memory-mapped where possible, and their encoding.
+
+    The bytes are never decoded as a whole: the parser scans them in place and
+    only decodes the question blocks it finds. Close the report (or use it as
+    a context manager) to release the mapping.
+
+    Attributes:
+        data (bytes | mmap.mmap): The report bytes, in an ASCII-compatible encoding.
+        encoding (str): The encoding of data.
+        path (str): Path the report was read from, "" for in-memory data.
+    """
+
+    def __init__(self, data, encoding, path=""):
+        self.data = data
+        self.encoding = encoding
+        self.path = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+def _prepare_report(data, default_encoding, path=""):
+    """Sniffs the encoding of raw report bytes and wraps them in an InputReport."""
+    encoding, bom_length = sniff_encoding(data, default_encoding)
+    if not _ascii_compatible(encoding):
+        # UTF-16/32 markup cannot be scanned as bytes: transcode it once to UTF-8
+        text = data[bom_length:].decode(encoding)
+        if isinstance(data, mmap.mmap):
+            data.close()
+        return InputReport(text.encode("utf-8"), "utf-8", path)
+    return InputReport(data, encoding, path)
+
+
+def open_report(file_path, default_encoding="utf-8"):
+    """
+    Opens a report for parsing: memory-maps it and detects its encoding.
+    An archive member is read into memory instead.
+
+    Args:
+        file_path (str): Path to the HTML report, or of an archive member (see member_path).
+        default_encoding (str, optional): Encoding used when the report has
+            no byte order mark or meta charset.
+
+    Returns:
+        InputReport: The mapped report. Close it when done.
+    """
+    if split_member_path(file_path)[1] is not None:
+        return _prepare_report(read_input(file_path), default_encoding, file_path)
+    with open(file_path, "rb") as file:
+        # Empty files cannot be mapped; the mapping stays valid once the file is closed
+        size = os.fstat(file.fileno()).st_size
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+    return _prepare_report(data, default_encoding, file_path)
+
+
+def report_from_bytes(data, default_encoding="utf-8", path=""):
+    """
+    Wraps a report already read into memory, like open_report.
+
+    Args:
+        data (bytes): The raw report.
+        default_encoding (str, optional): See open_report.
+        path (str, optional): Where the bytes came from.
+
+    Returns:
+        InputReport: The report.
+    """
+    return _prepare_report(data, default_encoding, path)
+
+
+def is_archive(path):
+    """True if the path names a zip or tar archive (by its extension)."""
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def member_path(archive_path, member):
+    """The virtual input path of an archive member."""
+    return f"{archive_path}{ARCHIVE_SEPARATOR}{member}"
+
+
+def split_member_path(path):
+    """
+    Splits a virtual input path into its archive and member.
+
+    Args:
+        path (str): A plain file path or "<archive path>::<member name>".
+
+    Returns:
+        tuple: (archive path, member name), or (path, None) for a plain file.
+    """
+    start = 0
+    while (found := path.find(ARCHIVE_SEPARATOR, start)) != -1:
+        if is_archive(path[:found]):
+            return path[:found], path[found + len(ARCHIVE_SEPARATOR):]
+        start = found + 1
+    return path, None
+
+
+class _Archive:
+    """An open zip or tar archive and the index of its file members."""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_zip = path.lower().endswith(ZIP_EXTENSIONS)
+        # Imported here: only runs with archives need them
+        import zlib
+        if self.is_zip:
+            import zipfile
+            errors = (zipfile.BadZipFile, zipfile.LargeZipFile)
+        else:
+            import tarfile
+            errors = (tarfile.TarError,)
+        # A corrupt member fails its read with these (on top of OSError), not the whole archive.
+        # Listing a compressed tar reads the whole stream, so its corruption can show up there too.
+        self.read_errors = errors = errors + (zlib.error, EOFError)
+        try:
+            if self.is_zip:
+                self.handle = zipfile.ZipFile(path)
+                self.members = {info.filename: info for info in self.handle.infolist() if not info.is_dir()}
+            else:
+                # Compressed tars are decompressed as members are read; reading them in order
+                # (as the batch does) only moves forward through the stream
+                self.handle = tarfile.open(path, "r:*")
+                self.members = {info.name: info for info in self.handle.getmembers() if info.isfile()}
+        except errors as error:
+            raise ValueError(f"{path} is not a readable archive: {error}") from None
+
+    def info(self, member):
+        info = self.members.get(member)
+        if info is None:
+            raise FileNotFoundError(f"No member '{member}' in {self.path}")
+        return info
+
+    def size(self, member):
+        info = self.info(member)
+        return info.file_size if self.is_zip else info.size
+
+    def read(self, member):
+        info = self.info(member)
+        try:
+            if self.is_zip:
+                return self.handle.read(info)
+            with self.handle.extractfile(info) as file:
+                return file.read()
+        except self.read_errors as error:
+            raise ValueError(f"{member_path(self.path, member)} is corrupt: {error}") from None
+
+    def close(self):
+        self.handle.close()
+
+
+_open_archives = {}
+_archives_lock = threading.Lock()
+
+
+def _forget_archives():
+    # A forked worker must not share the parent's file offsets: it opens its own handles
+    _open_archives.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_archives)
+
+
+def _with_archive(archive_path, action):
+    """
+    Runs action(archive) on an open archive, reusing the handle of an earlier
+    call unless the archive changed since. Threads take turns, as tar
+    handles cannot be shared. A handle that failed a read is dropped, so a
+    corrupt member does not leave a compressed stream half read for the next.
+    """
+    stat = os.stat(archive_path)
+    key = (os.path.abspath(archive_path), stat.st_size, stat.st_mtime_ns)
+    with _archives_lock:
+        archive = _open_archives.get(key)
+        if archive is None:
+            archive = _Archive(archive_path)
+            while len(_open_archives) >= OPEN_ARCHIVES:
+                _open_archives.pop(next(iter(_open_archives))).close()
+            _open_archives[key] = archive
+        try:
+            return action(archive)
+        except ValueError:
+            _open_archives.pop(key, None)
+            archive.close()
+            raise
+
+
+def list_archive(archive_path, extensions=REPORT_EXTENSIONS):
+    """
+    Lists the reports inside an archive.
+
+    Args:
+        archive_path (str): Path to a zip or tar archive.
+        extensions (tuple, optional): File extensions of the members to list.
+
+    Returns:
+        list: Sorted member names.
+
+    Raises:
+        ValueError: If the file is not a readable archive.
+    """
+    return sorted(name for name in _with_archive(archive_path, lambda archive: archive.members)
+                  if name.lower().endswith(extensions))
+
+
+def read_input(path):
+    """
+    Reads the raw bytes of an input file or archive member.
+
+    Args:
+        path (str): A plain file path or a member path (see member_path).
+
+    Returns:
+        bytes: The file's contents.
+
+    Raises:
+        ValueError: The archive cannot be read or the member is corrupt.
+    """
+    archive_path, member = split_member_path(path)
+    if member is None:
+        with open(path, "rb") as file:
+            return file.read()
+    return _with_archive(archive_path, lambda archive: archive.read(member))
+
+
+def input_signature(path):
+    """
+    Size and modification time of an input file, to notice when it changes.
+    A member has its own size and the modification time of its archive.
+
+    Returns:
+        tuple: (size in bytes, modification time in nanoseconds).
+
+    Raises:
+        FileNotFoundError: If the file or member does not exist.
+    """
+    archive_path, member = split_member_path(path)
+    stat = os.stat(archive_path)
+    if member is None:
+        return stat.st_size, stat.st_mtime_ns
+    return _with_archive(archive_path, lambda archive: archive.size(member)), stat.st_mtime_ns
+
+
+def input_exists(path):
+    """True if the input file or archive member exists."""
+    archive_path, member = split_member_path(path)
+    if member is None:
+        return os.path.isfile(path)
+    try:
+        input_signature(path)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+class OutputArchive:
+    """
+    A zip archive the output files of a run are moved into as they are
+    written, instead of leaving them in the Output folder. The archive is
+    written under a temporary name and only appears once it is complete;
+    the archived files are deleted only then, so an interrupted run leaves
+    them where they were written.
+
+    Attributes:
+        path (str): The final path of the archive.
+        count (int): Output files added so far.
+    """
+
+    def __init__(self, path):
+        import zipfile
+        self.path = path
+        self.count = 0
+        self._added = []
+        self._output = AtomicOutput(path, "wb")
+        self._archive = zipfile.ZipFile(self._output.file, "w", zipfile.ZIP_DEFLATED)
+
+    def add(self, file_path, name=None):
+        """
+        Copies a finished output file into the archive.
+
+        Args:
+            file_path (str): The output file; deleted once the archive is in place.
+            name (str, optional): Its name in the archive. Defaults to its base name.
+        """
+        self._archive.write(file_path, name or os.path.basename(file_path))
+        self._added.append(file_path)
+        self.count += 1
+
+    def __call__(self, job, result):
+        # BatchProcess.run_jobs callback: archive each output as its job finishes
+        if result["status"] == "ok" and result["output"]:
+            self.add(result["output"])
+
+    def close(self, discard=False):
+        """
+        Finishes the archive and moves it into place, then deletes the files
+        it holds. With discard, deletes the archive and keeps the files.
+        """
+        self._archive.close()
+        if discard:
+            self._output.discard()
+            return
+        self._output.commit()
+        for file_path in self._added:
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError:
+                pass
+        self._added = []
+
+
+def read_title(file_path):
+    """
+    Reads the <title> of a report without reading the whole file.
+
+    Args:
+        file_path (str): Path to the HTML report, or of an archive member.
+
+    Returns:
+        str | None: The title with entities decoded and whitespace collapsed,
+                    or None if the report has no title near the top.
+    """
+    if split_member_path(file_path)[1] is not None:
+        head = read_input(file_path)[:TITLE_BYTES]
+    else:
+        with open(file_path, "rb") as file:
+            head = file.read(TITLE_BYTES)
+    encoding, bom_length = sniff_encoding(head)
+    match = PAGE_TITLE.search(head[bom_length:].decode(encoding, errors="replace"))
+    if not match:
+        return None
+    title = " ".join(html.unescape(match.group(1)).split())
+    return title or None
+
+
+def infer_metadata(file_path, use_title=True):
+    """
+    Works out the quiz and class of a report without asking.
+
+    Canvas titles quiz pages "<quiz title>: <course name>", e.g.
+    "Quiz 3: TCP Handshake: CS-372 INTRO TO COMPUTER NETWORKS" gives quiz
+    "3 - TCP Handshake" and class "CS-372 INTRO TO COMPUTER NETWORKS".
+    Without a usable title the quiz comes from the file name: "quiz_3.html"
+    gives "3", any other name is used as it is.
+
+    Args:
+        file_path (str): Path to the HTML report.
+        use_title (bool, optional): Read the report's title; False only looks
+            at the file name.
+
+    Returns:
+        dict: "quiz" and, when the title names the course, "class".
+    """
+    metadata = {}
+    title = None
+    if use_title:
+        try:
+            title = read_title(file_path)
+        except (OSError, ValueError):
+            title = None  # Unreadable or corrupt: the file name is used, and the job fails on its own
+    if title:
+        quiz_title, _separator, course = title.rpartition(": ")
+        if not quiz_title:
+            quiz_title, course = course, ""
+        if course:
+            metadata["class"] = UNSAFE_NAME.sub(" ", course).strip()
+        match = TITLE_QUIZ_NUMBER.match(quiz_title)
+        if match:
+            quiz = match.group(1) + (f" - {match.group(2)}" if match.group(2) else "")
+        else:
+            quiz = quiz_title
+        metadata["quiz"] = UNSAFE_NAME.sub(" ", quiz).strip()
+    if not metadata.get("quiz"):
+        name = split_member_path(file_path)[1] or file_path
+        stem = os.path.splitext(os.path.basename(name))[0]
+        match = FILE_QUIZ_NUMBER.search(stem)
+        metadata["quiz"] = match.group(1) if match else stem
+    return metadata
 
 
 def OLD_choose_output_file(quiz_number, class_name):
@@ -0,0 +1,290 @@
+'''
+Canvas:   Quiz Extractor - Golden Check
+Brief:    Regression check of the extractor. Every fixture report (Samples)
+          is converted with both extraction methods and every installed
+          parser engine, and each output must match its stored golden file
+          byte for byte, the date in the header aside. A timing gate then
+          measures extraction throughput and fails if it dropped more than
+          a set ratio below the stored baseline. Throughput is measured
+          relative to a fixed calibration workload timed alongside, so the
+          gate holds on a busy machine.
+
+Usage:    python GoldenCheck.py [--update] [--update-baseline] [--threshold RATIO] [--repeat N]
+'''
+
+import gc
+import os
+import re
+import sys
+import json
+import time
+import difflib
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+import Benchmark
+import HTML_Extract
+import ParityCheck
+import ParserBackend
+import QuizModel
+import SyntheticReport
+
+
+# Fixture reports, and the golden outputs and timing baseline stored next to them
+SAMPLES_FOLDER = ParityCheck.SAMPLES_FOLDER
+GOLDEN_FOLDER = os.path.join(SAMPLES_FOLDER, "golden")
+BASELINE_FILE = os.path.join(GOLDEN_FOLDER, "baseline.json")
+
+# The header line of every output ends in the date it was written
+HEADER_DATE = re.compile(rb"\A(Quiz [^\n]* - )\d{4}-\d{2}-\d{2}\n")
+
+# Questions of the generated report timed along with the fixtures, cycling through every question type
+TIMING_QUESTIONS = 2000
+
+# Timed passes; the fastest one counts
+REPEAT = 5
+
+# Slowdown (measured / baseline relative cost) that fails the gate.
+# Runs of the same commit differ by up to about 1.4x on a busy machine.
+THRESHOLD = 1.5
+
+# Lines of a differing output shown
+DIFF_LINES = 20
+
+
+def normalize(output):
+    """Replaces the date in an output's header, so goldens do not depend on the day they were written."""
+    return HEADER_DATE.sub(rb"\1DATE\n", output, count=1)
+
+
+def golden_path(report, extractor):
+    """Path of the golden output of one report and extraction method."""
+    stem = os.path.splitext(os.path.basename(report))[0]
+    return os.path.join(GOLDEN_FOLDER, f"{stem}.{extractor}.txt")
+
+
+def show_diff(expected, actual):
+    """Prints the first lines of a unified diff between a golden output and a new one."""
+    lines = difflib.unified_diff(expected.decode("utf-8", "replace").splitlines(),
+                                 actual.decode("utf-8", "replace").splitlines(),
+                                 "golden", "output", lineterm="")
+    for number, line in enumerate(lines):
+        if number == DIFF_LINES:
+            print("         ...")
+            break
+        print(f"         {line}")
+
+
+def check_goldens(reports, engines, update=False):
+    """
+    Compares the output of every report, method and engine with its golden file.
+
+    Args:
+        reports (list): Paths of the fixture reports.
+        engines (list): Installed engine names.
+        update (bool, optional): Rewrite the golden files from the reference
+            engine instead of comparing.
+
+    Returns:
+        int: The number of outputs that differ from their golden file (or
+             have none).
+    """
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        for report in reports:
+            for extractor in ParityCheck.EXTRACTORS:
+                path = golden_path(report, extractor)
+                if update:
+                    output = normalize(ParityCheck.render(extractor, report, ParityCheck.REFERENCE_ENGINE, work_dir))
+                    os.makedirs(GOLDEN_FOLDER, exist_ok=True)
+                    with open(path, "wb") as file:
+                        file.write(output)
+                    print(f"[wrote]  {path}")
+                    continue
+                try:
+                    with open(path, "rb") as file:
+                        expected = file.read()
+                except FileNotFoundError:
+                    mismatches += 1
+                    print(f"[NEW]    {report} ({extractor}): no golden file; run with --update")
+                    continue
+                for engine in engines:
+                    output = normalize(ParityCheck.render(extractor, report, engine, work_dir))
+                    if output == expected:
+                        print(f"[same]   {report} ({extractor}) {engine}")
+                    else:
+                        mismatches += 1
+                        print(f"[DIFFER] {report} ({extractor}) {engine} != {path}")
+                        show_diff(expected, output)
+    return mismatches
+
+
+def timing_corpus(reports):
+    """
+    The reports timed by the gate: every fixture, and a generated taken
+    report large enough to time (SyntheticReport, fixed seed).
+
+    Returns:
+        list: (method, report bytes) pairs.
+    """
+    corpus = []
+    for report in reports:
+        with open(report, "rb") as file:
+            data = file.read()
+        method = QuizModel.METHOD_UNTAKEN if "untaken" in os.path.basename(report) else QuizModel.METHOD_TAKEN
+        corpus.append((method, data))
+    pieces = SyntheticReport.iter_report(TIMING_QUESTIONS, chrome=True, seed=24,
+                                         question_types=SyntheticReport.ALL_QUESTION_TYPES)
+    corpus.append((QuizModel.METHOD_TAKEN, "".join(pieces).encode("utf-8")))
+    return corpus
+
+
+def measure(corpus, engine, repeat, payload):
+    """
+    Times the extraction of the whole corpus with one engine, each pass
+    between two runs of the calibration workload (Benchmark.calibrate). The
+    garbage collector is paused while timing, as timeit does.
+
+    Returns:
+        tuple: (questions extracted per second in the fastest pass, the
+                fastest extraction time divided by the fastest calibration time).
+    """
+    best = calibration = None
+    questions = 0
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        gc.disable()
+        try:
+            before = Benchmark.calibrate(payload)
+            start = time.perf_counter()
+            questions = sum(len(HTML_Extract.extract_quiz_data(data, method, engine).questions)
+                            for method, data in corpus)
+            seconds = time.perf_counter() - start
+            after = Benchmark.calibrate(payload)
+        finally:
+            gc.enable()
+        best = seconds if best is None else min(best, seconds)
+        calibration = min(before, after) if calibration is None else min(calibration, before, after)
+    return (questions / best if best else 0.0), best / calibration
+
+
+def machine():
+    """Describes where a baseline was measured."""
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def check_timing(reports, engines, repeat, threshold, update=False):
+    """
+    Measures extraction throughput per engine and compares it with the baseline.
+
+    Args:
+        reports (list): Paths of the fixture reports.
+        engines (list): Installed engine names.
+        repeat (int): Timed passes per engine.
+        threshold (float): Slowdown (measured / baseline relative cost) that fails.
+        update (bool, optional): Store the measurements as the new baseline.
+
+    Returns:
+        int: The number of engines whose throughput regressed.
+    """
+    corpus = timing_corpus(reports)
+    payload = Benchmark.calibration_payload()
+    measured = {engine: measure(corpus, engine, repeat, payload) for engine in engines}
+
+    if update:
+        document = {
+            "commit": Benchmark.git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "extractor_version": HTML_Extract.EXTRACTOR_VERSION,
+            "timing_questions": TIMING_QUESTIONS,
+            **machine(),
+            "questions_per_sec": {engine: round(rate, 1) for engine, (rate, _cost) in measured.items()},
+            "relative_cost": {engine: round(cost, 4) for engine, (_rate, cost) in measured.items()},
+        }
+        with open(BASELINE_FILE, "w", encoding="utf-8") as file:
+            json.dump(document, file, indent=1)
+            file.write("\n")
+        for engine, (rate, cost) in measured.items():
+            print(f"[wrote]  {engine}: {rate:,.0f} questions/sec, {cost:.3f}x the calibration time")
+        print(f"Baseline written to {BASELINE_FILE}")
+        return 0
+
+    try:
+        with open(BASELINE_FILE, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print(f"No baseline in {BASELINE_FILE}; record one with --update-baseline.")
+        return 0
+    python = platform.python_version_tuple()[:2]
+    if tuple(str(baseline.get("python", "")).split(".")[:2]) != python or \
+            baseline.get("timing_questions") != TIMING_QUESTIONS or "relative_cost" not in baseline:
+        # Another interpreter (or corpus) changes the extractor's speed relative to the calibration
+        print(f"The baseline (Python {baseline.get('python')}, {baseline.get('timing_questions')} generated "
+              f"questions) does not match this setup; timing gate skipped. Record one with --update-baseline.")
+        return 0
+    if baseline.get("platform") != machine()["platform"]:
+        print(f"Note: the baseline was measured on {baseline.get('platform')}.")
+
+    regressions = 0
+    for engine, (rate, cost) in measured.items():
+        before = baseline["relative_cost"].get(engine)
+        if not before:
+            print(f"[new]    {engine}: {rate:,.0f} questions/sec (not in the baseline)")
+            continue
+        ratio = cost / before
+        summary = f"{rate:,.0f} questions/sec, {cost:.3f}x the calibration time (baseline {before:.3f}x)"
+        if ratio > threshold:
+            regressions += 1
+            print(f"[SLOW]   {engine}: {summary}, {ratio:.2f}x slower")
+        else:
+            print(f"[ok]     {engine}: {summary}")
+    print(f"Compared with the baseline of commit {baseline.get('commit') or 'unknown'} "
+          f"({regressions} regression(s) over {threshold:.2f}x).")
+    return regressions
+
+
+def main(argv=None):
+    """
+    Runs the golden output check and the timing gate.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: 0 if every output matches its golden file and no engine got
+             slower than the threshold; 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Check the extractor against golden outputs and a timing baseline.")
+    parser.add_argument("--update", action="store_true",
+                        help="Rewrite the golden outputs from the reference engine (review the diff!).")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store this machine's throughput as the timing baseline.")
+    parser.add_argument("--no-timing", action="store_true", help="Only check the golden outputs.")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"Slowdown that fails the gate (default: {THRESHOLD}x).")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help=f"Timed passes per engine (default: {REPEAT}).")
+    args = parser.parse_args(argv)
+
+    engines = ParserBackend.available_engines()
+    if ParityCheck.REFERENCE_ENGINE not in engines:
+        print(f"The reference engine '{ParityCheck.REFERENCE_ENGINE}' (BeautifulSoup) is not installed.")
+        return 1
+    reports = ParityCheck.find_reports([SAMPLES_FOLDER])
+    if not reports:
+        print("No fixture reports found.")
+        return 1
+
+    print(f"Engines: {', '.join(engines)}\n")
+    mismatches = check_goldens(reports, engines, args.update)
+    regressions = 0
+    if args.update_baseline or not (args.no_timing or args.update):
+        print()
+        regressions = check_timing(reports, engines, args.repeat, args.threshold, args.update_baseline)
+
+    print(f"\n{len(reports)} report(s), {mismatches} golden mismatch(es), {regressions} timing regression(s).")
+    return 0 if mismatches == 0 and regressions == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
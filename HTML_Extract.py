@@ -1,10 +1,571 @@
 import os
-from datetime import datetime
-from bs4 import BeautifulSoup
+import locale
 import re
+import FileProcess
+import Instrumentation
+import ParserBackend
+import QuizModel
+import QuizRender
 
 
-def process_untaken_quiz(file_path, output_file_name, quiz_number, class_name):
+# Version of the extracted question records. Bump whenever a change alters
+# the extracted records so that stale ParseCache entries are ignored.
+EXTRACTOR_VERSION = "4"
+
+
+def _question_type(question):
+    """
+    Returns the Canvas question type class of a div.display_question node.
+
+    Args:
+        question: The parsed div.display_question node.
+
+    Returns:
+        str: The type class (e.g. "multiple_choice_question"), or "" if none.
+    """
+    for class_name in question.get("class", []):
+        if class_name.endswith("_question") and class_name != "display_question":
+            return class_name
+    return ""
+
+
+def _text_input(node):
+    """True if the node is an <input type="text">."""
+    return node.name == "input" and node.get("type") == "text"
+
+
+# Containers _collect_parts can look for besides the question's common fields
+# (text, header, name, points); each answer handler asks only for what it reads
+ANSWER_PARTS = frozenset(("numerical", "text_boxes", "answers", "response", "files", "blanks"))
+
+# Untaken reports only list the options of each question
+UNTAKEN_PARTS = frozenset(("answers",))
+
+# What read_answers looks at
+FALLBACK_PARTS = frozenset(("numerical", "text_boxes", "answers"))
+
+
+def _collect_parts(question, wanted=ANSWER_PARTS):
+    """
+    Walks a question's subtree once and picks out every element the
+    extractors read, dispatching on tag and class names.
+
+    Each field holds the first matching element in document order, within the
+    same container the former find/find_all calls searched: the question name
+    and incorrect arrow inside the first header, the input inside the first
+    numerical holder or each text box, and the match, select, option and
+    text elements inside each answer. Containers still open are kept on a
+    stack of (depth, kind, record) entries. The subtrees of the text
+    containers found (question text, answer texts, essay response) are not
+    walked.
+
+    Args:
+        question: The parsed div.display_question node.
+        wanted (frozenset, optional): The ANSWER_PARTS to look for; the
+            containers of the others are not tracked.
+
+    Returns:
+        dict: The elements found (None when absent), with "text_boxes",
+              "answers", "files" and "blanks" lists of per-container dicts.
+    """
+    parts = {
+        "question_text": None, "header": None, "name": None, "arrow_incorrect": None,
+        "user_points": None, "question_points": None, "numerical": None, "numerical_input": None,
+        "text_boxes": [], "answers": [], "response": None, "files": [], "blanks": [],
+    }
+    scopes = []
+    want_numerical = "numerical" in wanted
+    want_text_boxes = "text_boxes" in wanted
+    want_answers = "answers" in wanted
+    want_response = "response" in wanted
+    want_files = "files" in wanted
+    want_blanks = "blanks" in wanted
+
+    # Text containers are not descended into once found: nothing is searched for inside them
+    walker = ParserBackend.walk(question)
+    skip = None
+    while True:
+        try:
+            depth, node = walker.send(skip)
+        except StopIteration:
+            break
+        skip = False
+        while scopes and scopes[-1][0] >= depth:
+            scopes.pop()  # Left that container
+        name = node.name
+        classes = node.get("class") or []
+        opened = None
+
+        # Elements searched for inside an enclosing container
+        for _depth, kind, record in scopes:
+            if kind == "answer":
+                if name == "div":
+                    for field in ("answer_match_left", "answer_text", "answer_label"):
+                        if record[field] is None and field in classes:
+                            record[field] = node
+                            skip = True
+                elif name == "select" and record["select"] is None:
+                    record["select"] = node
+                    opened = (depth, "select", record)
+            elif kind == "select":
+                if name == "option" and record["option"] is None and node.get("selected") is not None:
+                    record["option"] = node
+            elif kind == "text_box":
+                if record["input"] is None and _text_input(node):
+                    record["input"] = node
+            elif kind == "numerical":
+                if parts["numerical_input"] is None and _text_input(node):
+                    parts["numerical_input"] = node
+            elif kind == "files":
+                if name == "a" and node.get("href") is not None:
+                    parts["files"].append(node)
+            elif kind == "header" and name == "span":
+                joined = " ".join(classes)
+                if parts["name"] is None and joined == "name question_name":
+                    parts["name"] = node
+                elif parts["arrow_incorrect"] is None and joined == "answer_arrow incorrect":
+                    parts["arrow_incorrect"] = node
+        if opened:
+            scopes.append(opened)
+
+        # Elements searched for anywhere in the question
+        if name == "div" and classes:
+            joined = " ".join(classes)
+            if parts["question_text"] is None and "question_text" in classes:
+                parts["question_text"] = node
+                skip = not want_blanks  # The blanks are inside the question text
+            if parts["header"] is None and "header" in classes:
+                parts["header"] = node
+                scopes.append((depth, "header", None))
+            if parts["user_points"] is None and "user_points" in classes:
+                parts["user_points"] = node
+            if want_numerical and parts["numerical"] is None and joined == "form-control numerical-question-holder":
+                parts["numerical"] = node
+                scopes.append((depth, "numerical", None))
+            if want_text_boxes and joined == "form-control text-box-question-holder":
+                box = {"node": node, "input": None}
+                parts["text_boxes"].append(box)
+                scopes.append((depth, "text_box", box))
+            if want_answers and "answer" in classes:
+                answer = {"node": node, "answer_match_left": None, "select": None, "option": None,
+                          "answer_text": None, "answer_label": None}
+                parts["answers"].append(answer)
+                scopes.append((depth, "answer", answer))
+            if want_response and parts["response"] is None and "quiz_response_text" in classes:
+                parts["response"] = node
+                skip = True
+            if want_files and "file-upload-question-holder" in classes:
+                scopes.append((depth, "files", None))
+        elif name == "span" and parts["question_points"] is None and " ".join(classes) == "points question_points":
+            parts["question_points"] = node
+        elif want_blanks and name in ("input", "select") and "question_input" in classes:
+            # Fill in multiple blanks and multiple dropdowns answer inside the question text
+            blank = {"node": node, "option": None}
+            parts["blanks"].append(blank)
+            if name == "select":
+                scopes.append((depth, "select", blank))
+
+    return parts
+
+
+def extract_untaken_question(question, question_index):
+    """
+    Extracts the text and possible options of one question of an untaken quiz.
+    Removes NBSP characters from the gathered text.
+
+    Args:
+        question: The parsed div.display_question node.
+        question_index (int): 1-based position of the question in the report.
+
+    Returns:
+        QuizModel.Question: The extracted question.
+    """
+    parts = _collect_parts(question, UNTAKEN_PARTS)
+
+    # Extract the question text
+    question_text_div = parts["question_text"]
+    question_text = (
+        question_text_div.get_text(separator="\n", strip=True).replace("\u00a0", " ")
+        if question_text_div
+        else None
+    )
+
+    record = QuizModel.Question(
+        index=question_index,
+        text=question_text,
+        question_type=_question_type(question),
+        question_id=question.get("id", ""),
+    )
+
+    # Extract all answer options
+    for idx, answer in enumerate(parts["answers"], 1):
+        answer_text_div = answer["answer_label"]
+        answer_text = (
+            answer_text_div.get_text(strip=True).replace("\u00a0", " ")
+            if answer_text_div
+            else None
+        )
+        record.answers.append(QuizModel.Answer(QuizModel.ANSWER_OPTION, idx, answer_text))
+
+    return record
+
+
+# Answer handler of taken questions, the ANSWER_PARTS it reads and the part it
+# cannot do without, keyed by Canvas question type class (see register)
+TAKEN_HANDLERS = {}
+
+
+def register(*question_types, parts=(), needs=None):
+    """
+    Registers a function as the answer handler of taken questions of the
+    given Canvas question types, e.g.::
+
+        @HTML_Extract.register("essay_question", parts=("response",))
+        def read_essay(record, parts):
+            ...
+
+    The handler is called as handler(record, parts) with the question's
+    QuizModel.Question, its text, name and points already filled in, and the
+    elements found by _collect_parts. It appends the given answers to
+    record.answers. Registering a type again replaces its handler; question
+    types without a handler go to read_answers, and so do questions missing
+    the part the handler needs (markup older or newer than the handler
+    expects). Bump EXTRACTOR_VERSION when a new handler changes the records
+    of existing reports.
+
+    Args:
+        *question_types (str): Canvas type classes, e.g. "matching_question".
+        parts (iterable, optional): The ANSWER_PARTS the handler reads.
+        needs (str, optional): Key of the _collect_parts result the handler
+            reads its answers from; when it is empty or None the question is
+            read by read_answers instead.
+
+    Returns:
+        callable: The decorator.
+    """
+    wanted = frozenset(parts)
+    unknown = wanted - ANSWER_PARTS
+    if unknown:
+        raise ValueError(f"Unknown question part(s): {', '.join(sorted(unknown))}")
+
+    def decorator(handler):
+        for question_type in question_types:
+            TAKEN_HANDLERS[question_type] = (handler, wanted, needs)
+        return handler
+    return decorator
+
+
+def _input_value(node):
+    """The trimmed value of an input, None if there is no input."""
+    return node.get("value", "").strip() if node else None
+
+
+@register("numerical_question", parts=("numerical",), needs="numerical_input")
+def read_numerical(record, parts):
+    """Standard numerical input."""
+    record.answers.append(QuizModel.Answer(QuizModel.ANSWER_NUMERICAL, 1, _input_value(parts["numerical_input"])))
+
+
+@register("short_answer_question", parts=("text_boxes",), needs="text_boxes")
+def read_text_boxes(record, parts):
+    """Short-answer text box inputs (can be multiple)."""
+    for idx, text_box in enumerate(parts["text_boxes"], 1):
+        record.answers.append(QuizModel.Answer(QuizModel.ANSWER_TEXT, idx, _input_value(text_box["input"])))
+
+
+@register("multiple_choice_question", "true_false_question", "multiple_answers_question", "matching_question",
+          parts=("answers",), needs="answers")
+def read_choices(record, parts):
+    """Multiple choice options (one or several selected) or matching rows."""
+    for idx, answer in enumerate(parts["answers"], 1):
+        match_left = answer["answer_match_left"]
+        is_selected = "selected_answer" in answer["node"].get("class", [])
+
+        if match_left and answer["select"]:
+            selected_option = answer["option"]
+            record.answers.append(QuizModel.Answer(
+                QuizModel.ANSWER_MATCH, idx,
+                selected_option.get_text(strip=True) if selected_option else None,
+                prompt=match_left.get_text(strip=True).replace("\u00a0", " "),
+            ))
+        else:
+            answer_text_div = answer["answer_text"]
+            if answer_text_div:
+                record.answers.append(QuizModel.Answer(
+                    QuizModel.ANSWER_OPTION, idx,
+                    answer_text_div.get_text(strip=True).replace("\u00a0", " "),
+                    selected=is_selected,
+                ))
+
+
+@register("essay_question", parts=("response",))
+def read_essay(record, parts):
+    """The student's essay response."""
+    response = parts["response"]
+    text = response.get_text(separator=" ", strip=True).replace("\u00a0", " ") if response else ""
+    record.answers.append(QuizModel.Answer(QuizModel.ANSWER_ESSAY, 1, text or None))
+
+
+@register("file_upload_question", parts=("files",))
+def read_files(record, parts):
+    """The names of the uploaded files, or one missing answer if nothing was uploaded."""
+    links = parts["files"] or [None]
+    for idx, link in enumerate(links, 1):
+        name = link.get_text(strip=True).replace("\u00a0", " ") if link else ""
+        record.answers.append(QuizModel.Answer(QuizModel.ANSWER_FILE, idx, name or None))
+
+
+@register("fill_in_multiple_blanks_question", "multiple_dropdowns_question", parts=("blanks",))
+def read_blanks(record, parts):
+    """The value typed in, or the option picked for, each blank of the question text."""
+    for idx, blank in enumerate(parts["blanks"], 1):
+        node = blank["node"]
+        if node.name == "select":
+            text = blank["option"].get_text(strip=True) if blank["option"] else None
+        else:
+            text = _input_value(node) or None
+        record.answers.append(QuizModel.Answer(QuizModel.ANSWER_BLANK, idx, text))
+
+
+@register("text_only_question")
+def read_nothing(record, parts):
+    """Text only items ask nothing."""
+
+
+def read_answers(record, parts):
+    """
+    Answer handler of question types without a registered handler (or
+    without a type class): reads whichever kind of answer the question holds.
+    """
+    if parts["numerical"]:
+        read_numerical(record, parts)
+    elif parts["text_boxes"]:
+        read_text_boxes(record, parts)
+    else:
+        read_choices(record, parts)
+
+
+# Registry entry of question types without a handler
+FALLBACK_HANDLER = (read_answers, FALLBACK_PARTS, None)
+
+
+def extract_taken_question(question, question_index):
+    """
+    Extracts the score, text and given answers of one question of a taken quiz.
+    Cleans NBSP characters and hands the answers to the handler registered
+    for the question's Canvas type.
+
+    Args:
+        question: The parsed div.display_question node.
+        question_index (int): 1-based position of the question in the report.
+
+    Returns:
+        QuizModel.Question: The extracted question.
+    """
+    question_type = _question_type(question)
+    handler, wanted, needs = TAKEN_HANDLERS.get(question_type, FALLBACK_HANDLER)
+    parts = _collect_parts(question, wanted)
+
+    question_text_div = parts["question_text"]
+    question_text = (
+        question_text_div.get_text(separator=" ", strip=True).replace("\u00a0", " ")
+        if question_text_div
+        else None
+    )
+
+    question_name = parts["name"]
+
+    record = QuizModel.Question(
+        index=question_index,
+        text=question_text,
+        name=question_name.get_text(strip=True) if question_name else None,
+        question_type=question_type,
+        question_id=question.get("id", ""),
+        is_correct=parts["header"] is None or parts["arrow_incorrect"] is None,
+    )
+
+    points_awarded_elem = parts["user_points"]
+    points_possible_elem = parts["question_points"]
+
+    if not (points_awarded_elem and points_possible_elem):
+        return record
+
+    record.has_points = True
+    points_awarded_text = points_awarded_elem.get_text(strip=True).split()[0]
+    points_possible_parts = points_possible_elem.get_text(strip=True).split()
+
+    try:
+        record.points_awarded = float(re.search(r"[\d.]+", points_awarded_text).group())
+        record.points_possible = float(points_possible_parts[-1])  # Safely grab the last number
+    except (AttributeError, IndexError, ValueError):
+        record.points_awarded = record.points_possible = 0.0
+
+    if needs and not parts[needs]:
+        # Not the markup the type's handler reads: guess the answer kind as for an unknown type
+        handler = read_answers
+        parts = _collect_parts(question, FALLBACK_PARTS)
+    handler(record, parts)
+    return record
+
+
+# Question extractor and default input encoding for each extraction method,
+# used when a report declares no encoding (no BOM or meta charset). Untaken
+# reports fall back to the platform default encoding (None).
+EXTRACTORS = {
+    QuizModel.METHOD_TAKEN: (extract_taken_question, "utf-8"),
+    QuizModel.METHOD_UNTAKEN: (extract_untaken_question, None),
+}
+
+
+def _default_encoding(method):
+    """Returns the encoding assumed for a report of this method that declares none."""
+    return EXTRACTORS[method][1] or locale.getpreferredencoding(False)
+
+
+def open_report(file_path, method=QuizModel.METHOD_TAKEN):
+    """
+    Opens a report with the default encoding of its extraction method.
+
+    Args:
+        file_path (str): Path to the input HTML file.
+        method (str, optional): QuizModel.METHOD_TAKEN or QuizModel.METHOD_UNTAKEN.
+
+    Returns:
+        FileProcess.InputReport: The opened report; close it when done.
+    """
+    return FileProcess.open_report(file_path, _default_encoding(method))
+
+
+def extract_fragment(fragment, question_index, method=QuizModel.METHOD_TAKEN, engine=None, encoding="utf-8"):
+    """
+    Extracts one question from the markup of its display_question block, as
+    produced by ParserBackend.iter_question_fragments.
+
+    Args:
+        fragment (bytes): The question block, with universal newlines.
+        question_index (int): 1-based position of the question in the report.
+        method (str, optional): QuizModel.METHOD_TAKEN or QuizModel.METHOD_UNTAKEN.
+        engine (str, optional): Parser engine. Auto-detected if None.
+        encoding (str, optional): Text encoding of the report.
+
+    Returns:
+        QuizModel.Question | None: The extracted question, or None if the
+            block holds no question.
+    """
+    node = ParserBackend.parse_question(fragment, engine, encoding)
+    if node is None:
+        return None
+    return EXTRACTORS[method][0](node, question_index)
+
+
+def _extract_stream(report, method, engine, cache, key):
+    """
+    Extracts questions from an opened FileProcess.InputReport, one at a time,
+    and stores the records in the cache once the whole report has been read.
+    """
+    extract_question = EXTRACTORS[method][0]
+    metrics = Instrumentation.current()
+    if metrics:
+        extract_question = metrics.timed_extractor(extract_question, method)
+    records = [] if cache else None
+    try:
+        nodes = ParserBackend.iter_questions(report.data, engine, report.encoding)
+        for question_index, node in enumerate(nodes, 1):
+            record = extract_question(node, question_index)
+            if records is not None:
+                records.append(record)
+            yield record
+    finally:
+        report.close()
+    if cache:
+        with Instrumentation.stage("cache"):
+            cache.store(key, records)
+
+
+def _cached_records(cache, source, method, digest=None):
+    """Looks a report up in the cache, counting hits and misses when measured."""
+    if not cache:
+        return None, None
+    with Instrumentation.stage("cache"):
+        key, records = cache.lookup(source, method, digest)
+    metrics = Instrumentation.current()
+    if metrics:
+        metrics.count("cache.hits" if records is not None else "cache.misses")
+        for record in records or ():
+            metrics.count_question(record, method)
+    return key, records
+
+
+def iter_quiz_questions(file_path, method, engine=None, cache=None, digest=None):
+    """
+    Streams the extracted questions of a report.
+
+    Questions are parsed one at a time and released once the caller moves on.
+    When a cache is given, the records are looked up by the report's content
+    hash first (skipping parsing entirely) and stored after a miss.
+
+    Args:
+        file_path (str): Path to the input HTML file.
+        method (str): QuizModel.METHOD_TAKEN or QuizModel.METHOD_UNTAKEN.
+        engine (str, optional): Parser engine. Auto-detected if None.
+        cache (ParseCache, optional): Cache of extracted question records.
+        digest (str, optional): SHA-256 of the report, if already known; the
+            cache lookup does not hash the file again then.
+
+    Returns:
+        iterator: QuizModel.Question records in report order.
+    """
+    key, records = _cached_records(cache, file_path, method, digest)
+    if records is not None:
+        return iter(records)
+    # Open now so a missing report fails before any output is written
+    with Instrumentation.stage("read"):
+        report = FileProcess.open_report(file_path, _default_encoding(method))
+    return _extract_stream(report, method, engine, cache, key)
+
+
+def extract_quiz(file_path, method=QuizModel.METHOD_TAKEN, engine=None, cache=None, digest=None):
+    """
+    Extracts all questions of a report without rendering them.
+
+    Args:
+        file_path (str): Path to the input HTML file.
+        method (str, optional): QuizModel.METHOD_TAKEN or QuizModel.METHOD_UNTAKEN.
+        engine (str, optional): Parser engine. Auto-detected if None.
+        cache (ParseCache, optional): Cache of extracted question records.
+        digest (str, optional): SHA-256 of the report, see iter_quiz_questions.
+
+    Returns:
+        QuizModel.Quiz: The extracted quiz.
+    """
+    questions = list(iter_quiz_questions(file_path, method, engine, cache, digest))
+    return QuizModel.Quiz(method, file_path, questions)
+
+
+def extract_quiz_data(data, method=QuizModel.METHOD_TAKEN, engine=None, cache=None, source="", digest=None):
+    """
+    Extracts all questions of a report that has already been read into memory.
+
+    Args:
+        data (bytes): The raw HTML report.
+        method (str, optional): QuizModel.METHOD_TAKEN or QuizModel.METHOD_UNTAKEN.
+        engine (str, optional): Parser engine. Auto-detected if None.
+        cache (ParseCache, optional): Cache of extracted question records.
+        source (str, optional): Path the report was read from.
+        digest (str, optional): SHA-256 of data, used as the cache key.
+
+    Returns:
+        QuizModel.Quiz: The extracted quiz.
+    """
+    key, records = _cached_records(cache, source, method, digest)
+    if records is None:
+        with Instrumentation.stage("read"):
+            report = FileProcess.report_from_bytes(data, _default_encoding(method), source)
+        records = list(_extract_stream(report, method, engine, cache, key))
+    return QuizModel.Quiz(method, source, records)
+
+
+def process_untaken_quiz(file_path, output_file_name, quiz_number, class_name, engine=None, cache=None):
     """!
     @brief [Description de la fonction]
 
@@ -24,62 +585,19 @@ def process_untaken_quiz(file_path, output_file_name, quiz_number, class_name):
         output_file_name (str): The path to the output file where results will be saved.
         quiz_number (str): The quiz number.
         class_name (str): The class name.
+        engine (str, optional): Parser engine (see ParserBackend.ENGINES).
+            Auto-detected if None.
+        cache (ParseCache, optional): Cache of extracted question records. On
+            a hit the report is not parsed at all.
 
     Returns:
-        None
+        int: The number of questions written to the output file.
     """
-    with open(file_path, "r") as file:
-        html_content = file.read()
-
-    # Parse the HTML content
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    # Open the output file to save the results
-    with open(output_file_name, "w") as output_file:
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        output_file.write(f"Quiz {quiz_number} - {class_name} - {current_date}\n")
-        output_file.write(f"{'-' * 40}\n")
-
-        # Find all questions in the HTML content
-        questions = soup.find_all("div", class_="display_question")
-
-        for question_index, question in enumerate(questions, 1):
-            # Extract the question text
-            question_text_div = question.find("div", class_="question_text")
-            if question_text_div:
-                # question_text = question_text_div.get_text(strip=True)
-                question_text = question_text_div.get_text(separator="\n", strip=True)
-
-            else:
-                question_text = "No question text found."
-
-            # Remove NBSP characters
-            question_text = question_text.replace("\u00a0", " ")
+    questions = iter_quiz_questions(file_path, QuizModel.METHOD_UNTAKEN, engine, cache)
+    return QuizRender.write_text(questions, QuizModel.METHOD_UNTAKEN, output_file_name, quiz_number, class_name)
 
-            # Write the question to the output file
-            output_file.write(f"Question {question_index}:\n")
-            output_file.write(f"{question_text}\n")
 
-            # Extract all answer options
-            answers = question.find_all("div", class_="answer")
-            for idx, answer in enumerate(answers, 1):
-                answer_text_div = answer.find("div", class_="answer_label")
-                answer_text = (
-                    answer_text_div.get_text(strip=True)
-                    if answer_text_div
-                    else "No answer text found."
-                )
-
-                # Remove NBSP characters
-                answer_text = answer_text.replace("\u00a0", " ")
-
-                # Write the answer options to the file
-                output_file.write(f"   Option {idx}: {answer_text}\n")
-
-            output_file.write(f"{'-' * 40}\n")
-
-
-def process_taken_quiz(file_path, output_file_name, quiz_number, class_name):
+def process_taken_quiz(file_path, output_file_name, quiz_number, class_name, engine=None, cache=None):
     """
     Processes a Canvas quiz HTML file and generates an easy-to-read text document.
     Cleans NBSP characters and handles different types of questions.
@@ -89,153 +607,13 @@ def process_taken_quiz(file_path, output_file_name, quiz_number, class_name):
         output_file_name (str): Path to save the output text file.
         quiz_number (str): Quiz number identifier.
         class_name (str): Class name for labeling output.
+        engine (str, optional): Parser engine (see ParserBackend.ENGINES).
+            Auto-detected if None.
+        cache (ParseCache, optional): Cache of extracted question records. On
+            a hit the report is not parsed at all.
 
     Returns:
-        None
-    """
-    with open(file_path, "r", encoding="utf-8") as file:
-        html_content = file.read()
-
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    with open(output_file_name, "w", encoding="utf-8") as output_file:
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        output_file.write(f"Quiz {quiz_number} - {class_name} - {current_date}\n")
-        output_file.write(f"{'-' * 40}\n")
-
-        questions = soup.find_all("div", class_="display_question")
-
-        for question_index, question in enumerate(questions, 1):
-            question_text_div = question.find("div", class_="question_text")
-            question_text = (
-                question_text_div.get_text(separator=" ", strip=True).replace(
-                    "\u00a0", " "
-                )
-                if question_text_div
-                else "No question text found."
-            )
-
-            question_header = question.find("div", class_="header")
-            question_number = (
-                question_header.find("span", class_="name question_name").get_text(
-                    strip=True
-                )
-                if question_header
-                else f"Question {question_index}"
-            )
-
-            is_correct = (
-                question_header.find("span", class_="answer_arrow incorrect") is None
-            )
-
-            points_awarded_elem = question.find("div", class_="user_points")
-            points_possible_elem = question.find(
-                "span", class_="points question_points"
-            )
-
-            if points_awarded_elem and points_possible_elem:
-                points_awarded_text = points_awarded_elem.get_text(strip=True).split()[
-                    0
-                ]
-                points_possible_parts = points_possible_elem.get_text(
-                    strip=True
-                ).split()
-
-                try:
-                    points_awarded = float(
-                        re.search(r"[\d.]+", points_awarded_text).group()
-                    )
-                    points_possible = float(
-                        points_possible_parts[-1]
-                    )  # Safely grab the last number
-                except (AttributeError, IndexError, ValueError):
-                    points_awarded = points_possible = 0.0
-
-                output_file.write(f"{'-' * 40}\n")
-                output_file.write(f"{question_number}:\n")
-                output_file.write(
-                    f"{'✔ CORRECT' if is_correct else '❌ INCORRECT'} - {points_awarded}/{points_possible}pts\n"
-                )
-                output_file.write(f"{question_text}\n")
-
-                # Handle numerical input answers (standard)
-                given_answer_div = question.find(
-                    "div", class_="form-control numerical-question-holder"
-                )
-                # Handle text-box input answers (short answer)
-                answer_text_boxes = question.find_all(
-                    "div", class_="form-control text-box-question-holder"
-                )
-                # Handle MC/Matching
-                answers = question.find_all("div", class_="answer")
-
-                if given_answer_div:
-                    # Standard numerical input
-                    given_answer_input = given_answer_div.find("input", type="text")
-                    given_answer_text = (
-                        given_answer_input.get("value", "").strip()
-                        if given_answer_input
-                        else "NO ANSWER GIVEN"
-                    )
-                    output_file.write(
-                        f"   {'✔ - CORRECT:' if is_correct else '❌ - INCORRECT:'} Given Answer: {given_answer_text}\n"
-                    )
-
-                elif answer_text_boxes:
-                    # Short-answer text box inputs (can be multiple)
-                    for idx, text_box in enumerate(answer_text_boxes, 1):
-                        input_tag = text_box.find("input", type="text")
-                        value = (
-                            input_tag.get("value", "").strip()
-                            if input_tag
-                            else "NO ANSWER GIVEN"
-                        )
-                        output_file.write(
-                            f"   {'✔ - CORRECT:' if is_correct else '❌ - INCORRECT:'} Text {idx}: {value}\n"
-                        )
-
-                else:
-                    # Handle multiple choice or matching
-                    for idx, answer in enumerate(answers, 1):
-                        match_left = answer.find("div", class_="answer_match_left")
-                        match_right = answer.find("select")
-                        correct_span = answer.find(
-                            "span", class_="answer_arrow correct"
-                        )
-                        is_selected = "selected_answer" in answer.get("class", [])
-
-                        if match_left and match_right:
-                            prompt = match_left.get_text(strip=True).replace(
-                                "\u00a0", " "
-                            )
-                            selected_option = match_right.find("option", selected=True)
-                            selected_text = (
-                                selected_option.get_text(strip=True)
-                                if selected_option
-                                else "Not selected"
-                            )
-                            output_file.write(
-                                f"   {'✔ - CORRECT:' if is_correct else '❌ - INCORRECT:'} Option {idx}: {prompt} {selected_text}\n"
-                            )
-                        else:
-                            answer_text_div = answer.find("div", class_="answer_text")
-                            if answer_text_div:
-                                answer_text = answer_text_div.get_text(
-                                    strip=True
-                                ).replace("\u00a0", " ")
-                                if is_selected:
-                                    output_file.write(
-                                        f"   {'✔ - CORRECT:' if is_correct else '❌ - INCORRECT:'} Option {idx}: {answer_text} (Selected)\n"
-                                    )
-                                else:
-                                    output_file.write(
-                                        f"   Option {idx}: {answer_text}\n"
-                                    )
-
-            else:
-                output_file.write(f"{'-' * 40}\n")
-                output_file.write(f"{question_number}:\n")
-                output_file.write(f"{question_text}\n")
-                output_file.write("Points information not available.\n")
-
-            output_file.write(f"{'-' * 40}\n")
+        int: The number of questions written to the output file.
+    """
+    questions = iter_quiz_questions(file_path, QuizModel.METHOD_TAKEN, engine, cache)
+    return QuizRender.write_text(questions, QuizModel.METHOD_TAKEN, output_file_name, quiz_number, class_name)
@@ -0,0 +1,291 @@
+'''
+Canvas:   Quiz Extractor - Instrumentation
+Brief:    Optional per-stage timers, counters and peak memory for a run,
+          written as a JSON metrics file. Off by default: every hook checks
+          current() once per report or question stream and does nothing else
+          when no run is being measured.
+'''
+
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+import collections
+from datetime import datetime
+import FileProcess
+import QuizModel
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Default folder of the metrics and profile files
+METRICS_FOLDER = os.path.join(FileProcess.OUTPUT_FOLDER, "metrics")
+
+# Counter names of the placeholders written when a report lacks something
+FALLBACK_POINTS = "fallback.points_unavailable"       # "Points information not available."
+FALLBACK_QUESTION_TEXT = "fallback.no_question_text"  # "No question text found."
+FALLBACK_ANSWER_TEXT = "fallback.no_answer_text"      # "No answer text found.", "NO ANSWER GIVEN", ...
+
+# Metrics of the run being measured, and of the job a worker thread is running
+_current = None
+_job = threading.local()
+
+# Returned by stage() when nothing is measured
+_NO_STAGE = contextlib.nullcontext()
+
+
+def peak_rss_kib(children=False):
+    """
+    Args:
+        children (bool, optional): Report the largest finished child process
+            (e.g. batch workers) instead of this process.
+
+    Returns:
+        int | None: Peak resident set size in KiB, or None where the
+                    resource module is unavailable.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+class Metrics:
+    """
+    Stage timers and counters of one run (or one job of a run).
+
+    Attributes:
+        stages (dict): Seconds spent and calls made per stage name.
+        counters (collections.Counter): Event counts, e.g. "questions".
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = collections.Counter()
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds, calls=1):
+        with self.lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Times the body of a with block as one call of a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, name, function):
+        """Returns function wrapped so that every call is timed as a stage."""
+        def timed_call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+        return timed_call
+
+    def timed_iter(self, name, iterable):
+        """Yields from iterable, timing the production of each item as a stage."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start, 0)
+                return
+            self.add(name, time.perf_counter() - start)
+            yield item
+
+    def timed_extractor(self, extract_question, method):
+        """
+        Wraps a question extractor: each call is timed under
+        "extract.<question type>" and the extracted record is counted.
+        """
+        def timed_extract(question, question_index):
+            start = time.perf_counter()
+            record = extract_question(question, question_index)
+            self.add(f"extract.{record.question_type or 'unknown'}", time.perf_counter() - start)
+            self.count_question(record, method)
+            return record
+        return timed_extract
+
+    def count_question(self, record, method):
+        """Counts a question, its answers, its type and the placeholders it will need."""
+        with self.lock:
+            counters = self.counters
+            counters["questions"] += 1
+            counters["answers"] += len(record.answers)
+            counters[f"type.{record.question_type or 'unknown'}"] += 1
+            if record.text is None:
+                counters[FALLBACK_QUESTION_TEXT] += 1
+            if method == QuizModel.METHOD_TAKEN and not record.has_points:
+                counters[FALLBACK_POINTS] += 1
+            counters[FALLBACK_ANSWER_TEXT] += sum(1 for answer in record.answers if answer.text is None)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "stages": {name: {"seconds": round(seconds, 6), "calls": calls}
+                           for name, (seconds, calls) in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def merge(self, data):
+        """Adds the metrics of a job (see job_metrics) to these."""
+        for name, entry in data["stages"].items():
+            self.add(name, entry["seconds"], entry["calls"])
+        with self.lock:
+            self.counters.update(data["counters"])
+
+
+def current():
+    """
+    Returns:
+        Metrics | None: Where measurements go, or None when nothing is measured.
+    """
+    return getattr(_job, "metrics", None) or _current
+
+
+def start():
+    """Starts measuring the run. Returns the run's Metrics."""
+    global _current
+    _current = Metrics()
+    return _current
+
+
+def stop():
+    """Stops measuring. Returns the run's Metrics (None if it was not measured)."""
+    global _current
+    metrics, _current = _current, None
+    return metrics
+
+
+def stage(name):
+    """
+    Times a with block as one call of a stage, if the run is measured.
+
+    Returns:
+        A context manager.
+    """
+    metrics = current()
+    return metrics.stage(name) if metrics else _NO_STAGE
+
+
+@contextlib.contextmanager
+def job_metrics(enabled):
+    """
+    Collects the metrics of one batch job on their own, so a worker process
+    (or thread) can send them back with its result to be merged into the
+    run's metrics.
+
+    Args:
+        enabled (bool): Whether the run is measured.
+
+    Yields:
+        Metrics | None: The job's metrics, None if not enabled.
+    """
+    if not enabled:
+        yield None
+        return
+    previous = getattr(_job, "metrics", None)
+    _job.metrics = Metrics()
+    try:
+        yield _job.metrics
+    finally:
+        _job.metrics = previous
+
+
+def merge(data):
+    """Adds the metrics a job returned to the run's metrics, if measured."""
+    metrics = current()
+    if metrics and data:
+        metrics.merge(data)
+
+
+def default_path(kind, extension):
+    """
+    Returns:
+        str: A new file name in METRICS_FOLDER, e.g. Output/metrics/metrics-20250412-153000.json.
+    """
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(METRICS_FOLDER, f"{kind}-{stamp}.{extension}")
+
+
+def write_metrics(metrics, path, wall_seconds, argv=None):
+    """
+    Writes the metrics of a run as JSON.
+
+    Args:
+        metrics (Metrics): The run's metrics.
+        path (str): The JSON file to write.
+        wall_seconds (float): Duration of the whole run.
+        argv (list, optional): The command line of the run.
+
+    Returns:
+        dict: The document written.
+    """
+    document = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "argv": argv if argv is not None else sys.argv[1:],
+        "wall_seconds": round(wall_seconds, 6),
+        "peak_rss_kib": peak_rss_kib(),
+        "peak_rss_children_kib": peak_rss_kib(children=True),
+        **metrics.to_dict(),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(document, file, indent=1)
+    return document
+
+
+@contextlib.contextmanager
+def profiled(path, profiler="cprofile"):
+    """
+    Profiles the body of a with block and dumps the profile to a file.
+
+    cProfile writes a pstats file (open it with `python -m pstats` or
+    snakeviz); pyinstrument, if installed, writes an HTML report.
+
+    Args:
+        path (str): The profile file to write.
+        profiler (str, optional): "cprofile" or "pyinstrument".
+
+    Yields:
+        None
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if profiler == "pyinstrument":
+        from pyinstrument import Profiler
+        profile = Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(profile.output_html())
+        return
+
+    import cProfile
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
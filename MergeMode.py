@@ -0,0 +1,291 @@
+'''
+Canvas:   Quiz Extractor - Merge Mode
+Brief:    Merges every report of a class into one study document. Reports are
+          extracted in parallel and each one is reduced into a temporary
+          SQLite table as soon as its worker finishes, so only one report's
+          records are in memory at a time. Duplicate questions are merged,
+          keeping the best known answer, and the document is written in quiz
+          order straight from the table.
+'''
+
+import os
+import re
+import json
+import sqlite3
+import time
+from dataclasses import asdict
+from datetime import datetime
+import BatchProcess
+import FileProcess
+import QuestionBank
+import QuizModel
+import QuizRender
+
+
+# Classes merged when none are named
+CLASSES_FILE = "CurrentClasses.txt"
+
+# One row per distinct question of a class. sort_key is the earliest place
+# the question was seen (quiz, then position), which orders the document.
+# The best record is the best graded attempt: correct before incorrect, then
+# more points, then the earliest (by sort_key, then report path), so the
+# result does not depend on the order the workers finish in. best_rank is 2
+# (graded correct), 1 (graded) or 0.
+MERGE_SCHEMA = """
+    CREATE TABLE merged (
+        class_name TEXT NOT NULL,
+        question_key TEXT NOT NULL,
+        sort_key TEXT NOT NULL,
+        quiz_number TEXT NOT NULL,
+        times_seen INTEGER NOT NULL,
+        times_correct INTEGER NOT NULL,
+        best_rank INTEGER NOT NULL,
+        best_points REAL NOT NULL,
+        best_key TEXT NOT NULL,
+        best_quiz TEXT NOT NULL,
+        best_record TEXT NOT NULL,
+        PRIMARY KEY (class_name, question_key)
+    ) WITHOUT ROWID;
+"""
+
+# Merge one question into the table. Every SET expression sees the row as it
+# was before this update, so the best record is compared against the old best.
+MERGE_QUESTION = """
+    INSERT INTO merged VALUES (:class_name, :question_key, :sort_key, :quiz_number, 1, :correct,
+                               :rank, :points, :best_key, :quiz_number, :record)
+    ON CONFLICT(class_name, question_key) DO UPDATE SET
+        times_seen = times_seen + 1,
+        times_correct = times_correct + excluded.times_correct,
+        best_record = CASE WHEN (excluded.best_rank, excluded.best_points, best_key)
+                                > (best_rank, best_points, excluded.best_key)
+                           THEN excluded.best_record ELSE best_record END,
+        best_quiz = CASE WHEN (excluded.best_rank, excluded.best_points, best_key)
+                              > (best_rank, best_points, excluded.best_key)
+                         THEN excluded.best_quiz ELSE best_quiz END,
+        best_key = CASE WHEN (excluded.best_rank, excluded.best_points, best_key)
+                             > (best_rank, best_points, excluded.best_key)
+                        THEN excluded.best_key ELSE best_key END,
+        best_points = CASE WHEN (excluded.best_rank, excluded.best_points, best_key)
+                                > (best_rank, best_points, excluded.best_key)
+                           THEN excluded.best_points ELSE best_points END,
+        best_rank = MAX(best_rank, excluded.best_rank),
+        quiz_number = CASE WHEN excluded.sort_key < sort_key THEN excluded.quiz_number ELSE quiz_number END,
+        sort_key = MIN(sort_key, excluded.sort_key)
+"""
+
+DIGITS = re.compile(r"\d+")
+
+
+def quiz_sort_key(quiz_number, position):
+    """
+    Sort key placing quiz 2 before quiz 10, then questions in report order.
+
+    Args:
+        quiz_number (str): Quiz number identifier.
+        position (int): 1-based position of the question in its report.
+
+    Returns:
+        str: A key that sorts as text.
+    """
+    quiz = DIGITS.sub(lambda match: match.group().zfill(10), str(quiz_number).casefold())
+    return f"{quiz}\x00{position:06d}"
+
+
+def _load_question(record):
+    """Rebuilds a QuizModel.Question from its JSON form in the table."""
+    fields = json.loads(record)
+    fields["answers"] = [QuizModel.Answer(**answer) for answer in fields["answers"]]
+    return QuizModel.Question(**fields)
+
+
+def normalize_class(class_name):
+    """Class names match whatever their case and spacing."""
+    return QuestionBank.normalize_text(class_name or "")
+
+
+class MergeTable:
+    """
+    Temporary SQLite table the extracted reports are reduced into.
+
+    The database is a private temporary file that SQLite deletes on close,
+    so merging any number of reports keeps memory flat.
+
+    Attributes:
+        connection (sqlite3.Connection): The temporary database.
+        counts (dict): Per class: "reports" merged, questions "seen" and
+            questions "skipped" for having no text.
+    """
+
+    def __init__(self):
+        self.connection = sqlite3.connect("")  # "" is a temporary on-disk database
+        self.connection.executescript(MERGE_SCHEMA)
+        self.counts = {}
+
+    def close(self):
+        self.connection.close()
+
+    def add_quiz(self, quiz, class_name, quiz_number):
+        """
+        Merges the questions of one extracted report into the table.
+
+        Args:
+            quiz (QuizModel.Quiz): The extracted report.
+            class_name (str): Class the report belongs to.
+            quiz_number (str): Quiz number identifier.
+        """
+        counts = self.counts.setdefault(class_name, {"reports": 0, "seen": 0, "skipped": 0})
+        counts["reports"] += 1
+        rows = []
+        for question in quiz.questions:
+            if not question.text:
+                counts["skipped"] += 1
+                continue
+            graded = quiz.method == QuizModel.METHOD_TAKEN and question.has_points
+            sort_key = quiz_sort_key(quiz_number, question.index)
+            correct = graded and question.is_correct
+            rows.append({
+                "class_name": class_name,
+                "question_key": QuestionBank.question_key(question),
+                "sort_key": sort_key,
+                "best_key": f"{sort_key}\x00{quiz.source}",
+                "quiz_number": quiz_number,
+                "correct": int(correct),
+                "rank": 2 if correct else int(graded),
+                "points": question.points_awarded if graded else 0.0,
+                "record": json.dumps(asdict(question), ensure_ascii=False),
+            })
+        counts["seen"] += len(rows)
+        with self.connection:  # One transaction per report
+            self.connection.executemany(MERGE_QUESTION, rows)
+
+    def __call__(self, job, result):
+        # BatchProcess.run_jobs callback: reduce each report as its worker finishes
+        if result["quiz"] is not None:
+            self.add_quiz(result["quiz"], job["class_name"], job["quiz_number"])
+
+    def write_document(self, class_name, output_path):
+        """
+        Writes the merged study document of one class, a question at a time.
+
+        Args:
+            class_name (str): The class, as passed to add_quiz.
+            output_path (str): Path of the document.
+
+        Returns:
+            int: The number of distinct questions written.
+        """
+        counts = self.counts.get(class_name, {"reports": 0, "seen": 0, "skipped": 0})
+        unique = self.connection.execute(
+            "SELECT COUNT(*) FROM merged WHERE class_name = ?", (class_name,)
+        ).fetchone()[0]
+        rows = self.connection.execute("""
+            SELECT quiz_number, best_quiz, times_seen, times_correct, best_record FROM merged
+            WHERE class_name = ? ORDER BY sort_key, question_key
+        """, (class_name,))
+
+        with FileProcess.AtomicOutput(output_path, "w", encoding="utf-8") as output:
+            output.write(QuizRender.render_merge_header(class_name, counts["reports"], unique,
+                                                        counts["seen"] - unique))
+            for number, (quiz_number, best_quiz, times_seen, times_correct, record) in enumerate(rows, 1):
+                output.write(QuizRender.render_merged_question(
+                    _load_question(record), number, quiz_number, best_quiz, times_seen, times_correct
+                ))
+        return unique
+
+
+def merge_output_file(class_name, reserved=(), on_exists="attempt"):
+    """
+    Generates the name of a class's study document in the Output folder.
+
+    Args:
+        class_name (str): The class.
+        reserved (set, optional): Output paths already claimed in this run.
+        on_exists (str, optional): See FileProcess.resolve_output_file.
+
+    Returns:
+        str: The output path.
+    """
+    os.makedirs(FileProcess.OUTPUT_FOLDER, exist_ok=True)
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    file_name = FileProcess.UNSAFE_NAME.sub("_", f"Study Guide - {class_name} - {current_date}.txt")
+    return FileProcess.resolve_output_file(os.path.join(FileProcess.OUTPUT_FOLDER, file_name), reserved, on_exists)
+
+
+def run_merge(class_names, input_folder=None, workers=None, manifest_path=None, method="taken", engine=None,
+              cache=None, infer="title", output=None, on_exists="attempt"):
+    """
+    Merges the reports of each class into one study document per class.
+
+    Every report in the input folder is assigned a class (manifest, then its
+    title or file name, see BatchProcess.build_jobs); reports of other
+    classes are left out.
+
+    Args:
+        class_names (list): Classes to merge, e.g. from CurrentClasses.txt.
+        input_folder (str, optional): Directory of reports. Defaults to FileProcess.INPUT_FOLDER.
+        workers (int, optional): Extraction worker processes. Defaults to the number of CPUs.
+        manifest_path (str, optional): JSON, TOML or YAML manifest with per-file settings.
+        method (str, optional): Default extraction method, "taken" or "untaken".
+        engine (str, optional): HTML parser engine.
+        cache (dict, optional): ParseCache settings, or None to disable caching.
+        infer (str, optional): See BatchProcess.build_jobs.
+        output (str, optional): Document path; only with a single class.
+        on_exists (str, optional): One of FileProcess.ON_EXISTS_POLICIES.
+
+    Returns:
+        int: 0 if every document was written and every report merged, 1 otherwise.
+    """
+    input_folder = input_folder or FileProcess.INPUT_FOLDER
+    wanted = {normalize_class(name): name for name in class_names}
+    try:
+        defaults, overrides = BatchProcess.load_defaults(method, None, manifest_path)
+    except ValueError as error:
+        print(error)
+        return 1
+
+    # Class of every report, before anything is parsed
+    jobs = []
+    skipped = 0
+    all_jobs = BatchProcess.build_jobs(BatchProcess.find_input_files(input_folder), input_folder, defaults,
+                                       overrides, engine, cache, infer=infer, write_output=False)
+    for job in all_jobs:
+        class_name = wanted.get(normalize_class(job["class_name"]))
+        if class_name is None:
+            skipped += 1
+            continue
+        job["class_name"] = class_name  # As listed, whatever the report's spelling
+        jobs.append(job)
+    if not jobs:
+        print(f"No reports of {', '.join(class_names)} found in {input_folder}.")
+        return 1
+
+    print(f"Merging {len(jobs)} report(s) of {len(wanted)} class(es) with {workers or os.cpu_count()} worker(s)"
+          f"{f'; {skipped} report(s) of other classes left out' if skipped else ''}...\n")
+    start = time.perf_counter()
+    table = MergeTable()
+    try:
+        results = BatchProcess.run_jobs(jobs, workers, on_result=table)
+        failures = sum(1 for result in results if result["status"] != "ok")
+
+        print()
+        reserved = set()
+        for class_name in class_names:
+            if class_name not in table.counts:
+                print(f"{class_name}: no reports merged.")
+                continue
+            output_path = FileProcess.resolve_output_file(output, reserved, on_exists) if output else \
+                merge_output_file(class_name, reserved, on_exists)
+            reserved.add(output_path)
+            if on_exists in ("skip", "fail") and os.path.exists(output_path):
+                print(f"{class_name}: {output_path} already exists")
+                failures += on_exists == "fail"
+                continue
+            unique = table.write_document(class_name, output_path)
+            counts = table.counts[class_name]
+            print(f"{class_name}: {counts['reports']} report(s), {counts['seen']} question(s), "
+                  f"{unique} unique -> {output_path}")
+    finally:
+        table.close()
+
+    print(f"\nMerged in {time.perf_counter() - start:.2f}s.")
+    return 0 if failures == 0 else 1
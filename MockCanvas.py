@@ -0,0 +1,289 @@
+'''
+Canvas:   Quiz Extractor - Mock Canvas
+Brief:    Local stand-in for the parts of the Canvas REST API that CanvasAPI
+          uses. Every report in a folder becomes a quiz of one course, with
+          submissions whose report page is the file itself. Pages, ETags,
+          Last-Modified, gzip, keep-alive and the rate limit headers behave
+          like Canvas, so the fetch mode can be run and checked offline.
+
+Usage:    python MockCanvas.py [FOLDER] [--port 8765] [--token TOKEN] [--per-page N] [--attempts N]
+                               [--latency SECONDS] [--rate-limit UNITS]
+'''
+
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import socket
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, urlencode
+import BatchProcess
+
+
+# The only course served
+COURSE_ID = 1
+COURSE_CODE = "MOCK-101"
+
+# Default listing page size, and the largest one accepted (as on Canvas)
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 100
+
+# Rate limit bucket: capacity, cost of one request and units drained per second
+RATE_LIMIT = 700
+REQUEST_COST = 10
+LEAK_PER_SECOND = 100
+
+# Bodies smaller than this are never compressed
+GZIP_MIN_BYTES = 1024
+
+# Request routes
+ROUTES = (
+    (re.compile(r"^/api/v1/courses/(\d+)$"), "course"),
+    (re.compile(r"^/api/v1/courses/(\d+)/quizzes$"), "quizzes"),
+    (re.compile(r"^/api/v1/courses/(\d+)/quizzes/(\d+)/submissions$"), "submissions"),
+    (re.compile(r"^/courses/(\d+)/quizzes/(\d+)/history$"), "report"),
+)
+
+
+class MockCanvasServer(ThreadingHTTPServer):
+    """
+    Serves the reports of a folder as the quizzes of course COURSE_ID.
+
+    Attributes:
+        quizzes (list): (quiz id, title, report path) of every report.
+        stats (dict): "requests", "connections", "not_modified" and "throttled".
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, folder, token=None, per_page=DEFAULT_PER_PAGE, attempts=1, latency=0.0,
+                 rate_limit=RATE_LIMIT, verbose=False):
+        super().__init__(address, MockCanvasHandler)
+        self.quizzes = [
+            (quiz_id, os.path.splitext(os.path.basename(relative_path))[0], os.path.join(folder, relative_path))
+            for quiz_id, relative_path in enumerate(BatchProcess.find_input_files(folder), 1)
+        ]
+        self.token = token
+        self.per_page = per_page
+        self.attempts = attempts
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.verbose = verbose
+        self.used = 0.0
+        self.drained_at = time.monotonic()
+        self.stats = {"requests": 0, "connections": 0, "not_modified": 0, "throttled": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def charge(self):
+        """
+        Takes one request from the leaky bucket.
+
+        Returns:
+            tuple: (allowed, units remaining).
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.used = max(0.0, self.used - (now - self.drained_at) * LEAK_PER_SECOND)
+            self.drained_at = now
+            if self.used + REQUEST_COST > self.rate_limit:
+                return False, self.rate_limit - self.used
+            self.used += REQUEST_COST
+            return True, self.rate_limit - self.used
+
+
+class MockCanvasHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections alive between requests
+    server_version = "MockCanvas/1.0"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately: do not let Nagle hold the body back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.count("connections")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        server = self.server
+        server.count("requests")
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.token and self.headers.get("Authorization") != f"Bearer {server.token}":
+            return self.send_json({"errors": [{"message": "Invalid access token."}]}, status=401)
+
+        allowed, remaining = server.charge()
+        extra = {"X-Rate-Limit-Remaining": f"{remaining:.1f}", "X-Request-Cost": str(REQUEST_COST)}
+        if not allowed:
+            server.count("throttled")
+            return self.send_body(b"403 Forbidden (Rate Limit Exceeded)", "text/plain", status=403, headers=extra)
+
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        for pattern, route in ROUTES:
+            match = pattern.match(url.path)
+            if match:
+                ids = [int(group) for group in match.groups()]
+                if ids[0] != COURSE_ID or (len(ids) > 1 and not 1 <= ids[1] <= len(server.quizzes)):
+                    break
+                return getattr(self, f"get_{route}")(*ids[1:], query=query, headers=extra)
+        self.send_json({"errors": [{"message": "The specified resource does not exist."}]}, status=404,
+                       headers=extra)
+
+    def get_course(self, query, headers):
+        self.send_json({"id": COURSE_ID, "name": "Mock Course", "course_code": COURSE_CODE}, headers=headers)
+
+    def get_quizzes(self, query, headers):
+        quizzes = [{"id": quiz_id, "title": title, "quiz_type": "assignment",
+                    "html_url": f"{self.server.base_url}/courses/{COURSE_ID}/quizzes/{quiz_id}"}
+                   for quiz_id, title, _path in self.server.quizzes]
+        self.send_page(quizzes, query, headers)
+
+    def get_submissions(self, quiz_id, query, headers):
+        submissions = []
+        for attempt in range(1, self.server.attempts + 1):
+            submission_id = quiz_id * 1000 + attempt
+            submissions.append({
+                "id": submission_id, "quiz_id": quiz_id, "user_id": 1, "attempt": attempt,
+                "workflow_state": "complete",
+                "html_url": f"{self.server.base_url}/courses/{COURSE_ID}/quizzes/{quiz_id}/history"
+                            f"?quiz_submission_id={submission_id}&version={attempt}",
+            })
+        self.send_page(submissions, query, headers, items_key="quiz_submissions")
+
+    def get_report(self, quiz_id, query, headers):
+        _quiz_id, _title, path = self.server.quizzes[quiz_id - 1]
+        with open(path, "rb") as file:
+            body = file.read()
+        self.send_body(body, "text/html; charset=utf-8", headers=headers, mtime=os.path.getmtime(path))
+
+    def send_page(self, items, query, headers, items_key=None):
+        """Sends one page of a listing with a Canvas-style Link header."""
+        try:
+            page = max(1, int(query.get("page", 1)))
+            per_page = min(MAX_PER_PAGE, max(1, int(query.get("per_page", self.server.per_page))))
+        except ValueError:
+            return self.send_json({"errors": [{"message": "Invalid page."}]}, status=400, headers=headers)
+        last = max(1, -(-len(items) // per_page))
+        path = urlsplit(self.path).path
+
+        def page_url(number):
+            return f"{self.server.base_url}{path}?{urlencode({'page': number, 'per_page': per_page})}"
+
+        links = [f'<{page_url(page)}>; rel="current"', f'<{page_url(1)}>; rel="first"',
+                 f'<{page_url(last)}>; rel="last"']
+        if page < last:
+            links.append(f'<{page_url(page + 1)}>; rel="next"')
+        if page > 1:
+            links.append(f'<{page_url(page - 1)}>; rel="prev"')
+        chunk = items[(page - 1) * per_page:page * per_page]
+        self.send_json({items_key: chunk} if items_key else chunk, headers={**headers, "Link": ",".join(links)})
+
+    def send_json(self, document, status=200, headers=None):
+        body = json.dumps(document).encode("utf-8")
+        self.send_body(body, "application/json; charset=utf-8", status, headers)
+
+    def send_body(self, body, content_type, status=200, headers=None, mtime=None):
+        """Sends a response, answering 304 when the client's copy is current."""
+        headers = dict(headers or {})
+        if status == 200:
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            headers["ETag"] = etag
+            if mtime is not None:
+                headers["Last-Modified"] = formatdate(int(mtime), usegmt=True)
+            if self.not_modified(etag, mtime):
+                self.server.count("not_modified")
+                status, body = 304, b""
+        if body and len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def not_modified(self, etag, mtime):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since and mtime is not None:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+def serve(folder, host="127.0.0.1", port=0, **options):
+    """
+    Starts a mock Canvas server in a background thread.
+
+    Args:
+        folder (str): Directory of reports to serve.
+        host (str, optional): Address to listen on.
+        port (int, optional): Port to listen on; 0 picks a free one.
+        **options: token, per_page, attempts, latency, rate_limit, verbose
+            (see MockCanvasServer).
+
+    Returns:
+        MockCanvasServer: The running server. Call shutdown() to stop it.
+    """
+    server = MockCanvasServer((host, port), folder, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a folder of quiz reports as a mock Canvas course.")
+    parser.add_argument("folder", nargs="?", default="Samples", help="Reports to serve (default: Samples).")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765).")
+    parser.add_argument("--token", help="Require this access token.")
+    parser.add_argument("--per-page", type=int, default=DEFAULT_PER_PAGE,
+                        help=f"Default page size of listings (default: {DEFAULT_PER_PAGE}).")
+    parser.add_argument("--attempts", type=int, default=1, help="Submissions per quiz (default: 1).")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT,
+                        help=f"Rate limit bucket size (default: {RATE_LIMIT}).")
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args(argv)
+
+    server = MockCanvasServer((args.host, args.port), args.folder, args.token, args.per_page, args.attempts,
+                              args.latency, args.rate_limit, args.verbose)
+    print(f"Serving {len(server.quizzes)} quiz(zes) from {args.folder} as course {COURSE_ID} at {server.base_url}")
+    print(f"Try: python CanvasQuizExtractor.py fetch --url {server.base_url} --course {COURSE_ID}"
+          + (f" --token {args.token}" if args.token else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped. {server.stats}")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
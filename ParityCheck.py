@@ -0,0 +1,129 @@
+'''
+Canvas:   Quiz Extractor - Parser Parity Check
+Brief:    Runs every installed parser engine over a corpus of sample reports
+          and verifies they all produce byte-identical output files.
+
+Usage:    python ParityCheck.py [corpus_dir ...]
+'''
+
+import os
+import sys
+import tempfile
+import HTML_Extract
+import ParserBackend
+
+
+# Default corpus of sample reports
+SAMPLES_FOLDER = "Samples"
+
+# Engine every other engine is compared against
+REFERENCE_ENGINE = "html.parser"
+
+# Extraction functions checked for each report
+EXTRACTORS = {
+    "taken": HTML_Extract.process_taken_quiz,
+    "untaken": HTML_Extract.process_untaken_quiz,
+}
+
+
+def find_reports(folders):
+    """
+    Lists the HTML reports in the given folders.
+
+    Args:
+        folders (list): Directories to search (non-recursive).
+
+    Returns:
+        list: Paths of the HTML files found.
+    """
+    reports = []
+    for folder in folders:
+        if not os.path.isdir(folder):
+            print(f"The directory {folder} does not exist.")
+            continue
+        reports.extend(
+            os.path.join(folder, name) for name in sorted(os.listdir(folder))
+            if name.lower().endswith((".html", ".htm"))
+        )
+    return reports
+
+
+def render(extractor, report, engine, work_dir):
+    """
+    Runs one extractor over one report with one engine.
+
+    Args:
+        extractor (str): Key into EXTRACTORS.
+        report (str): Path to the HTML report.
+        engine (str): Parser engine name.
+        work_dir (str): Directory for the output file.
+
+    Returns:
+        bytes: The output file contents, or the error raised as bytes so that
+               engines which fail the same way still compare equal.
+    """
+    output_path = os.path.join(work_dir, f"{extractor}-{engine}.txt")
+    try:
+        EXTRACTORS[extractor](report, output_path, "0", "Parity", engine)
+    except Exception as error:
+        return f"ERROR {type(error).__name__}: {error}".encode()
+    with open(output_path, "rb") as file:
+        return file.read()
+
+
+def check(reports, engines):
+    """
+    Compares the output of every engine against the reference engine.
+
+    Args:
+        reports (list): Paths of the HTML reports.
+        engines (list): Installed engine names.
+
+    Returns:
+        int: The number of (report, extractor, engine) combinations that differ.
+    """
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        for report in reports:
+            for extractor in EXTRACTORS:
+                expected = render(extractor, report, REFERENCE_ENGINE, work_dir)
+                for engine in engines:
+                    if engine == REFERENCE_ENGINE:
+                        continue
+                    if render(extractor, report, engine, work_dir) == expected:
+                        print(f"[same]   {report} ({extractor}) {engine}")
+                    else:
+                        mismatches += 1
+                        print(f"[DIFFER] {report} ({extractor}) {engine} != {REFERENCE_ENGINE}")
+    return mismatches
+
+
+def main(argv=None):
+    """
+    Runs the parity check over the given corpus folders.
+
+    Args:
+        argv (list, optional): Corpus folders. Defaults to the Samples folder.
+
+    Returns:
+        int: 0 if all engines agree, 1 otherwise.
+    """
+    folders = (sys.argv[1:] if argv is None else argv) or [SAMPLES_FOLDER]
+    engines = ParserBackend.available_engines()
+    if REFERENCE_ENGINE not in engines:
+        print(f"The reference engine '{REFERENCE_ENGINE}' (BeautifulSoup) is not installed.")
+        return 1
+
+    reports = find_reports(folders)
+    if not reports:
+        print("No sample reports found.")
+        return 1
+
+    print(f"Engines: {', '.join(engines)}\n")
+    mismatches = check(reports, engines)
+    print(f"\n{len(reports)} report(s), {mismatches} mismatch(es).")
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+'''
+Canvas:   Quiz Extractor - Parse Cache
+Brief:    On-disk cache of extracted question records, keyed by the SHA-256 of
+          the report bytes and the extractor version, so re-running on
+          unchanged reports skips parsing entirely.
+'''
+
+import os
+import pickle
+import hashlib
+import tempfile
+import FileProcess
+import HTML_Extract
+
+
+# Default cache location and size limit
+CACHE_FOLDER = ".quiz_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Bytes hashed per read
+HASH_CHUNK_SIZE = 1 << 20
+
+# Extension of cache entry files
+ENTRY_EXTENSION = ".pkl"
+
+# The cache folder is only scanned again once this share of max_bytes has been
+# stored since the last scan, and an eviction frees the cache down to
+# EVICT_TO of max_bytes, so neither happens on every store
+SCAN_SHARE = 1 / 16
+EVICT_TO = 7 / 8
+
+# Bytes in each cache folder at its last scan and stored by this process since,
+# shared by the ParseCache instances of a process (one per job)
+USAGE = {}
+
+
+def hash_file(file_path):
+    """
+    Computes the SHA-256 of a file without reading it into memory at once.
+
+    Args:
+        file_path (str): Path to the file, or of an archive member (see FileProcess.member_path).
+
+    Returns:
+        str: The hex digest.
+    """
+    if FileProcess.split_member_path(file_path)[1] is not None:
+        # Archive members are read whole: they can only be streamed out of the archive once
+        return hashlib.sha256(FileProcess.read_input(file_path)).hexdigest()
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Content-addressed cache of extracted question records.
+
+    Entries are pickled files named after their key. Reading an entry bumps
+    its modification time, and the least recently used entries are evicted
+    once the cache grows beyond max_bytes. The size of the cache is kept as
+    a running total between scans of the folder (see SCAN_SHARE), so a
+    store does not list the whole cache.
+
+    Attributes:
+        folder (str): Directory holding the cache entries.
+        max_bytes (int): Size limit of the cache directory.
+        rebuild (bool): If True, lookups always miss and entries are rewritten.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that required parsing the report.
+    """
+
+    def __init__(self, folder=CACHE_FOLDER, max_bytes=DEFAULT_MAX_BYTES, rebuild=False):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.rebuild = rebuild
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, file_path, method, digest=None):
+        """
+        Builds the cache key of a report.
+
+        Args:
+            file_path (str): Path to the HTML report.
+            method (str): Extraction method ("taken" or "untaken").
+            digest (str, optional): SHA-256 of the report bytes, if already
+                known; the file is not read then.
+
+        Returns:
+            str: Hex digest identifying the report contents, method and
+                 extractor version.
+        """
+        key = hashlib.sha256()
+        key.update(f"{HTML_Extract.EXTRACTOR_VERSION}:{method}:".encode())
+        key.update((digest or hash_file(file_path)).encode())
+        return key.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.folder, key + ENTRY_EXTENSION)
+
+    def lookup(self, file_path, method, digest=None):
+        """
+        Looks up the extracted records of a report.
+
+        Args:
+            file_path (str): Path to the HTML report.
+            method (str): Extraction method ("taken" or "untaken").
+            digest (str, optional): SHA-256 of the report bytes, see key().
+
+        Returns:
+            tuple: (key, records). records is None on a miss; pass the key to
+                   store() once the report has been extracted. An entry that
+                   cannot be read back is deleted and counts as a miss.
+        """
+        key = self.key(file_path, method, digest)
+        if not self.rebuild:
+            entry_path = self._entry_path(key)
+            try:
+                with open(entry_path, "rb") as file:
+                    records = pickle.load(file)
+                os.utime(entry_path)  # Mark as recently used
+                self.hits += 1
+                return key, records
+            except FileNotFoundError:
+                pass
+            except Exception:
+                # Truncated, or pickled by a version whose classes no longer load
+                try:
+                    os.unlink(entry_path)
+                except OSError:
+                    pass
+        self.misses += 1
+        return key, None
+
+    def store(self, key, records):
+        """
+        Stores the extracted records of a report and evicts old entries.
+
+        The entry is written to a temporary file and renamed into place, so
+        concurrent workers never see a partially written entry.
+
+        Args:
+            key (str): The key returned by lookup().
+            records (list): The extracted question records.
+
+        Returns:
+            None
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as file:
+                pickle.dump(records, file, protocol=pickle.HIGHEST_PROTOCOL)
+                size = file.tell()
+            os.replace(temp_path, self._entry_path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        # Other workers store into the same folder, so the running total is
+        # only trusted for a share of max_bytes before the folder is scanned again
+        usage = USAGE.get(os.path.abspath(self.folder))
+        if usage is None or usage["unscanned"] + size > self.max_bytes * SCAN_SHARE:
+            self.evict()
+            return
+        usage["total"] += size
+        usage["unscanned"] += size
+        if usage["total"] > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """
+        Scans the cache and, if it is larger than max_bytes, deletes the least
+        recently used entries until it fits in EVICT_TO of max_bytes.
+
+        Returns:
+            int: The number of entries deleted.
+        """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(ENTRY_EXTENSION):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Removed by another worker
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        deleted = 0
+        if total > self.max_bytes:
+            for _mtime, size, path in sorted(entries):
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                try:
+                    os.unlink(path)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+        USAGE[os.path.abspath(self.folder)] = {"total": total, "unscanned": 0}
+        return deleted
@@ -0,0 +1,542 @@
+'''
+Canvas:   Quiz Extractor - Parser Backends
+Brief:    Selects the HTML parser engine used by HTML_Extract. Supports
+          BeautifulSoup (html.parser or lxml tree builders) and direct lxml /
+          selectolax parsing that skips BeautifulSoup completely.
+'''
+
+import re
+import abc
+import mmap
+import functools
+import importlib.util
+import Instrumentation
+
+
+# Parser engines, fastest first. "auto" picks the first one that is installed.
+ENGINES = ("selectolax", "lxml-direct", "lxml", "html.parser")
+
+# Module each engine needs to be importable
+ENGINE_REQUIREMENTS = {
+    "selectolax": ("selectolax",),
+    "lxml-direct": ("lxml",),
+    "lxml": ("bs4", "lxml"),
+    "html.parser": ("bs4",),
+}
+
+# Tags whose text is never part of get_text(), matching BeautifulSoup
+NON_TEXT_TAGS = frozenset(("script", "style", "template"))
+
+# Bytes read from the report per step while streaming questions
+CHUNK_SIZE = 1 << 16
+
+# Markup the question scanner cares about: comments, raw-text elements whose
+# content is not HTML, and div start/end tags
+SCAN_TOKEN = re.compile(rb"<!--|<(script|style)\b|<(/?)div\b[^>]*>", re.IGNORECASE)
+COMMENT_END = re.compile(rb"-->")
+RAW_TEXT_END = {
+    b"script": re.compile(rb"</script\s*>", re.IGNORECASE),
+    b"style": re.compile(rb"</style\s*>", re.IGNORECASE),
+}
+# Matches the display_question class whether the strainer sees the raw class
+# attribute or the split list of classes
+QUESTION_CLASS = re.compile(r"(^|\s)display_question(\s|$)")
+CLASS_ATTRIBUTE = re.compile(rb"""\sclass\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=None)
+def available_engines():
+    """
+    Lists the parser engines whose dependencies are installed.
+
+    Returns:
+        tuple: Engine names in order of preference.
+    """
+    return tuple(
+        engine for engine in ENGINES
+        if all(importlib.util.find_spec(module) for module in ENGINE_REQUIREMENTS[engine])
+    )
+
+
+def resolve_engine(engine=None):
+    """
+    Resolves the engine to use, auto-detecting the fastest installed one.
+
+    Args:
+        engine (str, optional): An engine name, or None/"auto" to auto-detect.
+
+    Returns:
+        str: The name of an installed engine.
+
+    Raises:
+        ValueError: If the requested engine is unknown or not installed.
+    """
+    installed = available_engines()
+    if engine in (None, "auto"):
+        # html.parser is the fallback when nothing faster is installed
+        return installed[0] if installed else "html.parser"
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown parser engine '{engine}'. Choose from: {', '.join(ENGINES)}.")
+    if engine not in installed:
+        missing = ", ".join(ENGINE_REQUIREMENTS[engine])
+        raise ValueError(f"Parser engine '{engine}' is not installed (requires {missing}).")
+    return engine
+
+
+def parse_html(html_content, engine=None, encoding="utf-8"):
+    """
+    Parses an HTML document with the selected engine.
+
+    The returned root supports the subset of the BeautifulSoup API used by
+    HTML_Extract (find, find_all, get, get_text), whichever engine is used.
+
+    Args:
+        html_content (str | bytes): The HTML document. Bytes are handed to the
+            parser undecoded.
+        engine (str, optional): Parser engine name. Auto-detected if None.
+        encoding (str, optional): Encoding of html_content when it is bytes.
+
+    Returns:
+        The root node of the parsed document.
+    """
+    engine = resolve_engine(engine)
+
+    if engine == "selectolax":
+        from selectolax.lexbor import LexborHTMLParser
+        if isinstance(html_content, bytes) and encoding != "utf-8":
+            html_content = html_content.decode(encoding)  # lexbor reads bytes as UTF-8
+        return SelectolaxNode(LexborHTMLParser(html_content).root)
+
+    if engine == "lxml-direct":
+        from lxml import etree
+        parser = etree.HTMLParser(encoding=encoding) if isinstance(html_content, bytes) else etree.HTMLParser()
+        root = etree.fromstring(html_content, parser)
+        return LxmlNode(root) if root is not None else EmptyNode()
+
+    from bs4 import BeautifulSoup
+    if isinstance(html_content, bytes):
+        return BeautifulSoup(html_content, engine, from_encoding=encoding)
+    return BeautifulSoup(html_content, engine)
+
+
+def _is_question_start(tag):
+    """
+    Checks whether a div start tag (as bytes) has the display_question class.
+
+    Args:
+        tag (bytes): The raw start tag, e.g. b'<div class="display_question">'.
+
+    Returns:
+        bool: True if the tag opens a question block.
+    """
+    match = CLASS_ATTRIBUTE.search(tag)
+    if not match:
+        return False
+    value = match.group(1) or match.group(2) or match.group(3) or b""
+    return b"display_question" in value.split()
+
+
+def iter_question_fragments(source, chunk_size=CHUNK_SIZE):
+    """
+    Streams the raw HTML of each div.display_question block in a report.
+
+    The report is scanned for question blocks; everything else (navigation,
+    scripts, sidebars, CSS) is skipped without being parsed. A stream is read
+    in chunks and only the bytes of the question currently being scanned are
+    kept, so memory use is bounded by the largest single question. A buffer
+    (e.g. a memory-mapped report) is scanned in place without any copy.
+
+    Args:
+        source: A binary file-like object positioned at the start of the
+            report, or the report's bytes (bytes, mmap.mmap, ...).
+        chunk_size (int, optional): Bytes to read per step from a stream.
+
+    Yields:
+        bytes: The markup of one question, from its opening <div> to the
+               matching </div>.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        buffer, stream, at_eof = source, None, True  # Everything is already in the buffer
+    else:
+        buffer, stream, at_eof = b"", source, False
+    position = 0        # Where scanning resumes in the buffer
+    start = None        # Buffer offset of the open question, if any
+    depth = 0           # Div nesting depth inside the open question
+
+    while True:
+        match = SCAN_TOKEN.search(buffer, position)
+        if match:
+            token_end = match.end()
+            if match.group(0) == b"<!--" or match.group(1):
+                # Skip comments and raw text so markup inside them is ignored
+                closer = COMMENT_END if match.group(0) == b"<!--" else RAW_TEXT_END[match.group(1).lower()]
+                end_match = closer.search(buffer, token_end)
+                if end_match:
+                    position = end_match.end()
+                    continue
+                if at_eof:
+                    break
+                # Incomplete: rescan from this token once more data arrives
+                position = match.start()
+            elif depth == 0:
+                if match.group(2) == b"" and _is_question_start(match.group(0)):
+                    start, depth = match.start(), 1
+                position = token_end
+                continue
+            else:
+                depth += 1 if match.group(2) == b"" else -1
+                position = token_end
+                if depth == 0:
+                    yield bytes(buffer[start:token_end])
+                    start = None
+                continue
+
+        # No complete token left in the buffer: read more of the report
+        if at_eof:
+            if start is not None:
+                # Unterminated question: the parser closes it, as it would in the full page
+                yield bytes(buffer[start:])
+            break
+        if start is None:
+            # Keep only a possibly incomplete token at the end of the buffer
+            keep_from = position if match else max(buffer.rfind(b"<", position), position)
+            buffer, position = buffer[keep_from:], 0
+        elif not match:
+            # Rescan a possibly incomplete tag at the end of the buffer
+            position = max(buffer.rfind(b"<", position), position)
+        chunk = stream.read(chunk_size)
+        if chunk:
+            buffer += chunk
+        else:
+            at_eof = True
+
+
+def normalize_newlines(fragment):
+    """Converts the line endings of a question block to universal newlines, as reading in text mode would."""
+    return fragment.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+
+def parse_question(fragment, engine=None, encoding="utf-8"):
+    """
+    Parses the markup of a single question block.
+
+    For the BeautifulSoup engines a SoupStrainer limits the tree to the
+    div.display_question element itself.
+
+    Args:
+        fragment (str | bytes): The markup produced by iter_question_fragments.
+        engine (str, optional): Parser engine name. Auto-detected if None.
+        encoding (str, optional): Encoding of fragment when it is bytes.
+
+    Returns:
+        The div.display_question node, or None if the fragment holds none.
+    """
+    engine = resolve_engine(engine)
+    if engine in ("lxml", "html.parser"):
+        from bs4 import BeautifulSoup, SoupStrainer
+        strainer = SoupStrainer("div", class_=QUESTION_CLASS)
+        options = {"from_encoding": encoding} if isinstance(fragment, bytes) else {}
+        return BeautifulSoup(fragment, engine, parse_only=strainer, **options).find("div", class_="display_question")
+    for node in parse_html(fragment, engine, encoding).descendants("div"):
+        if "display_question" in node.get("class", ()):
+            return node
+    return None
+
+
+def iter_questions(source, engine=None, encoding="utf-8"):
+    """
+    Streams the parsed div.display_question nodes of a report, one at a time.
+
+    Each question is parsed on its own and released once the caller moves on
+    to the next one, so the whole page is never held as a tree. The question
+    bytes go to the parser undecoded.
+
+    Args:
+        source: A binary stream or the report's bytes (see
+            iter_question_fragments), in an ASCII-compatible encoding.
+        engine (str, optional): Parser engine name. Auto-detected if None.
+        encoding (str, optional): Text encoding of the report.
+
+    Yields:
+        The parsed question nodes in document order.
+    """
+    engine = resolve_engine(engine)
+    fragments = iter_question_fragments(source)
+    parse = parse_question
+    metrics = Instrumentation.current()
+    if metrics:
+        # Scanning the report for the next question counts as reading it
+        fragments = metrics.timed_iter("read", fragments)
+        parse = metrics.timed("parse", parse_question)
+    for fragment in fragments:
+        question = parse(normalize_newlines(fragment), engine, encoding)
+        if question is not None:
+            yield question
+
+
+def walk(node):
+    """
+    Visits every element below a node once, in document order.
+
+    This is the single traversal the extractors use instead of repeated
+    find/find_all calls: the depth lets the caller tell which of the
+    elements seen so far enclose the current one. Sending True to the
+    iterator (instead of calling next) skips the descendants of the element
+    it yielded last, e.g. once a text container has been found.
+
+    Args:
+        node: A BeautifulSoup Tag or a direct-engine Node.
+
+    Returns:
+        iterator: (depth, element) pairs, with depth 1 for the node's children.
+    """
+    if isinstance(node, Node):
+        return node.walk()
+    return _walk_tag(node)
+
+
+def _walk_tag(tag):
+    """ParserBackend.walk for a BeautifulSoup Tag."""
+    # Strings and comments have no tag name
+    stack = [iter(tag.contents)]
+    while stack:
+        for child in stack[-1]:
+            if child.name is not None:
+                if not (yield len(stack), child):
+                    stack.append(iter(child.contents))
+                break
+        else:
+            stack.pop()
+
+
+def _class_matches(classes, class_):
+    """
+    Matches a class_ filter the way BeautifulSoup does.
+
+    A single class name matches if it is any of the element's classes; a
+    value containing spaces must equal the whole class attribute.
+
+    Args:
+        classes (list): The element's classes.
+        class_ (str): The class filter.
+
+    Returns:
+        bool: True if the element matches.
+    """
+    if " " in class_:
+        return " ".join(classes) == class_
+    return class_ in classes
+
+
+class Node(abc.ABC):
+    """
+    Minimal BeautifulSoup-compatible element used by the direct engines.
+
+    Subclasses provide the tag name, attributes and children of the wrapped
+    element; searching and text extraction are shared. The attribute
+    dictionary is only built when first used, so walking a tree and reading
+    one attribute per element stays cheap.
+    """
+
+    __slots__ = ("name", "_attrs")
+
+    @property
+    def attrs(self):
+        """The element's attributes in BeautifulSoup's form."""
+        if self._attrs is None:
+            self._attrs = self._read_attrs()
+        return self._attrs
+
+    @abc.abstractmethod
+    def _read_attrs(self):
+        """Builds the attribute dictionary of the wrapped element."""
+
+    @abc.abstractmethod
+    def children(self):
+        """Yields child Nodes and text strings in document order."""
+
+    def get(self, key, default=None):
+        """Returns an attribute value, like Tag.get."""
+        return self.attrs.get(key, default)
+
+    def descendants(self, name=None):
+        """Yields every descendant Node (optionally only one tag) in document order."""
+        # Children are Nodes or text strings; testing for str skips the slower abstract class check
+        for child in self.children():
+            if not isinstance(child, str):
+                if name is None or child.name == name:
+                    yield child
+                yield from child.descendants(name)
+
+    def strings(self):
+        """Yields the text strings BeautifulSoup would include in get_text()."""
+        for child in self.children():
+            if isinstance(child, str):
+                yield child
+            elif child.name not in NON_TEXT_TAGS:
+                yield from child.strings()
+
+    def walk(self):
+        """Yields (depth, Node) for every descendant element, like ParserBackend.walk."""
+        stack = [self.children()]
+        while stack:
+            for child in stack[-1]:
+                if not isinstance(child, str):
+                    if not (yield len(stack), child):
+                        stack.append(child.children())
+                    break
+            else:
+                stack.pop()
+
+    def find_all(self, name=None, class_=None, **attrs):
+        """Returns all matching descendants, like Tag.find_all."""
+        found = []
+        for node in self.descendants(name):
+            if class_ is not None and not _class_matches(node.attrs.get("class", []), class_):
+                continue
+            if all(
+                (key in node.attrs) if value is True else node.attrs.get(key) == value
+                for key, value in attrs.items()
+            ):
+                found.append(node)
+        return found
+
+    def find(self, name=None, class_=None, **attrs):
+        """Returns the first matching descendant or None, like Tag.find."""
+        found = self.find_all(name, class_, **attrs)
+        return found[0] if found else None
+
+    def get_text(self, separator="", strip=False):
+        """Joins the element's text strings, like Tag.get_text."""
+        if strip:
+            return separator.join(text.strip() for text in self.strings() if text.strip())
+        return separator.join(self.strings())
+
+
+class EmptyNode(Node):
+    """Stands in for the root of a document with no content."""
+
+    __slots__ = ()
+
+    def __init__(self):
+        self.name = "[document]"
+        self._attrs = {}
+
+    def _read_attrs(self):
+        return {}
+
+    def children(self):
+        return iter(())
+
+
+def _normalize_attrs(attrs):
+    """
+    Converts raw attributes to BeautifulSoup's form: "class" is a list and
+    valueless attributes are empty strings.
+
+    Args:
+        attrs (dict): Raw attribute mapping.
+
+    Returns:
+        dict: The normalized attributes.
+    """
+    attrs = {key: ("" if value is None else value) for key, value in attrs.items()}
+    if "class" in attrs:
+        attrs["class"] = attrs["class"].split()
+    return attrs
+
+
+class LxmlNode(Node):
+    """Wraps an lxml element."""
+
+    __slots__ = ("element",)
+
+    def __init__(self, element):
+        self.element = element
+        self.name = element.tag
+        self._attrs = None
+
+    def _read_attrs(self):
+        return _normalize_attrs(dict(self.element.attrib))
+
+    def get(self, key, default=None):
+        value = self.element.get(key)
+        if value is None:
+            return default
+        return value.split() if key == "class" else value
+
+    def children(self):
+        if self.element.text:
+            yield self.element.text
+        for child in self.element:
+            # Comments and processing instructions have a non-string tag
+            if isinstance(child.tag, str):
+                yield LxmlNode(child)
+            if child.tail:
+                yield child.tail
+
+    def descendants(self, name=None):
+        elements = self.element.iter(name) if name else self.element.iter()
+        for element in elements:
+            if element is not self.element and isinstance(element.tag, str):
+                yield LxmlNode(element)
+
+    def walk(self):
+        from lxml import etree
+        depth = 0
+        walker = etree.iterwalk(self.element, events=("start", "end"))
+        for event, element in walker:
+            if event == "end":
+                depth -= 1
+                continue
+            if depth and (yield depth, LxmlNode(element)):
+                walker.skip_subtree()  # The element's end event still comes
+            depth += 1
+
+
+class SelectolaxNode(Node):
+    """Wraps a selectolax (lexbor) node."""
+
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+        self.name = node.tag
+        self._attrs = None
+
+    def _read_attrs(self):
+        return _normalize_attrs(self.node.attributes)
+
+    def get(self, key, default=None):
+        attributes = self.node.attributes
+        if key not in attributes:
+            return default
+        value = attributes[key]
+        if value is None:
+            return ""
+        return value.split() if key == "class" else value
+
+    def children(self):
+        for child in self.node.iter(include_text=True):
+            if child.is_element_node:
+                yield SelectolaxNode(child)
+            elif child.is_text_node:
+                yield child.text_content
+
+    def descendants(self, name=None):
+        nodes = self.node.traverse()
+        next(nodes, None)  # traverse() starts with the node itself
+        for node in nodes:
+            if name is None or node.tag == name:
+                yield SelectolaxNode(node)
+
+    def walk(self):
+        stack = [self.node.iter(include_text=False)]
+        while stack:
+            for child in stack[-1]:
+                if child.is_element_node:
+                    if not (yield len(stack), SelectolaxNode(child)):
+                        stack.append(child.iter(include_text=False))
+                    break
+            else:
+                stack.pop()
@@ -0,0 +1,489 @@
+'''
+Canvas:   Quiz Extractor - Question Bank
+Brief:    Persistent SQLite bank of every question seen across attempts,
+          quizzes and classes. Duplicate questions are merged on a hash of
+          their normalized text and options and keep running statistics.
+          The question and answer text is kept in a full-text index for
+          searching.
+'''
+
+import os
+import re
+import json
+import sqlite3
+import hashlib
+from datetime import datetime
+import FileProcess
+import HTML_Extract
+import ParseCache
+import QuizExport
+import QuizModel
+
+
+# Default location of the bank
+BANK_FILE = os.path.join(FileProcess.OUTPUT_FOLDER, "question_bank.sqlite")
+
+# Version of the question keys stored in text_hash. Banks from before
+# version 1 keyed questions on their text alone and are re-keyed on open.
+KEY_VERSION = 1
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS questions (
+        id INTEGER PRIMARY KEY,
+        text_hash TEXT NOT NULL UNIQUE,
+        question_text TEXT NOT NULL,
+        question_type TEXT NOT NULL DEFAULT '',
+        times_seen INTEGER NOT NULL DEFAULT 0,
+        times_correct INTEGER NOT NULL DEFAULT 0,
+        best_points REAL,
+        points_possible REAL,
+        best_answer TEXT,
+        first_seen TEXT,
+        last_seen TEXT
+    );
+    CREATE TABLE IF NOT EXISTS reports (
+        id INTEGER PRIMARY KEY,
+        content_hash TEXT NOT NULL UNIQUE,
+        source TEXT,
+        class_name TEXT,
+        quiz_number TEXT,
+        method TEXT,
+        ingested_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS occurrences (
+        report_id INTEGER NOT NULL REFERENCES reports(id),
+        position INTEGER NOT NULL,
+        question_id INTEGER NOT NULL REFERENCES questions(id),
+        has_points INTEGER,
+        points_awarded REAL,
+        points_possible REAL,
+        is_correct INTEGER,
+        answers TEXT,
+        PRIMARY KEY (report_id, position)
+    );
+    CREATE INDEX IF NOT EXISTS occurrences_question ON occurrences(question_id);
+    CREATE INDEX IF NOT EXISTS reports_class ON reports(class_name, quiz_number);
+"""
+
+# Merge a question into the bank. Every SET expression sees the row as it
+# was before this update, so best_answer is compared against the old best.
+UPSERT_QUESTION = """
+    INSERT INTO questions (text_hash, question_text, question_type, times_seen, times_correct,
+                           best_points, points_possible, best_answer, first_seen, last_seen)
+    VALUES (:text_hash, :question_text, :question_type, 1, :correct,
+            :points, :points_possible, :answer, :seen, :seen)
+    ON CONFLICT(text_hash) DO UPDATE SET
+        times_seen = times_seen + 1,
+        times_correct = times_correct + excluded.times_correct,
+        best_answer = CASE
+            WHEN excluded.best_points IS NOT NULL AND (best_points IS NULL OR excluded.best_points > best_points)
+            THEN excluded.best_answer ELSE best_answer END,
+        best_points = CASE
+            WHEN excluded.best_points IS NOT NULL AND (best_points IS NULL OR excluded.best_points > best_points)
+            THEN excluded.best_points ELSE best_points END,
+        points_possible = COALESCE(excluded.points_possible, points_possible),
+        question_type = CASE WHEN question_type = '' THEN excluded.question_type ELSE question_type END,
+        last_seen = excluded.last_seen
+"""
+
+# Full-text index of the question and answer text, one row per question
+# (rowid = questions.id). Uses FTS5 when SQLite was built with it.
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS question_index USING fts5(
+        question_text, answer_text, tokenize = 'unicode61 remove_diacritics 2'
+    );
+"""
+
+# Built-in inverted index used when FTS5 is not available
+TERMS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS question_terms (
+        term TEXT NOT NULL,
+        question_id INTEGER NOT NULL REFERENCES questions(id),
+        frequency INTEGER NOT NULL,
+        PRIMARY KEY (term, question_id)
+    ) WITHOUT ROWID;
+"""
+
+# Restricts search results to the questions seen in a class and/or quiz
+FILTER_OCCURRENCES = """
+    SELECT 1 FROM occurrences o JOIN reports r ON r.id = o.report_id
+    WHERE o.question_id = q.id
+      AND (:class_name IS NULL OR r.class_name = :class_name)
+      AND (:quiz_number IS NULL OR r.quiz_number = :quiz_number)
+"""
+
+WHITESPACE = re.compile(r"\s+")
+TOKEN = re.compile(r"\w+")
+
+
+def normalize_text(text):
+    """
+    Normalizes question text for duplicate detection: case, NBSPs and runs of
+    whitespace are ignored.
+
+    Args:
+        text (str): The question text.
+
+    Returns:
+        str: The normalized text.
+    """
+    return WHITESPACE.sub(" ", text.replace("\u00a0", " ")).strip().casefold()
+
+
+def _identity_hash(text, choices):
+    """Hashes a question's normalized text together with its sorted, normalized choices."""
+    identity = "\x1f".join([normalize_text(text)] + sorted(normalize_text(choice) for choice in choices))
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def question_key(question):
+    """
+    Identifies a question across reports: its normalized text plus the
+    options it offers, so that two different questions sharing a stem such as
+    "Which of the following is true?" stay apart.
+
+    Args:
+        question (QuizModel.Question): The extracted question.
+
+    Returns:
+        str: Hex digest used as the question's key in the bank.
+    """
+    choices = [
+        answer.prompt if answer.kind == QuizModel.ANSWER_MATCH else answer.text or ""
+        for answer in question.answers
+        if answer.kind in (QuizModel.ANSWER_OPTION, QuizModel.ANSWER_MATCH)
+    ]
+    return _identity_hash(question.text, choices)
+
+
+def _stored_key(question_text, question_type, answers):
+    """
+    Rebuilds question_key from a stored occurrence, whose answers are the
+    QuizExport.answer_lines of the question.
+
+    Args:
+        question_text (str): The question text.
+        question_type (str): Canvas question type.
+        answers (str): JSON list of answer lines, or None.
+
+    Returns:
+        str: The question's key.
+    """
+    choices = []
+    for line in json.loads(answers or "[]"):
+        if line.startswith(("[x] ", "[ ] ")):
+            choices.append(line[4:])
+        elif question_type == "matching_question" and " -> " in line:
+            choices.append(line.rsplit(" -> ", 1)[0])
+    return _identity_hash(question_text, choices)
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase word tokens (used by the built-in index).
+
+    Args:
+        text (str): Question or answer text.
+
+    Returns:
+        list: The tokens in order of appearance.
+    """
+    return TOKEN.findall(text.casefold())
+
+
+class QuestionBank:
+    """
+    SQLite-backed bank of unique questions with per-question statistics.
+
+    Each ingested report is recorded by its content hash, so ingesting the
+    same report twice is a no-op. Ingesting a new report only touches the
+    rows of its own questions.
+
+    Attributes:
+        path (str): Path of the SQLite database.
+        connection (sqlite3.Connection): The open database.
+        fts (bool): True if the search index uses FTS5, False if it uses
+            the built-in question_terms table.
+    """
+
+    def __init__(self, path=BANK_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self._upgrade_keys()
+        self._open_index()
+
+    def _upgrade_keys(self):
+        """
+        Re-keys the questions of a bank built before KEY_VERSION from their
+        text and the options of their first occurrence. Rows that an older
+        bank already merged on text alone stay merged.
+        """
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version >= KEY_VERSION:
+            return
+        with self.connection:
+            rows = self.connection.execute("""
+                SELECT q.id, q.question_text, q.question_type,
+                       (SELECT o.answers FROM occurrences o WHERE o.question_id = q.id
+                        ORDER BY o.report_id, o.position LIMIT 1)
+                FROM questions q
+            """).fetchall()
+            # Park the old keys first so a new key never collides with one not yet replaced
+            self.connection.execute("UPDATE questions SET text_hash = 'old:' || text_hash")
+            self.connection.executemany(
+                "UPDATE questions SET text_hash = ? WHERE id = ?",
+                [(_stored_key(text, question_type, answers), question_id)
+                 for question_id, text, question_type, answers in rows],
+            )
+            self.connection.execute(f"PRAGMA user_version = {KEY_VERSION}")
+
+    def _open_index(self):
+        """Creates the search index if needed and fills it for banks built before it existed."""
+        existing = {name for (name,) in self.connection.execute("SELECT name FROM sqlite_master")}
+        try:
+            self.connection.executescript(FTS_SCHEMA)
+            self.fts = True
+            index_table = "question_index"
+        except sqlite3.OperationalError:
+            self.connection.executescript(TERMS_SCHEMA)
+            self.fts = False
+            index_table = "question_terms"
+
+        if index_table not in existing:
+            with self.connection:
+                rows = self.connection.execute("SELECT id, question_text FROM questions").fetchall()
+                for question_id, question_text in rows:
+                    self._index_question(question_id, question_text)
+
+    def _answer_lines(self, question_id):
+        """The distinct answer lines of every occurrence of a question, in the order first seen."""
+        lines = {}
+        for (answers,) in self.connection.execute(
+            "SELECT answers FROM occurrences WHERE question_id = ? ORDER BY report_id, position", (question_id,)
+        ):
+            lines.update(dict.fromkeys(json.loads(answers or "[]")))
+        return list(lines)
+
+    def _index_question(self, question_id, question_text, reindex=False):
+        """
+        Adds a question's text and the answer lines of all its occurrences to
+        the search index. With reindex, its previous entry is replaced first,
+        so answers first seen in a later report become searchable.
+        """
+        if reindex:
+            if self.fts:
+                self.connection.execute("DELETE FROM question_index WHERE rowid = ?", (question_id,))
+            else:
+                self.connection.execute("DELETE FROM question_terms WHERE question_id = ?", (question_id,))
+        answer_text = "\n".join(self._answer_lines(question_id))
+        if self.fts:
+            self.connection.execute(
+                "INSERT INTO question_index (rowid, question_text, answer_text) VALUES (?, ?, ?)",
+                (question_id, question_text, answer_text),
+            )
+            return
+        frequencies = {}
+        for term in tokenize(question_text) + tokenize(answer_text):
+            frequencies[term] = frequencies.get(term, 0) + 1
+        self.connection.executemany(
+            "INSERT INTO question_terms (term, question_id, frequency) VALUES (?, ?, ?)",
+            [(term, question_id, count) for term, count in frequencies.items()],
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def ingest_quiz(self, quiz, class_name, quiz_number, content_hash):
+        """
+        Merges the questions of one extracted report into the bank.
+
+        Args:
+            quiz (QuizModel.Quiz): The extracted report.
+            class_name (str): Class the report belongs to.
+            quiz_number (str): Quiz number identifier.
+            content_hash (str): SHA-256 of the report file.
+
+        Returns:
+            dict: Counts of "new" and "merged" questions and "skipped"
+                  questions without text, or None if the report was
+                  already in the bank.
+        """
+        seen = datetime.now().isoformat(timespec="seconds")
+        counts = {"new": 0, "merged": 0, "skipped": 0}
+
+        with self.connection:  # One transaction per report
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO reports (content_hash, source, class_name, quiz_number, method, ingested_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (content_hash, quiz.source, class_name, quiz_number, quiz.method, seen),
+            )
+            if cursor.rowcount == 0:
+                return None
+            report_id = cursor.lastrowid
+
+            for question in quiz.questions:
+                if not question.text:
+                    counts["skipped"] += 1
+                    continue
+                key = question_key(question)
+                lines = QuizExport.answer_lines(question)
+                answers = json.dumps(lines, ensure_ascii=False)
+                graded = quiz.method == QuizModel.METHOD_TAKEN and question.has_points
+
+                existing = self.connection.execute(
+                    "SELECT id, question_text FROM questions WHERE text_hash = ?", (key,)
+                ).fetchone()
+                counts["merged" if existing else "new"] += 1
+
+                cursor = self.connection.execute(UPSERT_QUESTION, {
+                    "text_hash": key,
+                    "question_text": question.text,
+                    "question_type": question.question_type,
+                    "correct": int(graded and question.is_correct),
+                    "points": question.points_awarded if graded else None,
+                    "points_possible": question.points_possible if graded else None,
+                    "answer": answers if graded else None,
+                    "seen": seen,
+                })
+                question_id = existing[0] if existing else cursor.lastrowid
+                self.connection.execute(
+                    "INSERT INTO occurrences (report_id, position, question_id, has_points, points_awarded,"
+                    " points_possible, is_correct, answers) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (report_id, question.index, question_id, question.has_points, question.points_awarded,
+                     question.points_possible, question.is_correct, answers),
+                )
+                # A merged question is indexed again with the answers of this report added
+                self._index_question(question_id, existing[1] if existing else question.text, reindex=bool(existing))
+        return counts
+
+    def ingest_report(self, file_path, class_name, quiz_number, method=QuizModel.METHOD_TAKEN,
+                      engine=None, cache=None):
+        """
+        Extracts a report and merges its questions into the bank.
+
+        Args:
+            file_path (str): Path to the HTML report.
+            class_name (str): Class the report belongs to.
+            quiz_number (str): Quiz number identifier.
+            method (str, optional): QuizModel.METHOD_TAKEN or QuizModel.METHOD_UNTAKEN.
+            engine (str, optional): Parser engine. Auto-detected if None.
+            cache (ParseCache, optional): Cache of extracted question records.
+
+        Returns:
+            dict: See ingest_quiz.
+        """
+        content_hash = ParseCache.hash_file(file_path)
+        exists = self.connection.execute(
+            "SELECT 1 FROM reports WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        if exists:
+            return None
+        quiz = HTML_Extract.extract_quiz(file_path, method, engine, cache, content_hash)
+        return self.ingest_quiz(quiz, class_name, quiz_number, content_hash)
+
+    def search(self, query, class_name=None, quiz_number=None, limit=10):
+        """
+        Searches the question and answer text, best matches first.
+
+        Every word of the query must appear in the question or its answers.
+        Results are ranked with BM25 when FTS5 is available, otherwise by the
+        number of query word occurrences.
+
+        Args:
+            query (str): Words to search for.
+            class_name (str, optional): Only return questions seen in this class.
+            quiz_number (str, optional): Only return questions seen in this quiz.
+            limit (int, optional): Maximum number of results.
+
+        Returns:
+            list: (question id, question text, times seen, times correct,
+                   best answer JSON or None) tuples.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        params = {"class_name": class_name, "quiz_number": quiz_number, "limit": limit}
+        filtered = class_name is not None or quiz_number is not None
+        filter_clause = f"AND EXISTS ({FILTER_OCCURRENCES})" if filtered else ""
+
+        if self.fts:
+            # Quote every word so user input is never parsed as FTS5 syntax
+            params["match"] = " ".join(f'"{term}"' for term in terms)
+            sql = f"""
+                SELECT q.id, q.question_text, q.times_seen, q.times_correct, q.best_answer
+                FROM question_index JOIN questions q ON q.id = question_index.rowid
+                WHERE question_index MATCH :match {filter_clause}
+                ORDER BY bm25(question_index) LIMIT :limit
+            """
+        else:
+            unique_terms = sorted(set(terms))
+            params.update({f"term{i}": term for i, term in enumerate(unique_terms)})
+            placeholders = ", ".join(f":term{i}" for i in range(len(unique_terms)))
+            params["term_count"] = len(unique_terms)
+            sql = f"""
+                SELECT q.id, q.question_text, q.times_seen, q.times_correct, q.best_answer
+                FROM (SELECT question_id, SUM(frequency) AS score FROM question_terms
+                      WHERE term IN ({placeholders}) GROUP BY question_id
+                      HAVING COUNT(*) = :term_count) matches
+                JOIN questions q ON q.id = matches.question_id
+                WHERE 1 {filter_clause}
+                ORDER BY matches.score DESC, q.id LIMIT :limit
+            """
+        return self.connection.execute(sql, params).fetchall()
+
+    def sources(self, question_id):
+        """
+        Lists where a question was seen.
+
+        Args:
+            question_id (int): Id of the question in the bank.
+
+        Returns:
+            list: Distinct (class_name, quiz_number) pairs.
+        """
+        return self.connection.execute("""
+            SELECT DISTINCT r.class_name, r.quiz_number FROM occurrences o
+            JOIN reports r ON r.id = o.report_id WHERE o.question_id = ?
+            ORDER BY r.class_name, r.quiz_number
+        """, (question_id,)).fetchall()
+
+    def class_stats(self, class_names=None):
+        """
+        Summarizes the bank per class.
+
+        Args:
+            class_names (list, optional): Classes to report on, e.g. from
+                CurrentClasses.txt. Defaults to every class in the bank.
+
+        Returns:
+            list: (class_name, reports, unique questions, times seen, times correct) tuples.
+        """
+        rows = self.connection.execute("""
+            SELECT r.class_name, COUNT(DISTINCT r.id), COUNT(DISTINCT o.question_id),
+                   COUNT(o.question_id), COALESCE(SUM(o.has_points AND o.is_correct), 0)
+            FROM reports r LEFT JOIN occurrences o ON o.report_id = r.id
+            GROUP BY r.class_name ORDER BY r.class_name
+        """).fetchall()
+        if class_names is None:
+            return rows
+        by_class = {row[0]: row for row in rows}
+        return [by_class.get(name, (name, 0, 0, 0, 0)) for name in class_names]
+
+    def totals(self):
+        """
+        Returns:
+            tuple: (unique questions, reports ingested) in the bank.
+        """
+        questions = self.connection.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        reports = self.connection.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        return questions, reports
@@ -0,0 +1,177 @@
+'''
+Canvas:   Quiz Extractor - Question Type Check
+Brief:    Compares the question type handlers (HTML_Extract.register) with
+          the fallback that guesses the answer kind from the markup: how many
+          given answers each one reads per Canvas question type, and how long
+          each takes per question. Runs on a fixture corpus of every handled
+          type (SyntheticReport --all-types) plus any reports given. Fails if
+          a handler reads fewer answers than the fallback. The timings are
+          for information only: the handlers are not measurably faster than
+          the fallback on the types both read alike, so no speed is gated
+          here (compare commits with Benchmark.py --compare).
+
+Usage:    python QuestionTypeCheck.py [report.html ...] [--questions N] [--parser ENGINE] [--repeat N]
+'''
+
+import gc
+import sys
+import time
+import argparse
+from collections import Counter, defaultdict
+import HTML_Extract
+import ParserBackend
+import SyntheticReport
+
+
+# Questions in the generated fixture corpus, cycling through every handled type
+FIXTURE_QUESTIONS = 1100
+
+# Timed passes over the corpus; the fastest time of each question type counts
+REPEAT = 5
+
+
+def fixture_corpus(question_count):
+    """Builds a taken report holding every question type with a handler."""
+    pieces = SyntheticReport.iter_report(question_count, chrome=False, seed=20,
+                                         question_types=SyntheticReport.ALL_QUESTION_TYPES)
+    return "".join(pieces).encode("utf-8")
+
+
+def load_questions(reports, question_count, engine):
+    """
+    Parses the fixture corpus and the given reports into question nodes.
+
+    Returns:
+        list: The div.display_question nodes of every report.
+    """
+    sources = [fixture_corpus(question_count)]
+    for path in reports:
+        with open(path, "rb") as file:
+            sources.append(file.read())
+    nodes = []
+    for data in sources:
+        nodes.extend(ParserBackend.iter_questions(data, engine, "utf-8"))
+    return nodes
+
+
+def extract_pass(nodes, use_handlers):
+    """
+    Extracts every question once, with the registered handlers or with the
+    fallback alone (the registry emptied for the pass). The garbage
+    collector is paused while timing, as timeit does.
+
+    Returns:
+        tuple: (list of QuizModel.Question, dict of seconds per question type).
+    """
+    saved = dict(HTML_Extract.TAKEN_HANDLERS)
+    if not use_handlers:
+        HTML_Extract.TAKEN_HANDLERS.clear()
+    records = []
+    seconds = defaultdict(float)
+    gc.collect()
+    gc.disable()
+    try:
+        for index, node in enumerate(nodes, 1):
+            start = time.perf_counter()
+            record = HTML_Extract.extract_taken_question(node, index)
+            seconds[record.question_type or "unknown"] += time.perf_counter() - start
+            records.append(record)
+    finally:
+        gc.enable()
+        HTML_Extract.TAKEN_HANDLERS.update(saved)
+    return records, seconds
+
+
+def compare(nodes, repeat):
+    """
+    Times the handlers and the fallback in alternating passes, so that both
+    see the same machine load, keeping the fastest time of each type.
+
+    Returns:
+        dict: {True: (records, seconds), False: (records, seconds)}, keyed by use_handlers.
+    """
+    results = {}
+    for round_number in range(max(1, repeat)):
+        for use_handlers in ((True, False) if round_number % 2 else (False, True)):
+            records, seconds = extract_pass(nodes, use_handlers)
+            if use_handlers in results:
+                best = results[use_handlers][1]
+                seconds = {name: min(value, best[name]) for name, value in seconds.items()}
+            results[use_handlers] = (records, seconds)
+    return results
+
+
+def given_answers(records):
+    """Counts the answers with a value (typed, selected or uploaded) per question type."""
+    counts = Counter()
+    for record in records:
+        counts[record.question_type or "unknown"] += sum(
+            1 for answer in record.answers
+            if answer.text is not None and (answer.kind != "option" or answer.selected)
+        )
+    return counts
+
+
+def main(argv=None):
+    """
+    Runs the question type check.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: 0 if the handlers read at least as many answers of every type as
+             the fallback and more in total; 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Compare the question type handlers with the fallback.")
+    parser.add_argument("reports", nargs="*", help="Taken reports to add to the fixture corpus.")
+    parser.add_argument("--questions", type=int, default=FIXTURE_QUESTIONS,
+                        help=f"Questions in the generated fixture (default: {FIXTURE_QUESTIONS}).")
+    parser.add_argument("--parser", dest="engine", default="auto", choices=("auto",) + ParserBackend.ENGINES,
+                        help="HTML parser engine (default: fastest installed).")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help=f"Timed passes (default: {REPEAT}).")
+    args = parser.parse_args(argv)
+
+    engine = ParserBackend.resolve_engine(args.engine)
+    nodes = load_questions(args.reports, args.questions, engine)
+    results = compare(nodes, args.repeat)
+    (handled, handled_seconds), (fallback, fallback_seconds) = results[True], results[False]
+    handled_answers, fallback_answers = given_answers(handled), given_answers(fallback)
+    questions = Counter(record.question_type or "unknown" for record in handled)
+
+    print(f"{len(nodes)} question(s), {engine} parser\n")
+    print(f"{'Question type':34} {'Count':>6} {'Answers':>8} {'(fallback)':>10} {'us/question':>12} {'(fallback)':>10}")
+    failures = 0
+    for question_type in sorted(questions):
+        count = questions[question_type]
+        marker = ""
+        if handled_answers[question_type] < fallback_answers[question_type]:
+            failures += 1
+            marker = "  [LOST ANSWERS]"
+        print(f"{question_type:34} {count:>6} {handled_answers[question_type]:>8} "
+              f"{fallback_answers[question_type]:>10} "
+              f"{handled_seconds[question_type] / count * 1e6:>12.1f} "
+              f"{fallback_seconds[question_type] / count * 1e6:>10.1f}{marker}")
+
+    # Speed is compared on the types both read the same answers of
+    same = [t for t in questions if handled_answers[t] == fallback_answers[t]]
+    same_count = sum(questions[t] for t in same)
+    same_handled = sum(handled_seconds[t] for t in same)
+    same_fallback = sum(fallback_seconds[t] for t in same)
+    print(f"\nAnswers read: {sum(handled_answers.values())} with handlers, {sum(fallback_answers.values())} "
+          f"with the fallback")
+    print(f"Extraction:   {sum(handled_seconds.values()) / len(nodes) * 1e6:.1f} us/question with handlers, "
+          f"{sum(fallback_seconds.values()) / len(nodes) * 1e6:.1f} with the fallback (all types)")
+    if same_count:
+        print(f"              {same_handled / same_count * 1e6:.1f} us/question with handlers, "
+              f"{same_fallback / same_count * 1e6:.1f} with the fallback ({len(same)} type(s) read alike)")
+    if sum(handled_answers.values()) <= sum(fallback_answers.values()):
+        failures += 1
+        print("[COVERAGE] The handlers read no more answers than the fallback")
+
+    print(f"\n{failures} problem(s).")
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+'''
+Canvas:   Quiz Extractor - Quiz Analytics
+Brief:    Aggregate statistics over every taken report in the question bank.
+          Each graded question a report shows becomes one row of a set of
+          parallel columns (NumPy arrays when NumPy is installed, standard
+          library arrays otherwise), and the score distributions, most
+          missed questions, accuracy per question type and attempt trends
+          are all grouped sums over those columns.
+
+Usage:    python CanvasQuizExtractor.py analytics [--bank PATH] [--class NAME] [--top N] [--json FILE]
+'''
+
+import json
+import heapq
+import statistics
+import importlib.util
+from array import array
+import QuizModel
+
+
+# Column backends; "auto" uses NumPy when it is installed
+BACKENDS = ("auto", "numpy", "array")
+
+# Most missed questions listed by default
+TOP_MISSED = 10
+
+# Questions seen fewer times than this are left out of the most missed list
+MIN_SEEN = 1
+
+# Width of the score distribution buckets, in percent
+BUCKET_PERCENT = 10
+
+# One row per graded question of a taken report, in report order
+LOAD_OCCURRENCES = """
+    SELECT o.report_id, o.question_id, q.question_type, o.points_awarded, o.points_possible, o.is_correct
+    FROM occurrences o
+    JOIN reports r ON r.id = o.report_id
+    JOIN questions q ON q.id = o.question_id
+    WHERE r.method = :method AND o.has_points AND (:class_name IS NULL OR r.class_name = :class_name)
+    ORDER BY o.report_id, o.position
+"""
+
+LOAD_REPORTS = """
+    SELECT id, class_name, quiz_number, source, ingested_at FROM reports
+    WHERE method = :method AND (:class_name IS NULL OR class_name = :class_name)
+    ORDER BY id
+"""
+
+
+class ArrayColumns:
+    """
+    The vector operations the analytics need, on the standard array module.
+    Used when NumPy is not installed.
+    """
+
+    name = "array"
+
+    def column(self, values, typecode):
+        """Returns values as a column: "d" float, "q" integer, "b" flag."""
+        return array(typecode, values)
+
+    def codes(self, values):
+        """
+        Numbers the distinct values of a column.
+
+        Returns:
+            tuple: (list of the distinct values, column of each row's code).
+        """
+        index = {}
+        codes = array("q", [index.setdefault(value, len(index)) for value in values])
+        return list(index), codes
+
+    def group_sum(self, codes, size, weights=None):
+        """
+        Returns:
+            list: The sum of weights (or the number of rows) per code, for codes 0 to size - 1.
+        """
+        sums = [0] * size
+        if weights is None:
+            for code in codes:
+                sums[code] += 1
+        else:
+            for code, weight in zip(codes, weights):
+                sums[code] += weight
+        return sums
+
+    def gather(self, table, codes):
+        """Returns the column table[code] for every row's code."""
+        return array("q", [table[code] for code in codes])
+
+
+class NumpyColumns:
+    """The same operations as ArrayColumns, vectorized with NumPy."""
+
+    name = "numpy"
+    DTYPES = {"d": "float64", "q": "int64", "b": "int8"}
+
+    def __init__(self):
+        import numpy
+        self.numpy = numpy
+
+    def column(self, values, typecode):
+        return self.numpy.asarray(values, dtype=self.DTYPES[typecode])
+
+    def codes(self, values):
+        distinct, codes = self.numpy.unique(self.numpy.asarray(values), return_inverse=True)
+        return distinct.tolist(), codes
+
+    def group_sum(self, codes, size, weights=None):
+        return self.numpy.bincount(codes, weights=weights, minlength=size).tolist()
+
+    def gather(self, table, codes):
+        return self.numpy.asarray(table, dtype="int64")[codes]
+
+
+def resolve_backend(name="auto"):
+    """
+    Picks the column backend.
+
+    Args:
+        name (str, optional): One of BACKENDS.
+
+    Returns:
+        ArrayColumns | NumpyColumns: The backend.
+
+    Raises:
+        ValueError: If the backend is unknown, or "numpy" is asked for but not installed.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown analytics backend '{name}'. Choose from: {', '.join(BACKENDS)}.")
+    has_numpy = importlib.util.find_spec("numpy") is not None
+    if name == "numpy" and not has_numpy:
+        raise ValueError("NumPy is not installed (pip install numpy); use --backend array.")
+    return NumpyColumns() if has_numpy and name != "array" else ArrayColumns()
+
+
+class QuizTable:
+    """
+    The graded questions of many taken reports, as parallel columns.
+
+    Attributes:
+        backend (ArrayColumns | NumpyColumns): Column implementation.
+        reports (list): (bank report id, class name, quiz number, source,
+            ingested at) of every taken report, oldest first.
+        rows (int): Number of graded question occurrences.
+        report_codes: Row column: index into reports.
+        question_ids (list): Bank question id of every question code.
+        question_codes: Row column: index into question_ids.
+        type_names (list): Question type of every type code.
+        type_codes: Row column: index into type_names.
+        awarded: Row column: points awarded.
+        possible: Row column: points possible.
+        correct: Row column: 1 if the question was answered correctly.
+    """
+
+    def __init__(self, reports, occurrences, backend):
+        self.backend = backend
+        self.reports = reports
+        self.rows = len(occurrences)
+        report_index = {report[0]: position for position, report in enumerate(reports)}
+
+        report_ids, question_ids, types, awarded, possible, correct = (
+            zip(*occurrences) if occurrences else ((),) * 6
+        )
+        self.report_codes = backend.column([report_index[report_id] for report_id in report_ids], "q")
+        self.question_ids, self.question_codes = backend.codes(backend.column(question_ids, "q"))
+        self.type_names, self.type_codes = backend.codes(types)
+        self.awarded = backend.column(awarded, "d")
+        self.possible = backend.column(possible, "d")
+        self.correct = backend.column(correct, "b")
+
+    @classmethod
+    def from_bank(cls, connection, class_name=None, backend=None):
+        """
+        Loads the taken reports of a question bank.
+
+        Args:
+            connection (sqlite3.Connection): The open question bank.
+            class_name (str, optional): Only load this class.
+            backend (optional): Column backend. Defaults to resolve_backend().
+
+        Returns:
+            QuizTable: The loaded table.
+        """
+        params = {"method": QuizModel.METHOD_TAKEN, "class_name": class_name}
+        reports = connection.execute(LOAD_REPORTS, params).fetchall()
+        occurrences = connection.execute(LOAD_OCCURRENCES, params).fetchall()
+        return cls(reports, occurrences, backend or resolve_backend())
+
+    def attempts(self):
+        """
+        Returns:
+            list: The attempt number of every report: 1 for the first report
+                  of its class and quiz in the bank, 2 for the next, and so on.
+        """
+        counts = {}
+        numbers = []
+        for _report_id, class_name, quiz_number, _source, _ingested in self.reports:
+            key = (class_name, quiz_number)
+            counts[key] = counts.get(key, 0) + 1
+            numbers.append(counts[key])
+        return numbers
+
+
+def _distribution(percentages):
+    """
+    Summarizes a list of report scores.
+
+    Returns:
+        dict: Count, mean, median, standard deviation, min, max and the
+              number of reports per BUCKET_PERCENT wide bucket.
+    """
+    buckets = [0] * (100 // BUCKET_PERCENT)
+    for percentage in percentages:
+        buckets[min(int(percentage // BUCKET_PERCENT), len(buckets) - 1)] += 1
+    return {
+        "reports": len(percentages),
+        "mean": round(statistics.fmean(percentages), 2),
+        "median": round(statistics.median(percentages), 2),
+        "stdev": round(statistics.pstdev(percentages), 2),
+        "min": round(min(percentages), 2),
+        "max": round(max(percentages), 2),
+        "buckets": buckets,
+    }
+
+
+def _quiz_order(class_name, quiz_number):
+    """Sort key listing quiz 2 before quiz 10."""
+    number = str(quiz_number or "")
+    return (str(class_name), 0 if number.isdigit() else 1, int(number) if number.isdigit() else 0, number)
+
+
+def _accuracy(correct, seen):
+    return round(100 * correct / seen, 2) if seen else None
+
+
+def summarize(table, top=TOP_MISSED, question_text=None):
+    """
+    Computes every aggregate of a table.
+
+    Args:
+        table (QuizTable): The loaded reports.
+        top (int, optional): Number of most missed questions to list.
+        question_text (callable, optional): Returns (text, type) of a bank
+            question id, used to label the most missed questions.
+
+    Returns:
+        dict: "totals", "classes", "quizzes", "question_types",
+              "most_missed" and "attempts", ready to be written as JSON.
+    """
+    backend = table.backend
+    report_count = len(table.reports)
+    attempt_numbers = table.attempts()
+
+    # Per report: points and correct answers, one grouped sum each
+    awarded = backend.group_sum(table.report_codes, report_count, table.awarded)
+    possible = backend.group_sum(table.report_codes, report_count, table.possible)
+    graded = backend.group_sum(table.report_codes, report_count)
+    scores = [100 * a / p if p else None for a, p in zip(awarded, possible)]
+
+    by_class = {}
+    by_quiz = {}
+    for (_id, class_name, quiz_number, _source, _ingested), score in zip(table.reports, scores):
+        if score is None:
+            continue  # No graded questions
+        by_class.setdefault(class_name, []).append(score)
+        by_quiz.setdefault((class_name, quiz_number), []).append(score)
+
+    # Per question: times seen and times answered correctly
+    question_count = len(table.question_ids)
+    seen = backend.group_sum(table.question_codes, question_count)
+    correct = backend.group_sum(table.question_codes, question_count, table.correct)
+    missed = heapq.nlargest(
+        top,
+        (code for code in range(question_count) if seen[code] >= MIN_SEEN and correct[code] < seen[code]),
+        key=lambda code: ((seen[code] - correct[code]) / seen[code], seen[code] - correct[code]),
+    )
+    most_missed = []
+    for code in missed:
+        text, question_type = question_text(table.question_ids[code]) if question_text else ("", "")
+        most_missed.append({
+            "question_id": table.question_ids[code], "text": text, "question_type": question_type,
+            "seen": int(seen[code]), "missed": int(seen[code] - correct[code]),
+            "accuracy": _accuracy(correct[code], seen[code]),
+        })
+
+    # Per question type
+    type_count = len(table.type_names)
+    type_seen = backend.group_sum(table.type_codes, type_count)
+    type_correct = backend.group_sum(table.type_codes, type_count, table.correct)
+    type_awarded = backend.group_sum(table.type_codes, type_count, table.awarded)
+    type_possible = backend.group_sum(table.type_codes, type_count, table.possible)
+    question_types = sorted(
+        ({"question_type": name or "unknown", "seen": int(type_seen[code]),
+          "accuracy": _accuracy(type_correct[code], type_seen[code]),
+          "points": _accuracy(type_awarded[code], type_possible[code])}
+         for code, name in enumerate(table.type_names)),
+        key=lambda entry: (entry["accuracy"] if entry["accuracy"] is not None else 101, entry["question_type"]),
+    )
+
+    # Per attempt number: rows are mapped to their report's attempt first
+    attempt_count = max(attempt_numbers, default=0) + 1
+    row_attempts = backend.gather(attempt_numbers, table.report_codes) if table.rows else table.report_codes
+    attempt_seen = backend.group_sum(row_attempts, attempt_count)
+    attempt_correct = backend.group_sum(row_attempts, attempt_count, table.correct)
+    attempt_scores = {}
+    for number, score in zip(attempt_numbers, scores):
+        if score is not None:
+            attempt_scores.setdefault(number, []).append(score)
+    attempts = [
+        {"attempt": number, "reports": len(attempt_scores[number]),
+         "mean_score": round(statistics.fmean(attempt_scores[number]), 2),
+         "accuracy": _accuracy(attempt_correct[number], attempt_seen[number])}
+        for number in sorted(attempt_scores)
+    ]
+
+    quizzes = []
+    for (class_name, quiz_number), quiz_scores in sorted(by_quiz.items(), key=lambda item: _quiz_order(*item[0])):
+        entry = {"class_name": class_name, "quiz_number": quiz_number, **_distribution(quiz_scores)}
+        # Reports are in bank order, so the first and last scores are the first and latest attempts
+        entry["first"] = round(quiz_scores[0], 2)
+        entry["latest"] = round(quiz_scores[-1], 2)
+        entry["change"] = round(quiz_scores[-1] - quiz_scores[0], 2)
+        quizzes.append(entry)
+
+    scored = [score for score in scores if score is not None]
+    return {
+        "totals": {
+            "reports": len(scored),
+            "questions": table.rows,
+            "unique_questions": question_count,
+            "accuracy": _accuracy(sum(correct), table.rows),
+            "scores": _distribution(scored) if scored else None,
+            "backend": backend.name,
+        },
+        "classes": [{"class_name": name, **_distribution(class_scores)}
+                    for name, class_scores in sorted(by_class.items(), key=lambda item: str(item[0]))],
+        "quizzes": quizzes,
+        "question_types": question_types,
+        "most_missed": most_missed,
+        "attempts": attempts,
+    }
+
+
+def _percent(value, width):
+    return f"{value:>{width - 1}}%" if value is not None else f"{'-':>{width}}"
+
+
+def _shorten(text, width):
+    text = " ".join((text or "").split())
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def format_summary(summary):
+    """
+    Renders a summary as a plain text report.
+
+    Args:
+        summary (dict): Returned by summarize.
+
+    Returns:
+        str: The report.
+    """
+    totals = summary["totals"]
+    lines = [f"Reports: {totals['reports']}, graded questions: {totals['questions']} "
+             f"({totals['unique_questions']} unique), accuracy: {totals['accuracy']}%"]
+    if totals["scores"]:
+        scores = totals["scores"]
+        lines.append(f"Scores: mean {scores['mean']}%, median {scores['median']}%, "
+                     f"min {scores['min']}%, max {scores['max']}%")
+        lines.append("Distribution: " + "  ".join(
+            f"{bucket * BUCKET_PERCENT}%+: {count}" for bucket, count in enumerate(scores["buckets"])))
+
+    lines.append(f"\n{'Class':<40} {'Reports':>8} {'Mean':>7} {'Median':>7} {'Min':>7} {'Max':>7}")
+    for entry in summary["classes"]:
+        lines.append(f"{_shorten(entry['class_name'], 40):<40} {entry['reports']:>8} {entry['mean']:>7} "
+                     f"{entry['median']:>7} {entry['min']:>7} {entry['max']:>7}")
+
+    lines.append(f"\n{'Quiz':<40} {'Reports':>8} {'Mean':>7} {'First':>7} {'Latest':>7} {'Change':>7}")
+    for entry in summary["quizzes"]:
+        name = f"Quiz {entry['quiz_number']} - {entry['class_name']}"
+        lines.append(f"{_shorten(name, 40):<40} {entry['reports']:>8} {entry['mean']:>7} {entry['first']:>7} "
+                     f"{entry['latest']:>7} {entry['change']:>+7}")
+
+    lines.append(f"\n{'Question type':<40} {'Seen':>8} {'Correct':>8} {'Points':>7}")
+    for entry in summary["question_types"]:
+        lines.append(f"{entry['question_type']:<40} {entry['seen']:>8} {_percent(entry['accuracy'], 8)} "
+                     f"{_percent(entry['points'], 7)}")
+
+    lines.append(f"\n{'Attempt':<8} {'Reports':>8} {'Mean score':>11} {'Correct':>8}")
+    for entry in summary["attempts"]:
+        lines.append(f"{entry['attempt']:<8} {entry['reports']:>8} {_percent(entry['mean_score'], 11)} "
+                     f"{_percent(entry['accuracy'], 8)}")
+
+    if summary["most_missed"]:
+        lines.append("\nMost missed questions:")
+        for rank, entry in enumerate(summary["most_missed"], start=1):
+            lines.append(f"{rank:>3}. [{entry['missed']}/{entry['seen']} missed] {_shorten(entry['text'], 90)}")
+    return "\n".join(lines)
+
+
+def summarize_bank(connection, class_name=None, top=TOP_MISSED, backend=None):
+    """
+    Loads the taken reports of a question bank and summarizes them.
+
+    Args:
+        connection (sqlite3.Connection): The open question bank.
+        class_name (str, optional): Only summarize this class.
+        top (int, optional): Number of most missed questions to list.
+        backend (optional): Column backend. Defaults to resolve_backend().
+
+    Returns:
+        dict: See summarize.
+    """
+    table = QuizTable.from_bank(connection, class_name, backend)
+
+    def question_text(question_id):
+        return connection.execute(
+            "SELECT question_text, question_type FROM questions WHERE id = ?", (question_id,)
+        ).fetchone()
+
+    return summarize(table, top, question_text)
+
+
+def write_summary(summary, path):
+    """Writes a summary as JSON."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(summary, file, indent=1, ensure_ascii=False)
@@ -0,0 +1,260 @@
+'''
+Canvas:   Quiz Extractor - Exporters
+Brief:    Writes extracted quiz records (QuizModel) to JSON Lines, CSV, SQLite
+          and Anki decks. Several exporters can be fed from the same parse,
+          and rows are written as each quiz arrives instead of being built up
+          in memory.
+'''
+
+import os
+import csv
+import html
+import json
+import sqlite3
+import hashlib
+import importlib.util
+from dataclasses import asdict
+import FileProcess
+import QuizModel
+
+
+def answer_lines(question):
+    """
+    Summarizes a question's answers as plain text lines (used for CSV and Anki).
+
+    Args:
+        question (QuizModel.Question): The extracted question.
+
+    Returns:
+        list: One line per answer, e.g. "[x] Transport layer" or "HTTP -> 80".
+    """
+    lines = []
+    for answer in question.answers:
+        text = answer.text if answer.text is not None else ""
+        if answer.kind == QuizModel.ANSWER_MATCH:
+            lines.append(f"{answer.prompt} -> {text or 'Not selected'}")
+        elif answer.kind == QuizModel.ANSWER_BLANK:
+            lines.append(f"Blank {answer.position}: {text or 'NO ANSWER GIVEN'}")
+        elif answer.kind == QuizModel.ANSWER_OPTION:
+            lines.append(f"[{'x' if answer.selected else ' '}] {text}")
+        else:
+            lines.append(text or "NO ANSWER GIVEN")
+    return lines
+
+
+def _stable_id(text):
+    """Derives a stable 31-bit id from text (Anki deck and model ids)."""
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) >> 1
+
+
+class JsonlExporter:
+    """Writes one JSON object per question."""
+
+    extension = ".jsonl"
+
+    def __init__(self, path):
+        self.path = path
+        self.output = FileProcess.AtomicOutput(path, "w", encoding="utf-8")
+        self.file = self.output.file
+
+    def write_quiz(self, quiz, quiz_number, class_name):
+        for question in quiz.questions:
+            row = {"class": class_name, "quiz": quiz_number, "source": quiz.source, "method": quiz.method}
+            row.update(asdict(question))
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def close(self, discard=False):
+        if discard:
+            self.output.discard()
+        else:
+            self.output.commit()
+
+
+class CsvExporter:
+    """Writes one CSV row per question, with the answers flattened into one column."""
+
+    extension = ".csv"
+    columns = (
+        "class", "quiz", "source", "method", "index", "name", "question_type", "question_id",
+        "text", "has_points", "points_awarded", "points_possible", "is_correct", "answers",
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self.output = FileProcess.AtomicOutput(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.output.file)
+        self.writer.writerow(self.columns)
+
+    def write_quiz(self, quiz, quiz_number, class_name):
+        for q in quiz.questions:
+            self.writer.writerow((
+                class_name, quiz_number, quiz.source, quiz.method, q.index, q.label, q.question_type,
+                q.question_id, q.text or "", q.has_points, q.points_awarded, q.points_possible,
+                q.is_correct, "\n".join(answer_lines(q)),
+            ))
+
+    def close(self, discard=False):
+        if discard:
+            self.output.discard()
+        else:
+            self.output.commit()
+
+
+class SqliteExporter:
+    """Writes quizzes, questions and answers into three related SQLite tables."""
+
+    extension = ".sqlite"
+    schema = """
+        CREATE TABLE IF NOT EXISTS quizzes (
+            id INTEGER PRIMARY KEY,
+            class_name TEXT, quiz_number TEXT, source TEXT, method TEXT
+        );
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY,
+            quiz_id INTEGER REFERENCES quizzes(id),
+            position INTEGER, name TEXT, question_type TEXT, question_id TEXT, text TEXT,
+            has_points INTEGER, points_awarded REAL, points_possible REAL, is_correct INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS answers (
+            question_id INTEGER REFERENCES questions(id),
+            kind TEXT, position INTEGER, text TEXT, prompt TEXT, selected INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS questions_quiz ON questions(quiz_id);
+        CREATE INDEX IF NOT EXISTS answers_question ON answers(question_id);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Built as a fresh database that replaces the previous export on close, like the other formats
+        self.output = FileProcess.AtomicOutput(path, mode=None)
+        self.connection = sqlite3.connect(self.output.temp_path)
+        self.connection.executescript(self.schema)
+
+    def write_quiz(self, quiz, quiz_number, class_name):
+        with self.connection:  # One transaction per quiz
+            quiz_id = self.connection.execute(
+                "INSERT INTO quizzes (class_name, quiz_number, source, method) VALUES (?, ?, ?, ?)",
+                (class_name, quiz_number, quiz.source, quiz.method),
+            ).lastrowid
+            for q in quiz.questions:
+                question_id = self.connection.execute(
+                    "INSERT INTO questions (quiz_id, position, name, question_type, question_id, text,"
+                    " has_points, points_awarded, points_possible, is_correct)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (quiz_id, q.index, q.label, q.question_type, q.question_id, q.text, q.has_points,
+                     q.points_awarded, q.points_possible, q.is_correct),
+                ).lastrowid
+                self.connection.executemany(
+                    "INSERT INTO answers (question_id, kind, position, text, prompt, selected)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [(question_id, a.kind, a.position, a.text, a.prompt, a.selected) for a in q.answers],
+                )
+
+    def close(self, discard=False):
+        self.connection.close()
+        if discard:
+            self.output.discard()
+        else:
+            self.output.commit()
+
+
+class AnkiExporter:
+    """
+    Writes an Anki deck with one card per question: the question text on the
+    front, the answers and score on the back.
+
+    Uses genanki to build an .apkg package when it is installed (genanki
+    assembles the package in memory and writes it on close). Without genanki,
+    a tab-separated file that Anki can import (File > Import) is streamed
+    instead.
+    """
+
+    extension = ".apkg"
+
+    def __init__(self, path):
+        self.path = path
+        self.deck = None
+        self.file = None
+        if importlib.util.find_spec("genanki"):
+            import genanki
+            self.genanki = genanki
+            name = os.path.splitext(os.path.basename(path))[0]
+            self.model = genanki.Model(
+                _stable_id("Canvas Quiz Extractor"), "Canvas Quiz Question",
+                fields=[{"name": "Question"}, {"name": "Answer"}, {"name": "Source"}],
+                templates=[{
+                    "name": "Card 1",
+                    "qfmt": "{{Question}}",
+                    "afmt": "{{FrontSide}}<hr id=answer>{{Answer}}<br><small>{{Source}}</small>",
+                }],
+            )
+            self.deck = genanki.Deck(_stable_id(name), name)
+        else:
+            self.path = os.path.splitext(path)[0] + ".txt"
+            print(f"genanki is not installed; writing an Anki import file to '{self.path}' instead.")
+            self.output = FileProcess.AtomicOutput(self.path, "w", encoding="utf-8")
+            self.file = self.output.file
+            self.file.write("#separator:tab\n#html:true\n")
+
+    def write_quiz(self, quiz, quiz_number, class_name):
+        source = html.escape(f"Quiz {quiz_number} - {class_name}")
+        for q in quiz.questions:
+            front = html.escape(q.text or "").replace("\n", "<br>")
+            back = "<br>".join(html.escape(line) for line in answer_lines(q))
+            if q.has_points:
+                verdict = "✔ CORRECT" if q.is_correct else "❌ INCORRECT"
+                back = f"{verdict} - {q.points_awarded}/{q.points_possible}pts<br>{back}"
+            if self.deck is not None:
+                self.deck.add_note(self.genanki.Note(model=self.model, fields=[front, back, source]))
+            else:
+                self.file.write(f"{front}\t{back}\t{source}\n")
+
+    def close(self, discard=False):
+        if self.deck is None:
+            if discard:
+                self.output.discard()
+            else:
+                self.output.commit()
+        elif not discard:
+            output = FileProcess.AtomicOutput(self.path, mode=None)
+            try:
+                self.genanki.Package(self.deck).write_to_file(output.temp_path)
+            except BaseException:
+                output.discard()
+                raise
+            output.commit()
+
+
+# Exporter class for each format name
+EXPORTERS = {
+    "jsonl": JsonlExporter,
+    "csv": CsvExporter,
+    "sqlite": SqliteExporter,
+    "anki": AnkiExporter,
+}
+
+
+def open_exporters(formats, base_path):
+    """
+    Opens one exporter per requested format, all sharing a base file name.
+
+    Args:
+        formats (list): Format names (keys of EXPORTERS).
+        base_path (str): Output path without extension, e.g. "Output/export".
+
+    Returns:
+        list: The open exporters. Feed each extracted quiz to every exporter
+              with write_quiz() and close them when done. Nothing appears
+              at the export paths until close(); close(discard=True) drops
+              an unfinished export.
+
+    Raises:
+        ValueError: If a format is unknown.
+    """
+    unknown = [name for name in formats if name not in EXPORTERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}. Choose from: {', '.join(EXPORTERS)}.")
+    directory = os.path.dirname(base_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return [EXPORTERS[name](base_path + EXPORTERS[name].extension) for name in formats]
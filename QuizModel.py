@@ -0,0 +1,104 @@
+'''
+Canvas:   Quiz Extractor - Quiz Model
+Brief:    Compact records for the data extracted from a Canvas quiz report,
+          independent of how they are rendered or exported.
+'''
+
+from dataclasses import dataclass, field
+
+
+# Kinds of answer a question can hold
+ANSWER_OPTION = "option"          # Multiple choice / true-false option
+ANSWER_MATCH = "match"            # Matching row: prompt and the selected option
+ANSWER_NUMERICAL = "numerical"    # Numerical input
+ANSWER_TEXT = "text"              # Short-answer text box
+ANSWER_BLANK = "blank"            # Fill in multiple blanks / multiple dropdowns: one blank
+ANSWER_ESSAY = "essay"            # Essay response
+ANSWER_FILE = "file"              # Name of an uploaded file
+
+# Extraction methods
+METHOD_TAKEN = "taken"
+METHOD_UNTAKEN = "untaken"
+
+
+@dataclass(slots=True)
+class Answer:
+    """
+    One answer of a question.
+
+    Attributes:
+        kind (str): One of the ANSWER_* kinds.
+        position (int): 1-based position among the question's answers of this kind.
+        text (str | None): Option text, typed value, essay response, file name,
+            or the option selected in a matching row or dropdown. None when the
+            report has no text for it.
+        prompt (str): Left-hand side of a matching row.
+        selected (bool): True if the student selected this option.
+    """
+
+    kind: str
+    position: int
+    text: str | None = None
+    prompt: str = ""
+    selected: bool = False
+
+
+@dataclass(slots=True)
+class Question:
+    """
+    One question of a quiz report.
+
+    Attributes:
+        index (int): 1-based position of the question in the report.
+        text (str | None): The question text, None if the report has none.
+        name (str | None): The header label (e.g. "Question 3"), if present.
+        question_type (str): Canvas question type class, e.g. "matching_question".
+        question_id (str): Canvas element id of the question, e.g. "question_123".
+        has_points (bool): True if the report shows the points for this question.
+        points_awarded (float): Points the student received.
+        points_possible (float): Points the question is worth.
+        is_correct (bool): False if Canvas marks the question incorrect.
+        answers (list[Answer]): The question's answers in report order.
+    """
+
+    index: int
+    text: str | None = None
+    name: str | None = None
+    question_type: str = ""
+    question_id: str = ""
+    has_points: bool = False
+    points_awarded: float = 0.0
+    points_possible: float = 0.0
+    is_correct: bool = True
+    answers: list[Answer] = field(default_factory=list)
+
+    @property
+    def label(self):
+        """The heading used for the question in the text output."""
+        return self.name or f"Question {self.index}"
+
+
+@dataclass(slots=True)
+class Quiz:
+    """
+    All questions extracted from one report.
+
+    Attributes:
+        method (str): METHOD_TAKEN or METHOD_UNTAKEN.
+        source (str): Path of the report the questions were extracted from.
+        questions (list[Question]): The questions in report order.
+    """
+
+    method: str
+    source: str = ""
+    questions: list[Question] = field(default_factory=list)
+
+    @property
+    def points_awarded(self):
+        """Total points received over the questions that show points."""
+        return sum(q.points_awarded for q in self.questions if q.has_points)
+
+    @property
+    def points_possible(self):
+        """Total points possible over the questions that show points."""
+        return sum(q.points_possible for q in self.questions if q.has_points)
@@ -0,0 +1,227 @@
+'''
+Canvas:   Quiz Extractor - Text Renderer
+Brief:    Renders extracted quiz records (QuizModel) as the easy to read text
+          document written to the Output folder.
+'''
+
+from datetime import datetime
+import FileProcess
+import Instrumentation
+import QuizModel
+
+
+SEPARATOR = f"{'-' * 40}\n"
+
+
+def render_header(quiz_number, class_name):
+    """
+    Renders the title lines at the top of every output file.
+
+    Args:
+        quiz_number (str): Quiz number identifier.
+        class_name (str): Class name for labeling output.
+
+    Returns:
+        str: The header text.
+    """
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    return f"Quiz {quiz_number} - {class_name} - {current_date}\n{SEPARATOR}"
+
+
+def untaken_lines(question):
+    """
+    Renders the text and possible options of a question, without its heading.
+
+    Args:
+        question (QuizModel.Question): The extracted question.
+
+    Returns:
+        list: The lines, each ending in a newline.
+    """
+    question_text = question.text if question.text is not None else "No question text found."
+    lines = [f"{question_text}\n"]
+    for answer in question.answers:
+        answer_text = answer.text if answer.text is not None else "No answer text found."
+        lines.append(f"   Option {answer.position}: {answer_text}\n")
+    return lines
+
+
+def render_untaken_question(question):
+    """
+    Renders one question of an untaken quiz: its text and possible options.
+
+    Args:
+        question (QuizModel.Question): The extracted question.
+
+    Returns:
+        str: The question's block of the output file.
+    """
+    return "".join([f"Question {question.index}:\n"] + untaken_lines(question) + [SEPARATOR])
+
+
+def taken_lines(question):
+    """
+    Renders the score, text and given answers of a question, without its heading.
+
+    Args:
+        question (QuizModel.Question): The extracted question.
+
+    Returns:
+        list: The lines, each ending in a newline.
+    """
+    question_text = question.text if question.text is not None else "No question text found."
+
+    if not question.has_points:
+        return [f"{question_text}\n", "Points information not available.\n"]
+
+    mark = "✔ - CORRECT:" if question.is_correct else "❌ - INCORRECT:"
+    lines = [
+        f"{'✔ CORRECT' if question.is_correct else '❌ INCORRECT'} - "
+        f"{question.points_awarded}/{question.points_possible}pts\n",
+        f"{question_text}\n",
+    ]
+
+    for answer in question.answers:
+        if answer.kind == QuizModel.ANSWER_NUMERICAL:
+            given = answer.text if answer.text is not None else "NO ANSWER GIVEN"
+            lines.append(f"   {mark} Given Answer: {given}\n")
+        elif answer.kind == QuizModel.ANSWER_TEXT:
+            value = answer.text if answer.text is not None else "NO ANSWER GIVEN"
+            lines.append(f"   {mark} Text {answer.position}: {value}\n")
+        elif answer.kind == QuizModel.ANSWER_BLANK:
+            value = answer.text if answer.text is not None else "NO ANSWER GIVEN"
+            lines.append(f"   {mark} Blank {answer.position}: {value}\n")
+        elif answer.kind == QuizModel.ANSWER_ESSAY:
+            response = answer.text if answer.text is not None else "NO ANSWER GIVEN"
+            lines.append(f"   {mark} Response: {response}\n")
+        elif answer.kind == QuizModel.ANSWER_FILE:
+            file_name = answer.text if answer.text is not None else "NO FILE UPLOADED"
+            lines.append(f"   {mark} File {answer.position}: {file_name}\n")
+        elif answer.kind == QuizModel.ANSWER_MATCH:
+            selected_text = answer.text if answer.text is not None else "Not selected"
+            lines.append(f"   {mark} Option {answer.position}: {answer.prompt} {selected_text}\n")
+        elif answer.selected:
+            lines.append(f"   {mark} Option {answer.position}: {answer.text} (Selected)\n")
+        else:
+            lines.append(f"   Option {answer.position}: {answer.text}\n")
+    return lines
+
+
+def render_taken_question(question):
+    """
+    Renders one question of a taken quiz: its score, text and the given answers.
+
+    Args:
+        question (QuizModel.Question): The extracted question.
+
+    Returns:
+        str: The question's block of the output file.
+    """
+    return "".join([SEPARATOR, f"{question.label}:\n"] + taken_lines(question) + [SEPARATOR])
+
+
+def render_merge_header(class_name, report_count, question_count, duplicate_count):
+    """
+    Renders the title lines of a merged study document.
+
+    Args:
+        class_name (str): Class name for labeling output.
+        report_count (int): Reports merged.
+        question_count (int): Distinct questions in the document.
+        duplicate_count (int): Repeated questions merged away.
+
+    Returns:
+        str: The header text.
+    """
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    return (f"Study Guide - {class_name} - {current_date}\n"
+            f"{question_count} question(s) from {report_count} report(s), {duplicate_count} duplicate(s) merged\n"
+            f"{SEPARATOR}")
+
+
+def render_merged_question(question, number, quiz_number, best_quiz, times_seen, times_correct):
+    """
+    Renders one question of a merged study document: where it was first
+    seen, how often it was answered correctly and its best known answer.
+
+    Args:
+        question (QuizModel.Question): The best record of the question.
+        number (int): 1-based position in the document.
+        quiz_number (str): Quiz the question was first seen in.
+        best_quiz (str): Quiz the best record comes from.
+        times_seen (int): Reports the question appeared in.
+        times_correct (int): Times it was graded correct.
+
+    Returns:
+        str: The question's block of the document.
+    """
+    source = f"Quiz {quiz_number}, {question.label}"
+    if best_quiz != quiz_number:
+        source += f"; best answer from Quiz {best_quiz}"
+    lines = [SEPARATOR, f"Question {number} ({source}):\n",
+             f"Seen {times_seen} time(s), correct {times_correct} time(s)\n"]
+    # Ungraded records (untaken reports) still list the options to study
+    lines += taken_lines(question) if question.has_points else untaken_lines(question)
+    lines.append(SEPARATOR)
+    return "".join(lines)
+
+
+# Question renderer for each extraction method
+QUESTION_RENDERERS = {
+    QuizModel.METHOD_TAKEN: render_taken_question,
+    QuizModel.METHOD_UNTAKEN: render_untaken_question,
+}
+
+# Output file encoding for each extraction method (None: platform default)
+OUTPUT_ENCODINGS = {
+    QuizModel.METHOD_TAKEN: "utf-8",
+    QuizModel.METHOD_UNTAKEN: None,
+}
+
+
+def render_quiz(quiz, quiz_number, class_name):
+    """
+    Renders a whole extracted quiz as text.
+
+    Args:
+        quiz (QuizModel.Quiz): The extracted quiz.
+        quiz_number (str): Quiz number identifier.
+        class_name (str): Class name for labeling output.
+
+    Returns:
+        str: The full text document.
+    """
+    render_question = QUESTION_RENDERERS[quiz.method]
+    return render_header(quiz_number, class_name) + "".join(render_question(q) for q in quiz.questions)
+
+
+def write_text(questions, method, output_file_name, quiz_number, class_name):
+    """
+    Writes the text output file, rendering one question at a time.
+
+    Args:
+        questions (iterable): QuizModel.Question records; may be a stream.
+        method (str): QuizModel.METHOD_TAKEN or QuizModel.METHOD_UNTAKEN.
+        output_file_name (str): Path to the output text file.
+        quiz_number (str): Quiz number identifier.
+        class_name (str): Class name for labeling output.
+
+    Returns:
+        int: The number of questions written.
+    """
+    render_question = QUESTION_RENDERERS[method]
+    question_count = 0
+
+    # Written under a temporary name and renamed when complete, so a crash never leaves half a file
+    with FileProcess.AtomicOutput(output_file_name, "w", encoding=OUTPUT_ENCODINGS[method]) as output_file:
+        write = output_file.write
+        metrics = Instrumentation.current()
+        if metrics:
+            render_question = metrics.timed("render", render_question)
+            write = metrics.timed("write", write)
+        write(render_header(quiz_number, class_name))
+        for question in questions:
+            write(render_question(question))
+            question_count += 1
+
+    return question_count
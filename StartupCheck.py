@@ -0,0 +1,123 @@
+'''
+Canvas:   Quiz Extractor - Startup Check
+Brief:    Imports the CLI in fresh interpreters with -X importtime and checks
+          that start-up stays fast: the cumulative import time must stay
+          within a budget and the heavy dependencies (parsers, asyncio,
+          process pools, HTTP) must not load until a command needs them.
+
+Usage:    python StartupCheck.py [--budget MS] [--runs N]
+'''
+
+import os
+import sys
+import argparse
+import subprocess
+
+
+# Module whose import is measured
+ENTRY_MODULE = "CanvasQuizExtractor"
+
+# Largest cumulative import time accepted for ENTRY_MODULE, in milliseconds
+IMPORT_BUDGET_MS = 200
+
+# Fresh interpreters started; the fastest one is compared with the budget
+RUNS = 5
+
+# Modules that must only be imported lazily, when a command uses them
+LAZY_MODULES = (
+    "bs4",
+    "lxml",
+    "selectolax",
+    "genanki",
+    "numpy",
+    "asyncio",
+    "concurrent.futures.process",
+    "concurrent.futures.thread",
+    "http.client",
+    "ctypes",
+    "cProfile",
+)
+
+
+def measure():
+    """
+    Imports ENTRY_MODULE in a new interpreter.
+
+    Returns:
+        tuple: (cumulative import time of ENTRY_MODULE in milliseconds,
+                set of the names of every module imported).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {ENTRY_MODULE}"],
+        cwd=here, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    total_ms = None
+    modules = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if not cumulative.strip().isdigit():
+            continue  # The header line
+        modules.add(name)
+        if name == ENTRY_MODULE:
+            total_ms = int(cumulative) / 1000
+    return total_ms, modules
+
+
+def main(argv=None):
+    """
+    Runs the start-up check.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: 0 if start-up is within budget and lazy, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Check the import time of the CLI.")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS,
+                        help=f"Import time budget in milliseconds (default: {IMPORT_BUDGET_MS}).")
+    parser.add_argument("--runs", type=int, default=RUNS, help=f"Interpreters to start (default: {RUNS}).")
+    args = parser.parse_args(argv)
+
+    timings = []
+    imported = set()
+    for _ in range(max(1, args.runs)):
+        try:
+            total_ms, modules = measure()
+        except RuntimeError as error:
+            print(f"Importing {ENTRY_MODULE} failed: {error}")
+            return 1
+        timings.append(total_ms)
+        imported |= modules
+
+    failures = 0
+    best = min(timings)
+    print(f"{ENTRY_MODULE} import: best {best:.1f} ms, worst {max(timings):.1f} ms "
+          f"over {len(timings)} run(s) (budget {args.budget:.0f} ms)")
+    if best > args.budget:
+        failures += 1
+        print(f"[SLOW]   {best:.1f} ms is over the {args.budget:.0f} ms budget")
+
+    # A submodule (e.g. bs4.element) counts as its package being imported
+    for module in LAZY_MODULES:
+        eager = sorted(name for name in imported if name == module or name.startswith(module + "."))
+        if eager:
+            failures += 1
+            print(f"[EAGER]  {module} is imported at start-up")
+        else:
+            print(f"[lazy]   {module}")
+
+    print(f"\n{failures} problem(s).")
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
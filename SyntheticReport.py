@@ -0,0 +1,257 @@
+'''
+Canvas:   Quiz Extractor - Synthetic Report Generator
+Brief:    Builds Canvas-shaped quiz report HTML of any size for benchmarks,
+          cycling through every question type the extractor handles.
+
+Usage:    python SyntheticReport.py QUESTIONS OUTPUT.html [--untaken] [--no-chrome] [--answers N] [--seed N]
+                                    [--all-types]
+'''
+
+import sys
+import html
+import random
+import argparse
+
+
+# Question types cycled through, in order
+QUESTION_TYPES = ("numerical", "text_box", "multiple_choice", "matching")
+
+# Every Canvas question type the extractor has a handler for (--all-types)
+ALL_QUESTION_TYPES = QUESTION_TYPES + (
+    "true_false", "multiple_answers", "essay", "file_upload", "fill_in_blanks", "dropdowns", "text_only",
+)
+
+# Canvas type class of each generated question type
+TYPE_CLASSES = {
+    "numerical": "numerical_question",
+    "text_box": "short_answer_question",
+    "multiple_choice": "multiple_choice_question",
+    "matching": "matching_question",
+    "true_false": "true_false_question",
+    "multiple_answers": "multiple_answers_question",
+    "essay": "essay_question",
+    "file_upload": "file_upload_question",
+    "fill_in_blanks": "fill_in_multiple_blanks_question",
+    "dropdowns": "multiple_dropdowns_question",
+    "text_only": "text_only_question",
+}
+
+WORDS = (
+    "packet", "router", "segment", "window", "congestion", "handshake", "socket", "port", "latency",
+    "bandwidth", "checksum", "header", "payload", "frame", "subnet", "gateway", "protocol", "stream",
+    "datagram", "acknowledgment", "sequence", "timeout", "buffer", "queue", "link", "layer", "cipher",
+)
+
+
+def _sentence(rng, length):
+    """Returns a random sentence of the given number of words."""
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize()
+
+
+def page_header(title, chrome=True):
+    """
+    Renders everything before the first question.
+
+    Args:
+        title (str): The page title.
+        chrome (bool, optional): Include Canvas page chrome: a large inline
+            ENV script, CSS, navigation and course menu.
+
+    Returns:
+        str: The opening HTML.
+    """
+    parts = ['<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n',
+             f"<title>{html.escape(title)}</title>\n"]
+    if chrome:
+        # Canvas inlines a large JSON ENV blob and CSS; neither holds questions
+        env = ", ".join(f'"key_{i}": "<div class=\\"display_question\\">{i}</div>"' for i in range(2000))
+        parts.append(f"<script>window.ENV = {{{env}}};</script>\n")
+        parts.append("<style>" + " ".join(f".c{i} {{ margin: {i}px; }}" for i in range(1000)) + "</style>\n")
+    parts.append("</head>\n<body>\n")
+    if chrome:
+        links = "".join(f'<li><a href="/courses/{i}">Course {i}</a></li>' for i in range(200))
+        parts.append(f'<header id="header"><nav aria-label="Global"><ul>{links}</ul></nav></header>\n')
+        parts.append('<div id="left-side"><ul id="section-tabs"><li><a href="/">Home</a></li></ul></div>\n')
+    parts.append('<div id="content" role="main">\n')
+    return "".join(parts)
+
+
+def page_footer(chrome=True):
+    """
+    Renders everything after the last question.
+
+    Args:
+        chrome (bool, optional): Include the Canvas footer and scripts.
+
+    Returns:
+        str: The closing HTML.
+    """
+    footer = "</div>\n"
+    if chrome:
+        footer += '<footer role="contentinfo">Canvas by Instructure</footer>\n'
+        footer += "<script>" + "".join(f"window.x{i} = {i};" for i in range(2000)) + "</script>\n"
+    return footer + "</body>\n</html>\n"
+
+
+def render_question(index, question_type, rng, taken=True, answers=None):
+    """
+    Renders one display_question block.
+
+    Args:
+        index (int): 1-based question number.
+        question_type (str): One of QUESTION_TYPES.
+        rng (random.Random): Source of the generated text.
+        taken (bool, optional): Render a taken report (points, given answers)
+            rather than an untaken one.
+        answers (int, optional): Options per multiple choice question and rows
+            per matching question. Random (4 options, 2-4 rows) if None.
+
+    Returns:
+        str: The question's HTML.
+    """
+    correct = rng.random() < 0.7
+    # Text only items are not graded
+    graded = taken and question_type != "text_only"
+    status = (" correct" if correct else " incorrect") if graded else ""
+    possible = rng.choice((1, 1.5, 2, 5))
+    awarded = possible if correct else 0
+    lines = [f'<div class="quiz_sortable question_holder" id="">\n'
+             f'<div class="display_question question {TYPE_CLASSES[question_type]}{status}" id="question_{index}">\n'
+             '  <div class="header">\n']
+    if graded and not correct:
+        lines.append('    <span class="answer_arrow incorrect"></span>\n')
+    lines.append(f'    <span class="name question_name" role="heading">Question {index}</span>\n')
+    if graded:
+        lines.append(f'    <div class="user_points">{awarded} '
+                     f'<span class="points question_points"> / {possible}</span> pts</div>\n')
+    else:
+        lines.append(f'    <span class="question_points_holder"><span class="points question_points">'
+                     f'{possible}</span> pts</span>\n')
+    lines.append("  </div>\n")
+    question_text = f"{_sentence(rng, rng.randint(8, 30))}?"
+    if question_type in ("fill_in_blanks", "dropdowns"):
+        # The blanks sit inside the question text
+        blanks = []
+        for blank in range(rng.randint(1, 3)):
+            name = f"question_{index}_{blank}"
+            if question_type == "fill_in_blanks":
+                value = f' value="{rng.choice(WORDS)}"' if taken else ""
+                blanks.append(f'<input type="text" class="question_input" name="{name}"{value}>')
+            else:
+                chosen = rng.randrange(3)
+                options = "".join(f'<option value="{i}"{" selected" if taken and i == chosen else ""}>{word}</option>'
+                                  for i, word in enumerate(rng.sample(WORDS, 3)))
+                blanks.append(f'<select class="question_input" name="{name}">{options}</select>')
+        question_text = " ".join(f"{_sentence(rng, rng.randint(3, 8))} {blank}" for blank in blanks) + "."
+    lines.append(f'  <div class="question_text user_content"><p>{question_text}</p></div>\n')
+    lines.append('  <div class="answers">\n')
+
+    if question_type in ("fill_in_blanks", "dropdowns", "text_only"):
+        pass
+    elif question_type == "essay":
+        if taken:
+            lines.append(f'    <div class="quiz_response_text"><p>{_sentence(rng, rng.randint(10, 40))}.</p></div>\n')
+    elif question_type == "file_upload":
+        lines.append('    <div class="file-upload-question-holder">')
+        if taken:
+            lines.append(f'<a class="icon-paperclip" href="/files/{index}/download">{rng.choice(WORDS)}_{index}.pdf</a>')
+        lines.append("</div>\n")
+    elif question_type == "numerical":
+        lines.append(f'    <div class="form-control numerical-question-holder">'
+                     f'<input type="text" value="{rng.randint(0, 65535)}" readonly></div>\n')
+    elif question_type == "text_box":
+        for _ in range(rng.randint(1, 3)):
+            lines.append(f'    <div class="form-control text-box-question-holder">'
+                         f'<input type="text" value="{rng.choice(WORDS)}"></div>\n')
+    elif question_type in ("multiple_choice", "true_false", "multiple_answers"):
+        option_count = 2 if question_type == "true_false" else answers or 4
+        if question_type == "multiple_answers":
+            chosen = set(rng.sample(range(1, option_count + 1), rng.randint(1, option_count)))
+        else:
+            chosen = {rng.randint(1, option_count)}
+        for option in range(1, option_count + 1):
+            if question_type == "true_false":
+                label = ("True", "False")[option - 1]
+            else:
+                label = _sentence(rng, rng.randint(1, 6))
+            if taken:
+                selected = " selected_answer" if option in chosen else ""
+                lines.append(f'    <div class="answer answer_for_{option}{selected}">'
+                             f'<div class="answer_text">{label}</div></div>\n')
+            else:
+                lines.append(f'    <div class="answer"><input type="radio" name="question_{index}" value="{option}">'
+                             f'<div class="answer_label">{label}</div></div>\n')
+    else:
+        choices = rng.sample(WORDS, 4)
+        for row in range(answers or rng.randint(2, 4)):
+            options = "".join(
+                f'<option value="{i}"{" selected" if taken and i == row % len(choices) else ""}>{choice}</option>'
+                for i, choice in enumerate(choices)
+            )
+            lines.append(f'    <div class="answer"><div class="answer_match_left">{rng.choice(WORDS)}</div>'
+                         f'<div class="answer_match_right"><select>{options}</select></div></div>\n')
+
+    lines.append("  </div>\n</div>\n</div>\n")
+    return "".join(lines)
+
+
+def iter_report(question_count, taken=True, chrome=True, seed=0, answers=None, question_types=QUESTION_TYPES):
+    """
+    Generates a synthetic report piece by piece.
+
+    Args:
+        question_count (int): Number of questions.
+        taken (bool, optional): Generate a taken (graded) report.
+        chrome (bool, optional): Surround the questions with Canvas page chrome.
+        seed (int, optional): Random seed; the same seed gives the same report.
+        answers (int, optional): See render_question.
+        question_types (tuple, optional): Question types cycled through.
+
+    Yields:
+        str: Consecutive pieces of the HTML document.
+    """
+    rng = random.Random(seed)
+    yield page_header(f"Quiz {seed}: Synthetic: BENCH-{question_count}", chrome)
+    for index in range(1, question_count + 1):
+        yield render_question(index, question_types[(index - 1) % len(question_types)], rng, taken, answers)
+    yield page_footer(chrome)
+
+
+def write_report(path, question_count, taken=True, chrome=True, seed=0, answers=None, question_types=QUESTION_TYPES):
+    """
+    Writes a synthetic report to a file.
+
+    Args:
+        path (str): Output HTML file.
+        question_count, taken, chrome, seed, answers, question_types: See iter_report.
+
+    Returns:
+        int: The size of the file in bytes.
+    """
+    size = 0
+    with open(path, "w", encoding="utf-8") as file:
+        for piece in iter_report(question_count, taken, chrome, seed, answers, question_types):
+            size += file.write(piece)
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Canvas quiz report.")
+    parser.add_argument("questions", type=int, help="Number of questions.")
+    parser.add_argument("output", help="Output HTML file.")
+    parser.add_argument("--untaken", action="store_true", help="Generate an untaken quiz.")
+    parser.add_argument("--no-chrome", action="store_true", help="Leave out the Canvas page chrome.")
+    parser.add_argument("--answers", type=int, help="Options per multiple choice question and rows per matching question.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    parser.add_argument("--all-types", action="store_true",
+                        help="Cycle through every question type with a handler, not just the original four.")
+    args = parser.parse_args(argv)
+    question_types = ALL_QUESTION_TYPES if args.all_types else QUESTION_TYPES
+    size = write_report(args.output, args.questions, not args.untaken, not args.no_chrome, args.seed, args.answers,
+                        question_types)
+    print(f"Wrote {args.questions} questions ({size / 1024:.0f} KiB) to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+'''
+Canvas:   Quiz Extractor - Watch Mode
+Brief:    Watches the Input folder and converts reports as soon as they are
+          dropped in or changed. Uses inotify on Linux and falls back to
+          polling elsewhere. A small state file remembers what was already
+          converted so a restart does not reprocess everything.
+'''
+
+import os
+import sys
+import json
+import time
+import errno
+import select
+import FileProcess
+import BatchProcess
+import ParserBackend
+import ParseCache
+
+
+# Default location of the state file
+STATE_FILE = os.path.join(FileProcess.OUTPUT_FOLDER, ".watch_state.json")
+
+# Seconds a file's size and mtime must stay unchanged before it is converted
+SETTLE_SECONDS = 0.25
+
+# Seconds between scans when inotify is not available
+POLL_SECONDS = 0.5
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class InotifyWatcher:
+    """
+    Wakes up when anything under a directory tree changes, using Linux inotify
+    through ctypes (no third-party packages).
+
+    Raises:
+        OSError: If inotify is not available on this system.
+    """
+
+    name = "inotify"
+
+    def __init__(self, folder):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        import ctypes
+        import ctypes.util
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folder = folder
+        self.watched = set()
+        self.add_watches()
+
+    def add_watches(self):
+        """Watches the folder and every subfolder not watched yet."""
+        for directory, _subfolders, _files in os.walk(self.folder):
+            if directory not in self.watched:
+                if self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) >= 0:
+                    self.watched.add(directory)
+
+    def wait(self, timeout):
+        """
+        Blocks until something changes or the timeout expires.
+
+        Args:
+            timeout (float | None): Seconds to wait, None to wait forever.
+
+        Returns:
+            bool: True if any event arrived.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        # Only the wake-up matters: the caller rescans the folder
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        self.add_watches()  # Pick up new subfolders
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Rescans the folder at a fixed interval."""
+
+    name = "polling"
+
+    def __init__(self, folder, interval=POLL_SECONDS):
+        self.folder = folder
+        self.interval = interval
+
+    def wait(self, timeout):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        return True
+
+    def close(self):
+        pass
+
+
+def open_watcher(folder, use_inotify=True):
+    """
+    Opens the best available watcher for a folder.
+
+    Args:
+        folder (str): Directory to watch.
+        use_inotify (bool, optional): Set to False to force polling.
+
+    Returns:
+        InotifyWatcher | PollingWatcher: The watcher.
+    """
+    if use_inotify:
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError) as error:
+            print(f"inotify is not available ({error}); polling every {POLL_SECONDS}s instead.")
+    return PollingWatcher(folder)
+
+
+def load_state(state_path):
+    """
+    Loads the record of already converted reports.
+
+    Args:
+        state_path (str): Path of the JSON state file.
+
+    Returns:
+        dict: Entries keyed by path relative to the input folder, each with
+              "mtime", "size", "sha256", "output" and "status".
+    """
+    try:
+        with open(state_path, "r", encoding="utf-8") as file:
+            return json.load(file).get("files", {})
+    except FileNotFoundError:
+        return {}
+    except (ValueError, AttributeError):
+        print(f"Warning: Ignoring the unreadable watch state file '{state_path}'.")
+        return {}
+
+
+def save_state(state_path, files):
+    """
+    Writes the state file atomically (temporary file, then rename).
+
+    Args:
+        state_path (str): Path of the JSON state file.
+        files (dict): Entries as returned by load_state.
+
+    Returns:
+        None
+    """
+    with FileProcess.AtomicOutput(state_path, "w", encoding="utf-8") as file:
+        json.dump({"files": files}, file, indent=1, sort_keys=True)
+
+
+def scan_changes(input_folder, files, pending, settle=SETTLE_SECONDS):
+    """
+    Finds the reports that are new or modified and have stopped changing.
+
+    A report whose size and mtime match the state file is skipped without
+    being read. A changed report is only returned once its size and mtime
+    have been stable for `settle` seconds, so files still being written are
+    left alone.
+
+    Args:
+        input_folder (str): The input directory.
+        files (dict): The state entries; entries of deleted reports are removed.
+        pending (dict): (size, mtime) and first-seen time of changed reports
+            that have not settled yet; updated in place.
+        settle (float, optional): Seconds a report must stay unchanged.
+
+    Returns:
+        list: Relative paths of the reports ready to be checked and converted.
+    """
+    now = time.monotonic()
+    ready = []
+    present = set(BatchProcess.find_input_files(input_folder))
+
+    for relative_path in present:
+        try:
+            signature = FileProcess.input_signature(os.path.join(input_folder, relative_path))
+        except (FileNotFoundError, ValueError):
+            continue
+        entry = files.get(relative_path)
+        if entry and (entry["size"], entry["mtime"]) == signature:
+            pending.pop(relative_path, None)
+            continue
+        if relative_path not in pending or pending[relative_path][0] != signature:
+            pending[relative_path] = (signature, now)  # Still changing: restart its settle timer
+        elif now - pending[relative_path][1] >= settle:
+            ready.append(relative_path)
+
+    for relative_path in list(files):
+        if relative_path not in present:
+            del files[relative_path]
+    for relative_path in list(pending):
+        if relative_path not in present:
+            del pending[relative_path]
+    return sorted(ready)
+
+
+def watch_folder(workers=None, manifest_path=None, method="taken", class_name=None, input_folder=None,
+                 engine=None, cache=None, export_formats=None, export_path=None, bank_path=None,
+                 infer="title", on_exists="attempt", state_path=STATE_FILE, settle=SETTLE_SECONDS,
+                 use_inotify=True):
+    """
+    Converts new and modified reports until interrupted with Ctrl+C.
+
+    Reports already recorded in the state file with the same size and mtime
+    are skipped; reports whose bytes hash the same as the recorded SHA-256
+    (e.g. only touched) are skipped too. A modified report overwrites the
+    output file it produced before; the on_exists policy applies to the
+    outputs of new reports.
+
+    Args:
+        workers, manifest_path, method, class_name, input_folder, engine,
+        cache, export_formats, export_path, bank_path, infer, on_exists:
+            See BatchProcess.run_batch.
+        state_path (str, optional): JSON file recording converted reports.
+        settle (float, optional): Seconds a report must stay unchanged before
+            it is converted.
+        use_inotify (bool, optional): Set to False to force polling.
+
+    Returns:
+        int: 0 when stopped by the user.
+    """
+    input_folder = input_folder or FileProcess.INPUT_FOLDER
+    os.makedirs(input_folder, exist_ok=True)
+    defaults, overrides = BatchProcess.load_defaults(method, class_name, manifest_path)
+    engine = ParserBackend.resolve_engine(engine)
+
+    files = load_state(state_path)
+    pending = {}
+    sink = BatchProcess.RecordSink(export_formats, export_path, bank_path)
+    watcher = open_watcher(input_folder, use_inotify)
+    print(f"Watching {input_folder} ({watcher.name}, {engine} parser). Press Ctrl+C to stop.\n")
+
+    try:
+        while True:
+            ready = scan_changes(input_folder, files, pending, settle)
+            jobs = {}
+            hashes = {}
+            runnable = []
+            set_aside = []
+            for relative_path in ready:
+                path = os.path.join(input_folder, relative_path)
+                signature, _seen = pending[relative_path]
+                try:
+                    digest = ParseCache.hash_file(path)
+                except (OSError, ValueError):
+                    continue  # Gone or unreadable since the scan: stays pending and is retried
+                del pending[relative_path]
+                hashes[relative_path] = (signature, digest)
+                entry = files.get(relative_path)
+                if entry and entry["sha256"] == hashes[relative_path][1]:
+                    # Same contents, e.g. the file was only touched
+                    entry["size"], entry["mtime"] = signature
+                    continue
+                job = BatchProcess.build_jobs([relative_path], input_folder, defaults, overrides,
+                                              engine, cache, bool(sink), infer=infer, on_exists=on_exists)[0]
+                jobs[job["input"]] = relative_path, job
+                if entry and entry.get("output"):
+                    job["output"] = entry["output"]  # Replace the previous conversion
+                    runnable.append(job)
+                    continue
+                # A new report's output name follows the on_exists policy
+                new_jobs, skipped = BatchProcess.apply_exists_policy([job])
+                runnable += new_jobs
+                for result in skipped:
+                    BatchProcess.print_result(result)
+                set_aside += skipped
+
+            results = set_aside + BatchProcess.run_jobs(runnable, workers, sink or None)
+            for result in results:
+                # Failed reports are recorded too, so they are only retried once they change
+                relative_path, _job = jobs[result["input"]]
+                signature, digest = hashes[relative_path]
+                # An existing file the on_exists policy kept belongs to no conversion of the report
+                output = None if result in set_aside else result["output"]
+                files[relative_path] = {"size": signature[0], "mtime": signature[1], "sha256": digest,
+                                        "output": output, "status": result["status"]}
+            if ready:
+                save_state(state_path, files)
+
+            # Wake up on the next event, or when a pending file may have settled
+            watcher.wait(settle if pending else None)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        watcher.close()
+        sink.close()
+        save_state(state_path, files)
+    sink.print_summary()
+    return 0